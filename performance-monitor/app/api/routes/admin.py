@@ -3,9 +3,15 @@ Admin API routes
 """
 
 from fastapi import APIRouter, HTTPException, BackgroundTasks
-from typing import Dict, Any
+from datetime import datetime
+from typing import Dict, Any, Optional
 import logging
 
+from core.cache import CACHE_TIERS
+from core.config import settings
+from core.performance import CACHE_WARM_SOURCES
+from core.scenarios import ScenarioError
+
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
@@ -65,13 +71,57 @@ async def clear_cache():
     }
 
 @router.post("/warm-cache")
-async def warm_cache():
-    """Warm cache with common queries"""
-    return {
-        "status": "started",
-        "message": "Cache warming started",
-        "estimated_time_minutes": 5
-    }
+async def warm_cache(
+    background_tasks: BackgroundTasks,
+    source: str = "catalog",
+    top_n: Optional[int] = None,
+    params_per_test: Optional[int] = None,
+    workers: Optional[int] = None,
+    tiers: Optional[str] = None
+):
+    """Warm the query cache by executing scenario queries against both engines"""
+    if source not in CACHE_WARM_SOURCES:
+        raise HTTPException(status_code=400, detail=f"Unknown source '{source}'. Use one of: {', '.join(CACHE_WARM_SOURCES)}")
+    if tiers is not None and tiers not in CACHE_TIERS:
+        raise HTTPException(status_code=400, detail=f"Unknown cache tiers: {tiers}")
+    
+    try:
+        from main import app
+        performance_analyzer = app.state.performance_analyzer
+        
+        if performance_analyzer.warm_progress["status"] in ("preparing", "running"):
+            raise HTTPException(status_code=409, detail="Cache warming is already running")
+        if source == "history" and not performance_analyzer.result_store:
+            raise HTTPException(status_code=400, detail="Warming from history needs a result store")
+        
+        # Claim the warm before returning; the background task only starts after the response
+        performance_analyzer.warm_progress = {"status": "preparing", "source": source,
+                                              "started_at": datetime.utcnow().isoformat()}
+        background_tasks.add_task(
+            performance_analyzer.warm_cache, source, top_n, params_per_test, workers, tiers
+        )
+        return {
+            "status": "started",
+            "source": source,
+            "top_n": top_n,
+            "params_per_test": params_per_test or settings.CACHE_WARM_PARAMS_PER_TEST,
+            "workers": workers or settings.CACHE_WARM_WORKERS,
+            "message": "Cache warming started; follow progress at /api/v1/admin/warm-cache/status"
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to start cache warming: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/warm-cache/status")
+async def get_warm_cache_status():
+    """Progress of the latest cache warming run"""
+    from main import app
+    progress = dict(app.state.performance_analyzer.warm_progress)
+    if progress.get("total"):
+        progress["progress_percent"] = round(progress["completed"] / progress["total"] * 100, 1)
+    return progress
 
 @router.get("/cache-status")
 async def get_cache_status():
@@ -98,6 +148,39 @@ async def optimize_database():
         "estimated_time_minutes": 10
     }
 
+@router.post("/reload-scenarios")
+async def reload_scenarios():
+    """Reload test scenario files; the current scenarios are kept if any file is invalid"""
+    try:
+        from main import app
+        return {
+            "status": "reloaded",
+            **app.state.scenario_catalog.reload()
+        }
+    except ScenarioError as e:
+        logger.error(f"Scenario reload rejected: {e}")
+        raise HTTPException(status_code=400, detail={"message": "Invalid scenario files", "errors": e.errors})
+    except Exception as e:
+        logger.error(f"Failed to reload scenarios: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/register-persisted-queries")
+async def register_persisted_queries():
+    """Register the scenario GraphQL queries in Hasura as persisted queries (REST endpoints)"""
+    try:
+        from main import app
+        performance_analyzer = app.state.performance_analyzer
+        
+        endpoints = await performance_analyzer.ensure_persisted_queries()
+        return {
+            "status": "registered",
+            "collection": performance_analyzer.persisted_queries.collection,
+            "endpoints": {name: performance_analyzer.persisted_queries.endpoint_url(name) for name in endpoints}
+        }
+    except Exception as e:
+        logger.error(f"Failed to register persisted queries: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/health")
 async def get_system_health():
     """Get comprehensive system health status"""
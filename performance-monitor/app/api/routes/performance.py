@@ -6,9 +6,17 @@ from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
 from typing import Dict, Any, List, Optional
 import logging
 
-from core.performance import PerformanceAnalyzer
-from core.database import DatabaseManager
-from core.cache import CacheManager
+from core.config import settings
+from core.performance import PerformanceAnalyzer, CONNECTION_MODES, EXECUTION_MODES
+from core.database import DatabaseManager, RESULT_FORMATS, STATEMENT_MODES
+from core.cache import CACHE_TIERS, CacheManager
+from core.cache_codecs import available_codecs, available_compressions
+from core.graphql_batching import GRAPHQL_BATCH_MODES, SQL_BATCH_MODES
+from core.http_codecs import check_codecs
+from core.load_generator import ARRIVAL_PROFILES
+from core.pagination import PAGINATION_STRATEGIES, PAGINATION_TARGETS
+from core.persisted_queries import GRAPHQL_QUERY_MODES
+from core.query_params import PARAM_MODES
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -21,34 +29,58 @@ async def get_performance_analyzer():
 
 @router.get("/tests")
 async def list_available_tests():
-    """List all available performance tests"""
-    # This would normally get the analyzer from dependency injection
-    # For now, return static list
-    return {
-        "tests": [
-            "simple_select",
-            "customer_orders", 
-            "order_aggregation",
-            "complex_join",
-            "pagination_test"
-        ],
-        "descriptions": {
-            "simple_select": "Simple SELECT query with LIMIT",
-            "customer_orders": "JOIN query with filtering and ordering",
-            "order_aggregation": "Aggregation query with date filtering",
-            "complex_join": "Complex multi-table JOIN query",
-            "pagination_test": "Pagination performance test"
+    """List all available performance tests from the scenario catalog"""
+    try:
+        from main import app
+        scenario_catalog = app.state.scenario_catalog
+        
+        scenarios = scenario_catalog.describe()
+        return {
+            "tests": [scenario["name"] for scenario in scenarios],
+            "descriptions": {scenario["name"]: scenario["description"] for scenario in scenarios},
+            "scenarios": scenarios,
+            "loaded_at": scenario_catalog.loaded_at
         }
-    }
+    except Exception as e:
+        logger.error(f"Failed to list tests: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/run-test/{test_name}")
 async def run_performance_test(
     test_name: str,
-    iterations: int = 10,
+    iterations: Optional[int] = None,
     use_cache: bool = False,
+    connection_mode: str = "warm",
+    execution_mode: Optional[str] = None,
+    iteration_delay: Optional[float] = None,
+    sql_result_format: Optional[str] = None,
+    sql_statement_mode: Optional[str] = None,
+    param_mode: Optional[str] = None,
+    graphql_encoding: Optional[str] = None,
+    graphql_decoder: Optional[str] = None,
+    graphql_query_mode: Optional[str] = None,
     background_tasks: BackgroundTasks = None
 ):
     """Run a specific performance test"""
+    if connection_mode not in CONNECTION_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown connection mode: {connection_mode}")
+    if execution_mode is not None and execution_mode not in EXECUTION_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown execution mode: {execution_mode}")
+    if sql_result_format is not None and sql_result_format not in RESULT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown SQL result format: {sql_result_format}")
+    if sql_statement_mode is not None and sql_statement_mode not in STATEMENT_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown SQL statement mode: {sql_statement_mode}")
+    if param_mode is not None and param_mode not in PARAM_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown parameter mode: {param_mode}")
+    if graphql_query_mode is not None and graphql_query_mode not in GRAPHQL_QUERY_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown GraphQL query mode: {graphql_query_mode}")
+    graphql_encoding = graphql_encoding or settings.GRAPHQL_RESPONSE_ENCODING
+    graphql_decoder = graphql_decoder or settings.GRAPHQL_JSON_DECODER
+    try:
+        check_codecs(graphql_encoding, graphql_decoder)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     try:
         # Get the performance analyzer from the FastAPI app state
         from main import app
@@ -58,7 +90,9 @@ async def run_performance_test(
         if background_tasks:
             background_tasks.add_task(
                 performance_analyzer.run_individual_test,
-                test_name, iterations, use_cache
+                test_name, iterations, use_cache, connection_mode,
+                execution_mode, iteration_delay, sql_result_format, sql_statement_mode,
+                param_mode, graphql_encoding, graphql_decoder, graphql_query_mode
             )
         
         return {
@@ -66,6 +100,14 @@ async def run_performance_test(
             "test_name": test_name,
             "iterations": iterations,
             "use_cache": use_cache,
+            "connection_mode": connection_mode,
+            "execution_mode": execution_mode or settings.TEST_EXECUTION_MODE,
+            "sql_result_format": sql_result_format or settings.TEST_SQL_RESULT_FORMAT,
+            "sql_statement_mode": sql_statement_mode or settings.TEST_SQL_STATEMENT_MODE,
+            "param_mode": param_mode or settings.TEST_PARAM_MODE,
+            "graphql_encoding": graphql_encoding,
+            "graphql_decoder": graphql_decoder,
+            "graphql_query_mode": graphql_query_mode or settings.GRAPHQL_QUERY_MODE,
             "message": f"Performance test '{test_name}' started"
         }
     except Exception as e:
@@ -75,23 +117,270 @@ async def run_performance_test(
 @router.post("/run-concurrent-test/{test_name}")
 async def run_concurrent_test(
     test_name: str,
-    concurrent_users: int = 10,
-    duration_seconds: int = 60,
+    concurrent_users: Optional[int] = None,
+    duration_seconds: Optional[int] = None,
+    load_model: Optional[str] = None,
+    arrival_rate: Optional[float] = None,
+    arrival_profile: Optional[str] = None,
+    use_cache: bool = False,
     background_tasks: BackgroundTasks = None
 ):
-    """Run concurrent user simulation test"""
+    """Run concurrent user simulation test; unset options come from the scenario"""
+    if load_model is not None and load_model not in ("open", "closed"):
+        raise HTTPException(status_code=400, detail=f"Unknown load model: {load_model}")
+    if arrival_profile is not None and arrival_profile not in ARRIVAL_PROFILES:
+        raise HTTPException(status_code=400, detail=f"Unknown arrival profile: {arrival_profile}")
+    
     try:
+        # Get the performance analyzer from the FastAPI app state
+        from main import app
+        performance_analyzer = app.state.performance_analyzer
+        options = performance_analyzer.resolve_concurrency(
+            test_name, concurrent_users, duration_seconds, load_model, arrival_rate, arrival_profile
+        )
+        
+        if background_tasks:
+            background_tasks.add_task(
+                performance_analyzer.run_concurrent_and_record,
+                test_name, options["concurrent_users"], options["duration_seconds"],
+                load_model=options["load_model"], arrival_rate=options["arrival_rate"],
+                arrival_profile=options["arrival_profile"], use_cache=use_cache
+            )
+        
         return {
             "status": "started",
             "test_name": test_name,
-            "concurrent_users": concurrent_users,
-            "duration_seconds": duration_seconds,
+            **options,
+            "use_cache": use_cache,
             "message": f"Concurrent test '{test_name}' started"
         }
     except Exception as e:
         logger.error(f"Failed to start concurrent test {test_name}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/run-streaming-test")
+async def run_streaming_test(
+    iterations: int = 3,
+    row_limit: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    compare_buffered: bool = True,
+    background_tasks: BackgroundTasks = None
+):
+    """Run the large-scan streaming test (time-to-first-row and rows/second)"""
+    try:
+        # Get the performance analyzer from the FastAPI app state
+        from main import app
+        performance_analyzer = app.state.performance_analyzer
+        
+        if background_tasks:
+            background_tasks.add_task(
+                performance_analyzer.run_streaming_test,
+                iterations, row_limit, batch_size, compare_buffered
+            )
+        
+        return {
+            "status": "started",
+            "iterations": iterations,
+            "row_limit": row_limit or settings.TEST_STREAM_ROW_LIMIT,
+            "batch_size": batch_size or settings.STREAM_BATCH_SIZE,
+            "compare_buffered": compare_buffered,
+            "message": "Streaming scan test started"
+        }
+    except Exception as e:
+        logger.error(f"Failed to start streaming test: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/run-pagination-test")
+async def run_pagination_test(
+    table: str = "customers",
+    pages: Optional[int] = None,
+    page_size: Optional[int] = None,
+    walks: int = 3,
+    strategy: Optional[str] = None,
+    background_tasks: BackgroundTasks = None
+):
+    """Run the pagination depth test (page latency vs depth, OFFSET vs keyset)"""
+    if table not in PAGINATION_TARGETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown table '{table}'. Use one of: {', '.join(PAGINATION_TARGETS)}"
+        )
+    if strategy is not None and strategy not in PAGINATION_STRATEGIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown strategy '{strategy}'. Use one of: {', '.join(PAGINATION_STRATEGIES)}"
+        )
+    
+    try:
+        # Get the performance analyzer from the FastAPI app state
+        from main import app
+        performance_analyzer = app.state.performance_analyzer
+        
+        strategies = [strategy] if strategy else list(PAGINATION_STRATEGIES)
+        if background_tasks:
+            background_tasks.add_task(
+                performance_analyzer.run_pagination_test,
+                table, pages, page_size, walks, strategies
+            )
+        
+        return {
+            "status": "started",
+            "table": table,
+            "pages": pages or settings.TEST_PAGINATION_PAGES,
+            "page_size": page_size or settings.TEST_PAGINATION_PAGE_SIZE,
+            "walks": walks,
+            "strategies": strategies,
+            "message": "Pagination depth test started"
+        }
+    except Exception as e:
+        logger.error(f"Failed to start pagination test: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/run-batching-test/{test_name}")
+async def run_batching_test(
+    test_name: str,
+    batch_size: Optional[int] = None,
+    iterations: int = 10,
+    mode: Optional[str] = None,
+    background_tasks: BackgroundTasks = None
+):
+    """Run the batching test: N operations per round trip vs N separate GraphQL and SQL calls"""
+    modes = [f"graphql_{m}" for m in GRAPHQL_BATCH_MODES] + [f"sql_{m}" for m in SQL_BATCH_MODES]
+    if mode is not None and mode not in modes:
+        raise HTTPException(status_code=400, detail=f"Unknown batching mode '{mode}'. Use one of: {', '.join(modes)}")
+    
+    try:
+        # Get the performance analyzer from the FastAPI app state
+        from main import app
+        performance_analyzer = app.state.performance_analyzer
+        
+        if test_name not in performance_analyzer.test_queries:
+            raise HTTPException(status_code=404, detail=f"Unknown test: {test_name}")
+        
+        if background_tasks:
+            background_tasks.add_task(
+                performance_analyzer.run_batching_test,
+                test_name, batch_size, iterations, [mode] if mode else None
+            )
+        
+        return {
+            "status": "started",
+            "test_name": test_name,
+            "batch_size": batch_size or settings.TEST_GRAPHQL_BATCH_SIZE,
+            "iterations": iterations,
+            "modes": [mode] if mode else modes,
+            "message": f"Batching test for '{test_name}' started"
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to start batching test: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/run-cache-tier-test/{test_name}")
+async def run_cache_tier_test(
+    test_name: str,
+    iterations: Optional[int] = None,
+    background_tasks: BackgroundTasks = None
+):
+    """Run the cache tier test: no cache vs in-process L1 vs Redis L2 vs L1+L2"""
+    try:
+        # Get the performance analyzer from the FastAPI app state
+        from main import app
+        performance_analyzer = app.state.performance_analyzer
+        
+        if test_name not in performance_analyzer.test_queries:
+            raise HTTPException(status_code=404, detail=f"Unknown test: {test_name}")
+        
+        if background_tasks:
+            background_tasks.add_task(performance_analyzer.run_cache_tier_test, test_name, iterations)
+        
+        return {
+            "status": "started",
+            "test_name": test_name,
+            "iterations": iterations or performance_analyzer.test_queries[test_name].get("iterations", 10),
+            "configs": ["none", *CACHE_TIERS],
+            "message": f"Cache tier test for '{test_name}' started"
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to start cache tier test: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/run-cache-codec-test/{test_name}")
+async def run_cache_codec_test(
+    test_name: str,
+    iterations: int = 20,
+    background_tasks: BackgroundTasks = None
+):
+    """Compare cache codecs (encode/decode time, size, Redis memory) on a test's results"""
+    try:
+        # Get the performance analyzer from the FastAPI app state
+        from main import app
+        performance_analyzer = app.state.performance_analyzer
+        
+        if test_name not in performance_analyzer.test_queries:
+            raise HTTPException(status_code=404, detail=f"Unknown test: {test_name}")
+        
+        if background_tasks:
+            background_tasks.add_task(performance_analyzer.run_cache_codec_test, test_name, iterations)
+        
+        return {
+            "status": "started",
+            "test_name": test_name,
+            "iterations": iterations,
+            "codecs": [f"{c}+{z}" for c in available_codecs() for z in available_compressions()],
+            "message": f"Cache codec test for '{test_name}' started"
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to start cache codec test: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/run-cache-refresh-test/{test_name}")
+async def run_cache_refresh_test(
+    test_name: str,
+    duration_seconds: int = 60,
+    ttl_seconds: int = 5,
+    concurrent_users: int = 10,
+    early_refresh_beta: float = 1.0,
+    background_tasks: BackgroundTasks = None
+):
+    """Compare p99 latency under hard TTL, stale-while-revalidate and early refresh"""
+    if ttl_seconds < 1 or duration_seconds < 1 or concurrent_users < 1:
+        raise HTTPException(status_code=400, detail="ttl_seconds, duration_seconds and concurrent_users must be positive")
+    
+    try:
+        # Get the performance analyzer from the FastAPI app state
+        from main import app
+        performance_analyzer = app.state.performance_analyzer
+        
+        if test_name not in performance_analyzer.test_queries:
+            raise HTTPException(status_code=404, detail=f"Unknown test: {test_name}")
+        
+        if background_tasks:
+            background_tasks.add_task(
+                performance_analyzer.run_cache_refresh_test,
+                test_name, duration_seconds, ttl_seconds, concurrent_users, early_refresh_beta
+            )
+        
+        return {
+            "status": "started",
+            "test_name": test_name,
+            "duration_seconds": duration_seconds,
+            "ttl_seconds": ttl_seconds,
+            "concurrent_users": concurrent_users,
+            "early_refresh_beta": early_refresh_beta,
+            "message": f"Cache refresh test for '{test_name}' started"
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to start cache refresh test: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.post("/run-all-tests")
 async def run_all_tests(background_tasks: BackgroundTasks):
     """Run comprehensive performance test suite"""
@@ -125,43 +414,147 @@ async def get_test_status():
         }
 
 @router.get("/results")
-async def get_test_results(limit: int = 50):
-    """Get performance test results"""
+async def get_test_results(
+    limit: int = 50,
+    offset: int = 0,
+    test_name: Optional[str] = None,
+    cache_mode: Optional[str] = None,
+    variant: Optional[str] = None,
+    run_id: Optional[int] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None
+):
+    """Get stored performance test results, newest first"""
     try:
-        # Get the performance analyzer from the FastAPI app state
+        # Get the result store from the FastAPI app state
         from main import app
-        performance_analyzer = app.state.performance_analyzer
+        result_store = app.state.result_store
         
-        results = performance_analyzer.get_test_results()
+        page = await result_store.get_results(
+            limit=limit, offset=offset, test_name=test_name, cache_mode=cache_mode,
+            variant=variant, run_id=run_id, since=since, until=until
+        )
         
         return {
-            "results": results[-limit:] if len(results) > limit else results,
-            "total_results": len(results),
-            "limit": limit
+            "results": page["results"],
+            "total_results": page["total_results"],
+            "limit": limit,
+            "offset": offset
         }
     except Exception as e:
         logger.error(f"Failed to get test results: {e}")
         return {
             "results": [],
             "total_results": 0,
-            "limit": limit
+            "limit": limit,
+            "offset": offset
+        }
+
+@router.get("/runs")
+async def get_test_runs(limit: int = 50, offset: int = 0):
+    """Get stored test runs, newest first"""
+    try:
+        from main import app
+        result_store = app.state.result_store
+        
+        return {
+            "runs": await result_store.get_runs(limit=limit, offset=offset),
+            "limit": limit,
+            "offset": offset
         }
+    except Exception as e:
+        logger.error(f"Failed to get test runs: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/histograms")
+async def get_latency_histograms():
+    """Get streaming latency histogram summaries per test, engine and cache mode"""
+    try:
+        from main import app
+        performance_analyzer = app.state.performance_analyzer
+        
+        return {"histograms": performance_analyzer.get_latency_histograms()}
+    except Exception as e:
+        logger.error(f"Failed to get latency histograms: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/verify-equivalence")
+async def verify_equivalence(test_name: Optional[str] = None, param_mode: Optional[str] = None,
+                             seed: Optional[int] = None):
+    """Check that SQL and GraphQL return equivalent payloads (one test, or all)"""
+    if param_mode is not None and param_mode not in PARAM_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown parameter mode: {param_mode}")
+    
+    try:
+        from main import app
+        performance_analyzer = app.state.performance_analyzer
+        
+        if test_name:
+            if test_name not in performance_analyzer.test_queries:
+                raise HTTPException(status_code=404, detail=f"Unknown test: {test_name}")
+            checks = {test_name: await performance_analyzer.verify_equivalence(test_name, param_mode, seed)}
+        else:
+            checks = await performance_analyzer.verify_all_equivalence(param_mode, seed)
+        
+        return {
+            "checks": checks,
+            "non_equivalent": [name for name, check in checks.items() if check["equivalent"] is False],
+            "failed": [name for name, check in checks.items() if check["equivalent"] is None]
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to verify payload equivalence: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/equivalence")
+async def get_equivalence_checks():
+    """Get the latest SQL/GraphQL payload equivalence check per test"""
+    try:
+        from main import app
+        performance_analyzer = app.state.performance_analyzer
+        
+        return {"checks": performance_analyzer.equivalence_checks}
+    except Exception as e:
+        logger.error(f"Failed to get equivalence checks: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/results/{test_name}")
-async def get_test_results_by_name(test_name: str):
+async def get_test_results_by_name(test_name: str, limit: int = 50, offset: int = 0):
     """Get results for a specific test"""
-    return {
-        "test_name": test_name,
-        "results": []
-    }
+    try:
+        from main import app
+        result_store = app.state.result_store
+        
+        page = await result_store.get_results(limit=limit, offset=offset, test_name=test_name)
+        
+        return {
+            "test_name": test_name,
+            "results": page["results"],
+            "total_results": page["total_results"],
+            "limit": limit,
+            "offset": offset
+        }
+    except Exception as e:
+        logger.error(f"Failed to get results for {test_name}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/results")
 async def clear_test_results():
     """Clear all test results"""
-    return {
-        "status": "success",
-        "message": "All test results cleared"
-    }
+    try:
+        from main import app
+        deleted = await app.state.result_store.clear()
+        app.state.performance_analyzer.test_results = []
+        
+        return {
+            "status": "success",
+            "message": "All test results cleared",
+            "deleted_results": deleted
+        }
+    except Exception as e:
+        logger.error(f"Failed to clear test results: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/system-stats")
 async def get_system_stats():
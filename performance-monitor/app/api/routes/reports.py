@@ -3,55 +3,121 @@ Reports API routes
 """
 
 from fastapi import APIRouter, HTTPException
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+def _engine_comparison(summary: List[Dict[str, Any]],
+                       equivalence: Optional[Dict[str, Optional[bool]]] = None) -> Dict[str, Dict[str, Any]]:
+    """Pair SQL and GraphQL summaries for each test, cache mode and run variant
+    
+    Only runs with the same settings are compared, see run_variant().
+    Tests whose payloads were found non-equivalent are flagged and get no winner,
+    since their latencies measure different work. A winner is only named when
+    every compared run found a significant difference between the engines.
+    """
+    equivalence = equivalence or {}
+    comparison = {}
+    for row in summary:
+        key = ":".join(filter(None, (row["test_name"], row["cache_mode"], row["variant"])))
+        entry = comparison.setdefault(key, {
+            "test_name": row["test_name"],
+            "cache_mode": row["cache_mode"],
+            "variant": row["variant"]
+        })
+        entry[f"{row['engine']}_avg_ms"] = row["avg_ms"]
+        entry[f"{row['engine']}_p95_ms"] = row["p95_ms"]
+        entry[f"{row['engine']}_p99_ms"] = row["p99_ms"]
+        entry["last_run_at"] = max(entry.get("last_run_at") or "", row["last_run_at"] or "")
+        entry["compared_runs"] = row["compared_count"]
+        entry["significant_runs"] = row["significant_count"]
+    
+    for entry in comparison.values():
+        entry["payload_equivalent"] = equivalence.get(entry["test_name"])
+        sql_avg = entry.get("sql_avg_ms")
+        graphql_avg = entry.get("graphql_avg_ms")
+        entry["significant"] = 0 < entry["compared_runs"] == entry["significant_runs"]
+        entry["winner"] = None
+        if sql_avg and graphql_avg and entry["payload_equivalent"] is not False:
+            if entry["significant"]:
+                entry["winner"] = "sql" if sql_avg < graphql_avg else "graphql"
+            entry["difference_percent"] = ((graphql_avg - sql_avg) / sql_avg) * 100
+    
+    return comparison
+
 @router.get("/summary")
-async def get_performance_summary():
+async def get_performance_summary(since: Optional[str] = None, until: Optional[str] = None):
     """Get performance test summary report"""
-    return {
-        "summary": {
-            "total_tests_run": 0,
-            "avg_sql_performance_ms": 0,
-            "avg_graphql_performance_ms": 0,
-            "cache_hit_rate_percent": 0,
-            "performance_improvement_with_cache": 0
-        },
-        "recommendations": [
-            "Enable query caching for frequently accessed data",
-            "Add database indexes for slow queries",
-            "Consider query optimization for complex joins"
-        ]
-    }
+    try:
+        from main import app
+        result_store = app.state.result_store
+        
+        summary = await result_store.get_engine_summary(since=since, until=until)
+        runs = await result_store.get_runs(limit=1)
+        
+        def weighted_avg(engine: str, cache_mode: str = None) -> float:
+            rows = [r for r in summary if r["engine"] == engine and r["avg_ms"] is not None
+                    and (cache_mode is None or r["cache_mode"] == cache_mode)]
+            samples = sum(r["sample_count"] or 0 for r in rows)
+            if not samples:
+                return 0
+            return sum(r["avg_ms"] * (r["sample_count"] or 0) for r in rows) / samples
+        
+        uncached = weighted_avg("sql", "uncached") + weighted_avg("graphql", "uncached")
+        cached = weighted_avg("sql", "cached") + weighted_avg("graphql", "cached")
+        
+        return {
+            "summary": {
+                "total_tests_run": sum(r["scenario_count"] for r in summary if r["engine"] == "sql"),
+                "avg_sql_performance_ms": weighted_avg("sql"),
+                "avg_graphql_performance_ms": weighted_avg("graphql"),
+                "performance_improvement_with_cache": ((uncached - cached) / uncached) * 100 if uncached and cached else 0,
+                "last_run": runs[0] if runs else None
+            },
+            "recommendations": [
+                "Enable query caching for frequently accessed data",
+                "Add database indexes for slow queries",
+                "Consider query optimization for complex joins"
+            ]
+        }
+    except Exception as e:
+        logger.error(f"Failed to build performance summary: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/comparison")
-async def get_sql_vs_graphql_comparison():
+async def get_sql_vs_graphql_comparison(
+    test_name: Optional[str] = None,
+    variant: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None
+):
     """Get detailed SQL vs GraphQL performance comparison"""
-    return {
-        "comparison": {
-            "simple_queries": {
-                "sql_avg_ms": 0,
-                "graphql_avg_ms": 0,
-                "winner": "sql",
-                "improvement_percent": 0
-            },
-            "complex_queries": {
-                "sql_avg_ms": 0,
-                "graphql_avg_ms": 0,
-                "winner": "sql",
-                "improvement_percent": 0
-            },
-            "with_cache": {
-                "sql_avg_ms": 0,
-                "graphql_avg_ms": 0,
-                "winner": "cache",
-                "improvement_percent": 0
+    try:
+        from main import app
+        result_store = app.state.result_store
+        performance_analyzer = app.state.performance_analyzer
+        
+        summary = await result_store.get_engine_summary(test_name=test_name, variant=variant,
+                                                        since=since, until=until)
+        equivalence = {
+            name: performance_analyzer.get_equivalence_status(name)
+            for name in performance_analyzer.equivalence_checks
+        }
+        
+        return {
+            "comparison": _engine_comparison(summary, equivalence),
+            "filters": {
+                "test_name": test_name,
+                "variant": variant,
+                "since": since,
+                "until": until
             }
         }
-    }
+    except Exception as e:
+        logger.error(f"Failed to build comparison report: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/cache-analysis")
 async def get_cache_analysis():
@@ -72,14 +138,34 @@ async def get_cache_analysis():
     }
 
 @router.get("/database-insights")
-async def get_database_insights():
-    """Get database performance insights"""
+async def get_database_insights(include_plan: bool = False, capture: bool = False):
+    """Get database performance insights
+    
+    query_plans holds the latest EXPLAIN (ANALYZE, BUFFERS) breakdown per test.
+    capture=true captures a fresh plan for every test before responding.
+    """
+    query_plans = {}
+    statement_cache = {}
+    try:
+        from main import app
+        performance_analyzer = app.state.performance_analyzer
+        statement_cache = app.state.db_manager.get_statement_cache_stats()
+        
+        if capture:
+            for test_name in performance_analyzer.test_queries:
+                await performance_analyzer.capture_query_plan(test_name)
+        query_plans = performance_analyzer.get_query_plans(include_plan=include_plan)
+    except Exception as e:
+        logger.error(f"Failed to get query plans: {e}")
+    
     return {
         "insights": {
             "slowest_queries": [],
             "index_usage": [],
             "table_statistics": [],
-            "connection_stats": {}
+            "connection_stats": {},
+            "statement_cache": statement_cache,
+            "query_plans": query_plans
         },
         "recommendations": [
             "Add indexes for frequently queried columns",
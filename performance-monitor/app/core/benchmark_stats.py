@@ -0,0 +1,80 @@
+"""
+Statistical helpers for comparing benchmark samples
+"""
+
+import math
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+def bootstrap_ci(samples: List[float], statistic: str = "mean", confidence: float = 0.95,
+                 resamples: int = 2000, seed: Optional[int] = None) -> Tuple[float, float]:
+    """Percentile bootstrap confidence interval for the mean or median"""
+    if not samples:
+        return (0.0, 0.0)
+    if len(samples) == 1:
+        return (samples[0], samples[0])
+
+    rng = np.random.default_rng(seed)
+    values = np.asarray(samples, dtype=float)
+    draws = rng.choice(values, size=(resamples, len(values)), replace=True)
+    estimates = np.median(draws, axis=1) if statistic == "median" else draws.mean(axis=1)
+
+    tail = (1 - confidence) / 2 * 100
+    low, high = np.percentile(estimates, [tail, 100 - tail])
+    return (float(low), float(high))
+
+def bootstrap_difference_ci(a: List[float], b: List[float], confidence: float = 0.95,
+                            resamples: int = 2000, seed: Optional[int] = None) -> Tuple[float, float]:
+    """Bootstrap confidence interval for mean(b) - mean(a)"""
+    if not a or not b:
+        return (0.0, 0.0)
+
+    rng = np.random.default_rng(seed)
+    a_values = np.asarray(a, dtype=float)
+    b_values = np.asarray(b, dtype=float)
+    a_means = rng.choice(a_values, size=(resamples, len(a_values)), replace=True).mean(axis=1)
+    b_means = rng.choice(b_values, size=(resamples, len(b_values)), replace=True).mean(axis=1)
+
+    tail = (1 - confidence) / 2 * 100
+    low, high = np.percentile(b_means - a_means, [tail, 100 - tail])
+    return (float(low), float(high))
+
+def mann_whitney_u(a: List[float], b: List[float]) -> Dict[str, float]:
+    """Two-sided Mann-Whitney U test (normal approximation with tie correction)
+
+    Latency samples are skewed and heavy-tailed, so a rank test is used rather
+    than a t-test on the means.
+    """
+    n1, n2 = len(a), len(b)
+    if n1 == 0 or n2 == 0:
+        return {"u_statistic": 0.0, "p_value": 1.0}
+
+    combined = np.concatenate([np.asarray(a, dtype=float), np.asarray(b, dtype=float)])
+    order = combined.argsort(kind="mergesort")
+    ranks = np.empty(len(combined))
+
+    # Average ranks for ties
+    sorted_values = combined[order]
+    i = 0
+    tie_term = 0.0
+    while i < len(sorted_values):
+        j = i
+        while j + 1 < len(sorted_values) and sorted_values[j + 1] == sorted_values[i]:
+            j += 1
+        ranks[order[i:j + 1]] = (i + j) / 2 + 1
+        tied = j - i + 1
+        tie_term += tied ** 3 - tied
+        i = j + 1
+
+    u1 = ranks[:n1].sum() - n1 * (n1 + 1) / 2
+    u = min(u1, n1 * n2 - u1)
+
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return {"u_statistic": float(u), "p_value": 1.0}
+
+    z = (abs(u - n1 * n2 / 2) - 0.5) / math.sqrt(variance)
+    p_value = math.erfc(max(z, 0.0) / math.sqrt(2))
+    return {"u_statistic": float(u), "p_value": min(p_value, 1.0)}
@@ -2,37 +2,95 @@
 Redis cache management for performance optimization
 """
 
+import asyncio
 import json
 import logging
+import math
+import random
 import time
-from typing import Any, Dict, List, Optional, Union
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
 import hashlib
 
 import redis.asyncio as redis
 
+from core.cache_codecs import CacheCodec, benchmark_codecs, decode_entry
 from core.config import settings
+from core.local_cache import LocalCache
+from core.metrics import cache_get_duration_seconds, cache_single_flight_total
+from core.timing import elapsed_ms, elapsed_ns, now_ns, ns_to_ms, ns_to_seconds
 
 logger = logging.getLogger(__name__)
 
+# Cache tier configurations: in-process LRU only, Redis only, or the LRU in front of Redis
+CACHE_TIERS = ("l1", "l2", "l1+l2")
+
+# Coalescing of concurrent misses on one key: disabled, within this process, or
+# across workers with a Redis lock (which also coalesces within the process)
+SINGLE_FLIGHT_MODES = ("off", "local", "redis")
+
+# Per-query expiry settings; unset fields default to CACHE_TTL_SECONDS,
+# CACHE_STALE_SECONDS and CACHE_EARLY_REFRESH_BETA
+CACHE_POLICY_FIELDS = ("ttl_seconds", "stale_seconds", "early_refresh_beta")
+
+# Releases a single-flight lock only if it is still held by the given token
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
 class CacheManager:
-    """Manages Redis cache operations"""
+    """Manages Redis cache operations
+    
+    An optional in-process L1 cache (LocalCache) can sit in front of Redis (L2),
+    selected by CACHE_TIERS or per call. L1 entries expire when the Redis copy
+    does, and an L2 hit fills L1 for the entry's remaining TTL.
+    
+    Entries are encoded with CACHE_CODEC and CACHE_COMPRESSION (see CacheCodec);
+    each entry records its codec, so entries written with another codec still decode.
+    
+    single_flight() makes concurrent misses on one key share a single execution
+    (CACHE_SINGLE_FLIGHT).
+    
+    Entries stay readable for stale_seconds past their TTL. Hits report a
+    cache_state: "fresh", "stale" (past the TTL, served while
+    refresh_in_background() reloads it) or "early_refresh" (still fresh, but
+    picked for refresh by XFetch's probabilistic early expiration).
+    """
     
     def __init__(self):
         self.redis_client: Optional[redis.Redis] = None
+        self.tiers = settings.CACHE_TIERS
+        self.local_cache = LocalCache(settings.L1_CACHE_MAX_BYTES)
+        self.codec = CacheCodec(
+            settings.CACHE_CODEC,
+            settings.CACHE_COMPRESSION,
+            settings.CACHE_COMPRESSION_MIN_BYTES
+        )
         self.cache_stats = {
             "hits": 0,
             "misses": 0,
             "sets": 0,
             "deletes": 0
         }
+        self.l2_stats = {"hits": 0, "misses": 0}
+        self.single_flight_mode = settings.CACHE_SINGLE_FLIGHT
+        if self.single_flight_mode not in SINGLE_FLIGHT_MODES:
+            raise ValueError(f"Unknown single-flight mode: {self.single_flight_mode}")
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.single_flight_stats = {"leader": 0, "coalesced": 0, "remote": 0, "lock_timeouts": 0}
+        self.refresh_stats = {"stale": 0, "early_refresh": 0, "refreshes": 0, "refresh_failures": 0}
+        self._refreshing = set()
+        self._refresh_tasks = set()
     
     async def connect(self):
         """Connect to Redis"""
         try:
             self.redis_client = redis.from_url(
                 settings.REDIS_URL,
-                encoding="utf-8",
-                decode_responses=True,
+                decode_responses=False,
                 socket_connect_timeout=5,
                 socket_timeout=5,
                 retry_on_timeout=True
@@ -47,7 +105,12 @@ class CacheManager:
             raise
     
     async def disconnect(self):
-        """Disconnect from Redis"""
+        """Cancel background refreshes and disconnect from Redis"""
+        tasks = list(self._refresh_tasks)
+        for task in tasks:
+            task.cancel()
+        # Let cancelled refreshes unwind while Redis is still connected
+        await asyncio.gather(*tasks, return_exceptions=True)
         if self.redis_client:
             await self.redis_client.close()
         logger.info("Redis connection closed")
@@ -55,9 +118,9 @@ class CacheManager:
     async def health_check(self) -> Dict[str, Any]:
         """Check Redis health"""
         try:
-            start_time = time.time()
+            start_ns = now_ns()
             await self.redis_client.ping()
-            latency = (time.time() - start_time) * 1000
+            latency = elapsed_ms(start_ns)
             
             return {
                 "status": "healthy",
@@ -73,27 +136,103 @@ class CacheManager:
             "query": query,
             "params": params or []
         }
-        cache_string = json.dumps(cache_data, sort_keys=True)
+        cache_string = json.dumps(cache_data, sort_keys=True, default=str)
         cache_hash = hashlib.md5(cache_string.encode()).hexdigest()
         return f"{prefix}:{cache_hash}"
     
-    async def get_cached_query(self, query: str, params: List = None) -> Optional[Dict[str, Any]]:
-        """Get cached query result"""
+    def _resolve_tiers(self, tiers: Optional[str]) -> str:
+        tiers = tiers or self.tiers
+        if tiers not in CACHE_TIERS:
+            raise ValueError(f"Unknown cache tiers: {tiers}")
+        return tiers
+    
+    @staticmethod
+    def resolve_policy(policy: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Expiry settings of a query: its own policy fields over the CACHE_* defaults"""
+        return {
+            "ttl_seconds": settings.CACHE_TTL_SECONDS,
+            "stale_seconds": settings.CACHE_STALE_SECONDS,
+            "early_refresh_beta": settings.CACHE_EARLY_REFRESH_BETA,
+            **(policy or {})
+        }
+    
+    @staticmethod
+    def _entry_state(entry: Dict[str, Any]) -> Optional[str]:
+        """"fresh", "stale", "early_refresh", or None once the stale window has passed"""
+        now = time.time()
+        expires_at = entry["cached_at"] + entry["ttl"]
+        if now >= expires_at:
+            return "stale" if now < expires_at + entry.get("stale_seconds", 0) else None
+        
+        # XFetch: refresh early with a probability that rises towards expiry,
+        # sooner for entries that take longer to recompute
+        beta = entry.get("early_refresh_beta", 0)
+        compute_seconds = entry.get("compute_ms", 0) / 1000
+        if beta and compute_seconds and now - compute_seconds * beta * math.log(1.0 - random.random()) >= expires_at:
+            return "early_refresh"
+        return "fresh"
+    
+    def _hit(self, entry: Dict[str, Any], tier: str, codec: str, state: str,
+             retrieval_ns: int) -> Dict[str, Any]:
+        if state != "fresh":
+            self.refresh_stats[state] += 1
+        # A new dict per hit, so callers never modify the entry held in L1
+        return {
+            **entry,
+            "cache_hit": True,
+            "cache_tier": tier,
+            "cache_codec": codec,
+            "cache_state": state,
+            "cache_retrieval_time_ns": retrieval_ns,
+            "cache_retrieval_time_ms": ns_to_ms(retrieval_ns)
+        }
+    
+    async def get_cached_query(self, query: str, params: List = None,
+                               tiers: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Get cached query result
+        
+        tiers (default CACHE_TIERS) selects the lookup path. The retrieval time
+        covers the whole lookup, including decompressing and decoding the Redis entry.
+        Entries past their stale window count as misses.
+        """
+        tiers = self._resolve_tiers(tiers)
         try:
             cache_key = self._generate_cache_key("query", query, params)
             
-            start_time = time.time()
+            start_ns = now_ns()
+            if tiers != "l2":
+                cached = self.local_cache.get(cache_key)
+                state = self._entry_state(cached[0]) if cached is not None else None
+                if state is not None:
+                    entry, codec = cached
+                    retrieval_ns = elapsed_ns(start_ns)
+                    cache_get_duration_seconds.labels(tier="l1", result="hit").observe(ns_to_seconds(retrieval_ns))
+                    self.cache_stats["hits"] += 1
+                    return self._hit(entry, "l1", codec, state, retrieval_ns)
+                cache_get_duration_seconds.labels(tier="l1", result="miss").observe(ns_to_seconds(elapsed_ns(start_ns)))
+                if tiers == "l1":
+                    self.cache_stats["misses"] += 1
+                    return None
+            
+            l2_start_ns = now_ns()
             cached_data = await self.redis_client.get(cache_key)
-            retrieval_time = (time.time() - start_time) * 1000
+            entry, codec = decode_entry(cached_data) if cached_data else (None, None)
+            state = self._entry_state(entry) if entry is not None else None
             
-            if cached_data:
+            if state is not None:
+                retrieval_ns = elapsed_ns(start_ns)
+                cache_get_duration_seconds.labels(tier="l2", result="hit").observe(ns_to_seconds(elapsed_ns(l2_start_ns)))
                 self.cache_stats["hits"] += 1
-                result = json.loads(cached_data)
-                result["cache_hit"] = True
-                result["cache_retrieval_time_ms"] = round(retrieval_time, 2)
-                return result
+                self.l2_stats["hits"] += 1
+                if tiers == "l1+l2":
+                    # Expire the L1 copy together with the Redis entry
+                    remaining = entry["cached_at"] + entry["ttl"] + entry.get("stale_seconds", 0) - time.time()
+                    self.local_cache.set(cache_key, (entry, codec), len(cached_data), remaining)
+                return self._hit(entry, "l2", codec, state, retrieval_ns)
             else:
+                cache_get_duration_seconds.labels(tier="l2", result="miss").observe(ns_to_seconds(elapsed_ns(l2_start_ns)))
                 self.cache_stats["misses"] += 1
+                self.l2_stats["misses"] += 1
                 return None
                 
         except Exception as e:
@@ -101,38 +240,168 @@ class CacheManager:
             self.cache_stats["misses"] += 1
             return None
     
+    def _encode_entry(self, result: Any, ttl: Optional[int], policy: Optional[Dict[str, Any]],
+                      compute_ms: float) -> Tuple[bytes, int]:
+        """Encoded cache entry and how many seconds to keep it"""
+        policy = self.resolve_policy(policy)
+        cache_ttl = ttl or policy["ttl_seconds"]
+        cache_data = {
+            "data": result,
+            "cached_at": time.time(),
+            "ttl": cache_ttl,
+            "stale_seconds": policy["stale_seconds"],
+            "early_refresh_beta": policy["early_refresh_beta"],
+            "compute_ms": compute_ms
+        }
+        # Entries are kept through the stale window, during which they are served while refreshing
+        return self.codec.encode(cache_data), math.ceil(cache_ttl + policy["stale_seconds"])
+    
     async def cache_query_result(self, query: str, result: Dict[str, Any], 
-                                params: List = None, ttl: int = None) -> bool:
-        """Cache query result"""
+                                params: List = None, ttl: int = None,
+                                tiers: Optional[str] = None,
+                                policy: Optional[Dict[str, Any]] = None,
+                                compute_ms: float = 0) -> bool:
+        """Cache query result in the selected tiers (default CACHE_TIERS)
+        
+        policy holds the query's expiry settings (see resolve_policy()); an
+        explicit ttl overrides its ttl_seconds. compute_ms, the time the result
+        took to produce, scales early refresh.
+        """
+        tiers = self._resolve_tiers(tiers)
         try:
             cache_key = self._generate_cache_key("query", query, params)
-            cache_ttl = ttl or settings.CACHE_TTL_SECONDS
+            payload, retention = self._encode_entry(result, ttl, policy, compute_ms)
             
-            cache_data = {
-                "data": result,
-                "cached_at": time.time(),
-                "ttl": cache_ttl
-            }
-            
-            start_time = time.time()
-            await self.redis_client.setex(
-                cache_key,
-                cache_ttl,
-                json.dumps(cache_data, default=str)
-            )
-            storage_time = (time.time() - start_time) * 1000
+            start_ns = now_ns()
+            if tiers != "l1":
+                await self.redis_client.setex(cache_key, retention, payload)
+            if tiers != "l2":
+                # Store the decoded payload so L1 hits return exactly what an L2 hit would
+                self.local_cache.set(cache_key, decode_entry(payload), len(payload), retention)
+            storage_time = elapsed_ms(start_ns)
             
             self.cache_stats["sets"] += 1
-            logger.debug(f"Cached query result in {storage_time:.2f}ms")
+            logger.debug(f"Cached query result in {storage_time:.2f}ms ({tiers})")
             return True
             
         except Exception as e:
             logger.error(f"Error caching query result: {e}")
             return False
     
+    async def single_flight(self, query: str, params: List, load: Callable[[], Awaitable[Any]],
+                            tiers: Optional[str] = None) -> Tuple[Any, str]:
+        """Run load() once for concurrent misses on a query's cache key
+        
+        Returns the result and the caller's role: "leader" ran load(),
+        "coalesced" shared the result of a leader in this process, and "remote"
+        (redis mode) got the entry another worker cached while holding the lock,
+        as returned by get_cached_query(). Callers coalesced onto a leader that
+        got a remote entry are "remote" too, since they get the same entry.
+        load() is expected to cache its result. If the leader is cancelled, one
+        of its followers becomes the new leader.
+        """
+        if self.single_flight_mode == "off":
+            return await load(), "leader"
+        
+        cache_key = self._generate_cache_key("query", query, params)
+        while cache_key in self._in_flight:
+            in_flight = self._in_flight[cache_key]
+            self.single_flight_stats["coalesced"] += 1
+            cache_single_flight_total.labels(role="coalesced").inc()
+            try:
+                # shield: a cancelled follower must not cancel the leader's shared future
+                result, leader_role = await asyncio.shield(in_flight)
+            except asyncio.CancelledError:
+                if not in_flight.cancelled():
+                    raise
+                # The leader was cancelled; the first follower to wake up loads instead
+                continue
+            return result, "coalesced" if leader_role == "leader" else leader_role
+        
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[cache_key] = future
+        try:
+            if self.single_flight_mode == "redis":
+                result, role = await self._load_with_lock(cache_key, query, params, load, tiers)
+            else:
+                result, role = await load(), "leader"
+            self.single_flight_stats[role] += 1
+            cache_single_flight_total.labels(role=role).inc()
+            future.set_result((result, role))
+            return result, role
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception retrieved when no follower was waiting
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[cache_key]
+    
+    def refresh_in_background(self, query: str, params: List, load: Callable[[], Awaitable[Any]],
+                              tiers: Optional[str] = None) -> bool:
+        """Reload a stale or early-refresh entry with load() in a background task
+        
+        Returns False if a refresh of the entry is already running. The refresh
+        goes through single_flight(), so it also coalesces with concurrent misses.
+        """
+        cache_key = self._generate_cache_key("query", query, params)
+        if cache_key in self._refreshing:
+            return False
+        self._refreshing.add(cache_key)
+        task = asyncio.create_task(self._refresh(cache_key, query, params, load, tiers))
+        # Keep a reference so the task is not garbage collected while running
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+        return True
+    
+    async def _refresh(self, cache_key: str, query: str, params: List,
+                       load: Callable[[], Awaitable[Any]], tiers: Optional[str]):
+        try:
+            result, _ = await self.single_flight(query, params, load, tiers)
+            if isinstance(result, dict) and "error" in result:
+                raise RuntimeError(result["error"])
+            self.refresh_stats["refreshes"] += 1
+        except Exception as e:
+            self.refresh_stats["refresh_failures"] += 1
+            logger.error(f"Background refresh of {cache_key} failed: {e}")
+        finally:
+            self._refreshing.discard(cache_key)
+    
+    async def _load_with_lock(self, cache_key: str, query: str, params: List,
+                              load: Callable[[], Awaitable[Any]],
+                              tiers: Optional[str]) -> Tuple[Any, str]:
+        """Run load() under a Redis lock, or wait for the lock holder to cache the result"""
+        lock_key = f"lock:{cache_key}"
+        token = uuid.uuid4().hex
+        lock_ttl_ms = settings.CACHE_LOCK_TTL_MS
+        deadline_ns = now_ns() + lock_ttl_ms * 1_000_000
+        
+        while not await self.redis_client.set(lock_key, token, nx=True, px=lock_ttl_ms):
+            await asyncio.sleep(settings.CACHE_LOCK_POLL_MS / 1000)
+            cached = await self.get_cached_query(query, params, tiers)
+            if cached:
+                return cached, "remote"
+            if now_ns() >= deadline_ns:
+                # The holder neither cached a result nor released the lock in time
+                self.single_flight_stats["lock_timeouts"] += 1
+                logger.warning(f"Timed out waiting for single-flight lock {lock_key}")
+                return await load(), "leader"
+        
+        try:
+            return await load(), "leader"
+        finally:
+            try:
+                await self.redis_client.eval(_RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+            except Exception as e:
+                logger.error(f"Error releasing single-flight lock {lock_key}: {e}")
+    
     async def invalidate_cache_pattern(self, pattern: str) -> int:
         """Invalidate cache entries matching pattern"""
         try:
+            self.local_cache.delete_matching(pattern)
             keys = await self.redis_client.keys(pattern)
             if keys:
                 deleted = await self.redis_client.delete(*keys)
@@ -157,6 +426,15 @@ class CacheManager:
                 "sets": self.cache_stats["sets"],
                 "deletes": self.cache_stats["deletes"],
                 "hit_rate_percent": round(hit_rate, 2),
+                "cache_tiers": self.tiers,
+                "cache_codec": self.codec.name,
+                "single_flight_mode": self.single_flight_mode,
+                "single_flight": self.single_flight_stats,
+                "refresh": self.refresh_stats,
+                "tiers": {
+                    "l1": self.local_cache.get_stats(),
+                    "l2": self.l2_stats
+                },
                 "memory_used_bytes": info.get("used_memory", 0),
                 "memory_used_human": info.get("used_memory_human", "0B"),
                 "keyspace_hits": info.get("keyspace_hits", 0),
@@ -166,49 +444,90 @@ class CacheManager:
             logger.error(f"Error getting cache stats: {e}")
             return self.cache_stats
     
+    async def benchmark_codecs(self, value: Any, iterations: int = 20) -> Dict[str, Dict[str, Any]]:
+        """Compare cache codecs on a value: encode/decode time, encoded size and Redis memory
+        
+        Each encoding is written once under a temporary key to read its MEMORY USAGE.
+        """
+        results = benchmark_codecs(value, iterations, settings.CACHE_COMPRESSION_MIN_BYTES)
+        for name, result in results.items():
+            codec, compression = name.split("+")
+            key = f"codec_benchmark:{name}"
+            try:
+                encoded = CacheCodec(codec, compression, settings.CACHE_COMPRESSION_MIN_BYTES).encode(value)
+                await self.redis_client.setex(key, 60, encoded)
+                result["redis_memory_bytes"] = await self.redis_client.memory_usage(key)
+                await self.redis_client.delete(key)
+            except Exception as e:
+                logger.error(f"Error measuring Redis memory for codec {name}: {e}")
+                result["redis_memory_bytes"] = None
+        return results
+    
     async def clear_all_cache(self) -> bool:
         """Clear all cache entries"""
         try:
             await self.redis_client.flushdb()
+            self.local_cache.clear()
             self.cache_stats = {
                 "hits": 0,
                 "misses": 0,
                 "sets": 0,
                 "deletes": 0
             }
+            self.l2_stats = {"hits": 0, "misses": 0}
+            self.single_flight_stats = {"leader": 0, "coalesced": 0, "remote": 0, "lock_timeouts": 0}
+            self.refresh_stats = {"stale": 0, "early_refresh": 0, "refreshes": 0, "refresh_failures": 0}
             logger.info("All cache cleared")
             return True
         except Exception as e:
             logger.error(f"Error clearing cache: {e}")
             return False
     
-    async def warm_cache(self, queries: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Warm cache with predefined queries"""
-        warmed = 0
-        failed = 0
+    async def warm_cache(self, entries: List[Dict[str, Any]], tiers: Optional[str] = None) -> Dict[str, Any]:
+        """Store already computed query results under their query cache keys
         
-        for query_info in queries:
+        Each entry has "query", "params" and "data", and optionally "ttl",
+        "policy" and "compute_ms" as in cache_query_result(). Redis writes are
+        sent in one pipelined round trip. Entries that fail to encode or to be
+        written are skipped; compute_ms in the result sums the entries stored.
+        """
+        tiers = self._resolve_tiers(tiers)
+        encoded = []
+        for entry in entries:
             try:
-                query = query_info["query"]
-                params = query_info.get("params", [])
-                ttl = query_info.get("ttl", settings.CACHE_TTL_SECONDS)
-                
-                # This would normally execute the query and cache result
-                # For now, we'll just simulate caching
-                cache_key = self._generate_cache_key("warm", query, params)
-                await self.redis_client.setex(
-                    cache_key,
-                    ttl,
-                    json.dumps({"warmed": True}, default=str)
+                cache_key = self._generate_cache_key("query", entry["query"], entry.get("params"))
+                compute_ms = entry.get("compute_ms", 0)
+                payload, retention = self._encode_entry(
+                    entry["data"], entry.get("ttl"), entry.get("policy"), compute_ms
                 )
-                warmed += 1
-                
+                encoded.append((cache_key, payload, retention, compute_ms))
+            except Exception as e:
+                logger.error(f"Failed to encode warm cache entry: {e}")
+        
+        start_ns = now_ns()
+        stored = encoded
+        if tiers != "l1" and encoded:
+            try:
+                async with self.redis_client.pipeline(transaction=False) as pipe:
+                    for cache_key, payload, retention, _ in encoded:
+                        pipe.setex(cache_key, retention, payload)
+                    replies = await pipe.execute(raise_on_error=False)
+                stored = [item for item, reply in zip(encoded, replies) if not isinstance(reply, Exception)]
+                if len(stored) < len(encoded):
+                    logger.error(f"Failed to write {len(encoded) - len(stored)} warm cache entries")
             except Exception as e:
-                logger.error(f"Failed to warm cache for query: {e}")
-                failed += 1
+                logger.error(f"Failed to write warm cache entries: {e}")
+                stored = []
+        if tiers != "l2":
+            for cache_key, payload, retention, _ in stored:
+                self.local_cache.set(cache_key, decode_entry(payload), len(payload), retention)
         
+        self.cache_stats["sets"] += len(stored)
         return {
-            "warmed": warmed,
-            "failed": failed,
-            "total": len(queries)
+            "warmed": len(stored),
+            "failed": len(entries) - len(stored),
+            "total": len(entries),
+            "bytes": sum(len(payload) for _, payload, _, _ in stored),
+            "compute_ms": sum(compute_ms for _, _, _, compute_ms in stored),
+            "write_time_ms": elapsed_ms(start_ns)
         }
@@ -0,0 +1,214 @@
+"""
+Serialization and compression of cache entries
+"""
+
+import datetime
+import json
+import uuid
+import zlib
+from decimal import Decimal
+from typing import Any, Dict, Tuple
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+from core.timing import elapsed_ns, now_ns, ns_to_ms
+
+# Serialization formats for cached values
+CACHE_CODECS = ("json", "msgpack")
+
+# Compression applied to encoded values of at least the configured size
+CACHE_COMPRESSIONS = ("none", "zlib", "zstd", "lz4")
+
+# Every entry starts with "<codec>+<compression>\n", so entries stay readable
+# after the configured codec changes
+_HEADER_END = b"\n"
+
+# Types that json and msgpack cannot represent natively, with their msgpack
+# extension type codes. Values are stored as strings and restored on decode.
+_EXT_TYPES = {
+    "datetime": 1,
+    "date": 2,
+    "time": 3,
+    "timedelta": 4,
+    "decimal": 5,
+    "uuid": 6
+}
+_EXT_NAMES = {code: name for name, code in _EXT_TYPES.items()}
+
+def available_codecs() -> Tuple[str, ...]:
+    """Cache codecs that are installed"""
+    return tuple(c for c in CACHE_CODECS if c != "msgpack" or msgpack is not None)
+
+def available_compressions() -> Tuple[str, ...]:
+    """Compressions that are installed"""
+    installed = {"zstd": zstandard, "lz4": lz4}
+    return tuple(c for c in CACHE_COMPRESSIONS if installed.get(c, True) is not None)
+
+def check_cache_codec(codec: str, compression: str):
+    """Raise ValueError if a codec or compression is unknown or not installed"""
+    if codec not in CACHE_CODECS:
+        raise ValueError(f"Unknown cache codec: {codec}")
+    if codec not in available_codecs():
+        raise ValueError(f"Cache codec '{codec}' needs the msgpack package")
+    if compression not in CACHE_COMPRESSIONS:
+        raise ValueError(f"Unknown cache compression: {compression}")
+    if compression not in available_compressions():
+        package = "zstandard" if compression == "zstd" else "lz4"
+        raise ValueError(f"Cache compression '{compression}' needs the {package} package")
+
+def _to_tagged(value: Any) -> Tuple[str, str]:
+    """Type name and string form of a value json/msgpack cannot store"""
+    if isinstance(value, datetime.datetime):
+        return "datetime", value.isoformat()
+    if isinstance(value, datetime.date):
+        return "date", value.isoformat()
+    if isinstance(value, datetime.time):
+        return "time", value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return "timedelta", f"{value.days},{value.seconds},{value.microseconds}"
+    if isinstance(value, Decimal):
+        return "decimal", str(value)
+    if isinstance(value, uuid.UUID):
+        return "uuid", str(value)
+    raise TypeError(type(value).__name__)
+
+def _from_tagged(name: str, text: str) -> Any:
+    if name == "datetime":
+        return datetime.datetime.fromisoformat(text)
+    if name == "date":
+        return datetime.date.fromisoformat(text)
+    if name == "time":
+        return datetime.time.fromisoformat(text)
+    if name == "timedelta":
+        days, seconds, microseconds = (int(part) for part in text.split(","))
+        return datetime.timedelta(days=days, seconds=seconds, microseconds=microseconds)
+    if name == "decimal":
+        return Decimal(text)
+    return uuid.UUID(text)
+
+def _json_default(value: Any) -> Any:
+    try:
+        name, text = _to_tagged(value)
+    except TypeError:
+        # Unknown types are stored as strings, as before typed encoding
+        return str(value)
+    return {"__type__": name, "value": text}
+
+def _json_object_hook(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 2 and obj.get("__type__") in _EXT_TYPES and "value" in obj:
+        return _from_tagged(obj["__type__"], obj["value"])
+    return obj
+
+def _msgpack_default(value: Any) -> Any:
+    try:
+        name, text = _to_tagged(value)
+    except TypeError:
+        return str(value)
+    return msgpack.ExtType(_EXT_TYPES[name], text.encode())
+
+def _msgpack_ext_hook(code: int, data: bytes) -> Any:
+    if code not in _EXT_NAMES:
+        return msgpack.ExtType(code, data)
+    return _from_tagged(_EXT_NAMES[code], data.decode())
+
+def _serialize(codec: str, value: Any) -> bytes:
+    if codec == "msgpack":
+        return msgpack.packb(value, default=_msgpack_default, use_bin_type=True)
+    return json.dumps(value, default=_json_default, separators=(",", ":")).encode()
+
+def _deserialize(codec: str, data: bytes) -> Any:
+    if codec == "msgpack":
+        return msgpack.unpackb(data, ext_hook=_msgpack_ext_hook, raw=False, strict_map_key=False)
+    return json.loads(data, object_hook=_json_object_hook)
+
+def _compress(compression: str, data: bytes) -> bytes:
+    if compression == "zlib":
+        return zlib.compress(data)
+    if compression == "zstd":
+        return zstandard.ZstdCompressor().compress(data)
+    if compression == "lz4":
+        return lz4.frame.compress(data)
+    return data
+
+def _decompress(compression: str, data: bytes) -> bytes:
+    if compression == "zlib":
+        return zlib.decompress(data)
+    if compression == "zstd":
+        return zstandard.ZstdDecompressor().decompress(data)
+    if compression == "lz4":
+        return lz4.frame.decompress(data)
+    return data
+
+class CacheCodec:
+    """Encodes cache values with a serialization format and optional compression
+
+    datetimes, dates, times, timedeltas, Decimals and UUIDs survive the round
+    trip, so cached results have the same types as uncached ones. Values whose
+    serialized size is below min_compress_bytes are stored uncompressed.
+    """
+
+    def __init__(self, codec: str = "json", compression: str = "none", min_compress_bytes: int = 0):
+        check_cache_codec(codec, compression)
+        self.codec = codec
+        self.compression = compression
+        self.min_compress_bytes = min_compress_bytes
+
+    @property
+    def name(self) -> str:
+        return f"{self.codec}+{self.compression}"
+
+    def encode(self, value: Any) -> bytes:
+        """Serialize, compress if large enough, and prefix the entry header"""
+        body = _serialize(self.codec, value)
+        compression = self.compression if len(body) >= self.min_compress_bytes else "none"
+        header = f"{self.codec}+{compression}".encode() + _HEADER_END
+        return header + _compress(compression, body)
+
+def decode_entry(data: bytes) -> Tuple[Any, str]:
+    """Decode an entry written by any CacheCodec; returns the value and its codec name
+
+    Entries without a header are plain JSON written before codecs were recorded.
+    """
+    if data[:1] in (b"{", b"["):
+        return json.loads(data), "json+none"
+    header, _, body = data.partition(_HEADER_END)
+    name = header.decode()
+    codec, compression = name.split("+")
+    check_cache_codec(codec, compression)
+    return _deserialize(codec, _decompress(compression, body)), name
+
+def benchmark_codecs(value: Any, iterations: int = 20, min_compress_bytes: int = 0) -> Dict[str, Dict[str, Any]]:
+    """Encode/decode time and encoded size of a value for every installed codec and compression"""
+    results = {}
+    for codec in available_codecs():
+        for compression in available_compressions():
+            cache_codec = CacheCodec(codec, compression, min_compress_bytes)
+            encode_ns = []
+            decode_ns = []
+            for _ in range(iterations):
+                start_ns = now_ns()
+                encoded = cache_codec.encode(value)
+                encode_ns.append(elapsed_ns(start_ns))
+                start_ns = now_ns()
+                decoded, _ = decode_entry(encoded)
+                decode_ns.append(elapsed_ns(start_ns))
+            results[cache_codec.name] = {
+                "encoded_bytes": len(encoded),
+                "encode_ms": ns_to_ms(sorted(encode_ns)[len(encode_ns) // 2]),
+                "decode_ms": ns_to_ms(sorted(decode_ns)[len(decode_ns) // 2]),
+                "round_trip_equal": decoded == value
+            }
+    return results
@@ -6,6 +6,7 @@ import asyncio
 import logging
 import random
 import string
+from contextlib import aclosing
 from datetime import datetime, timedelta
 from typing import List, Dict, Any
 from concurrent.futures import ThreadPoolExecutor
@@ -210,50 +211,69 @@ class DataGenerator:
         return order_details
     
     async def generate_order_details(self, total_order_details: int = 5000000):
-        """Generate order detail records"""
+        """Generate order detail records
+        
+        Order ids are streamed in batches rather than loaded at once; each batch
+        receives its proportional share of the details, so memory stays bounded
+        regardless of the size of the orders table.
+        """
         logger.info(f"Generating {total_order_details} order details...")
         
         # Get existing reference data
-        orders_query = "SELECT order_id FROM orders"
+        orders_count_query = "SELECT COUNT(*) AS count FROM orders"
         products_query = "SELECT product_id FROM products"
         
-        orders_result, _ = await self.db_manager.execute_query_async(orders_query)
+        orders_count_result, _ = await self.db_manager.execute_query_async(orders_count_query)
         products_result, _ = await self.db_manager.execute_query_async(products_query)
         
-        order_ids = [row['order_id'] for row in orders_result]
+        total_orders = orders_count_result[0]['count']
         product_ids = [row['product_id'] for row in products_result]
         
-        if not order_ids or not product_ids:
+        if not total_orders or not product_ids:
             raise ValueError("Missing reference data. Ensure orders and products exist.")
         
         columns = [
             'order_id', 'product_id', 'unit_price', 'quantity', 'discount', 'created_at'
         ]
         
-        total_batches = (total_order_details + self.batch_size - 1) // self.batch_size
-        
-        for batch_num in range(total_batches):
-            current_batch_size = min(self.batch_size, total_order_details - batch_num * self.batch_size)
-            
-            # Generate batch data
-            batch_data = self.generate_order_details_batch(
-                order_ids, product_ids, current_batch_size
-            )
-            
-            # Insert batch
-            try:
-                execution_time = await self.db_manager.execute_bulk_insert(
-                    'order_details', columns, batch_data
-                )
+        total_batches = (total_orders + self.batch_size - 1) // self.batch_size
+        orders_seen = 0
+        details_generated = 0
+        batch_num = 0
+        
+        order_stream = self.db_manager.stream_query("SELECT order_id FROM orders", batch_size=self.batch_size)
+        async with aclosing(order_stream):
+            async for order_rows in order_stream:
+                order_ids = [row['order_id'] for row in order_rows]
+                orders_seen += len(order_ids)
                 
-                logger.info(f"Inserted order details batch {batch_num + 1}/{total_batches} "
-                          f"({current_batch_size} records) in {execution_time:.2f}ms")
+                # Details due so far, in proportion to the orders streamed so far
+                details_target = min(total_order_details * orders_seen // total_orders, total_order_details)
+                current_batch_size = details_target - details_generated
+                if current_batch_size <= 0:
+                    continue
                 
-            except Exception as e:
-                logger.error(f"Failed to insert order details batch {batch_num + 1}: {e}")
-                raise
-        
-        logger.info(f"Completed generating {total_order_details} order details")
+                # Generate batch data
+                batch_data = self.generate_order_details_batch(
+                    order_ids, product_ids, current_batch_size
+                )
+                
+                # Insert batch
+                try:
+                    execution_time = await self.db_manager.execute_bulk_insert(
+                        'order_details', columns, batch_data
+                    )
+                    
+                    batch_num += 1
+                    details_generated = details_target
+                    logger.info(f"Inserted order details batch {batch_num}/{total_batches} "
+                              f"({current_batch_size} records) in {execution_time:.2f}ms")
+                    
+                except Exception as e:
+                    logger.error(f"Failed to insert order details batch {batch_num + 1}: {e}")
+                    raise
+        
+        logger.info(f"Completed generating {details_generated} order details")
     
     async def generate_all_data(self):
         """Generate all data according to specifications"""
@@ -3,9 +3,11 @@ Database connection and query management
 """
 
 import asyncio
+import json
 import logging
-import time
-from typing import Dict, List, Any, Optional, Tuple
+import re
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Any, Optional, Tuple
 from contextlib import asynccontextmanager
 
 import asyncpg
@@ -13,25 +15,91 @@ import psycopg2
 from psycopg2.extras import RealDictCursor
 
 from core.config import settings
+from core.metrics import db_statement_cache_total
+from core.timing import elapsed_ms, now_ns
 
 logger = logging.getLogger(__name__)
 
+# Result formats for execute_query_async: asyncpg Records as fetched (no conversion),
+# one dict per row, or one list per column
+RESULT_FORMATS = ("records", "dicts", "columnar")
+
+# Statement modes for execute_query_async: reuse a cached prepared statement, or send
+# the query text so it is parsed and planned on every execution
+STATEMENT_MODES = ("prepared", "unprepared")
+
+# Metric label for each prepared statement cache counter
+_STATEMENT_CACHE_LABELS = {"hits": "hit", "misses": "miss", "evictions": "eviction"}
+
+# Quoted literals and identifiers are kept verbatim; whitespace elsewhere is collapsed
+_NORMALIZE_PATTERN = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")|\s+""")
+
+def normalize_query(query: str) -> str:
+    """Canonical query text used as the prepared statement cache key"""
+    normalized = _NORMALIZE_PATTERN.sub(lambda match: match.group(1) or " ", query)
+    return normalized.strip().rstrip(";").rstrip()
+
+class PreparedStatementConnection(asyncpg.Connection):
+    """asyncpg connection with an explicit LRU cache of prepared statements
+    
+    Statements are keyed by normalized query text. The cache limit and the
+    shared hit/miss/eviction counters are attached by DatabaseManager when the
+    pool creates the connection. Evicted statements are deallocated by asyncpg
+    once they are no longer referenced.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements: "OrderedDict[str, asyncpg.prepared_stmt.PreparedStatement]" = OrderedDict()
+        self.statement_cache_limit = settings.PREPARED_STATEMENT_CACHE_SIZE
+        self.statement_cache_stats: Dict[str, int] = {"hits": 0, "misses": 0, "evictions": 0}
+    
+    def _count(self, result: str):
+        self.statement_cache_stats[result] += 1
+        db_statement_cache_total.labels(result=_STATEMENT_CACHE_LABELS[result]).inc()
+    
+    async def get_prepared(self, query: str) -> asyncpg.prepared_stmt.PreparedStatement:
+        """Return the cached prepared statement for query, preparing it on a miss"""
+        key = normalize_query(query)
+        statement = self.prepared_statements.get(key)
+        if statement is not None:
+            self.prepared_statements.move_to_end(key)
+            self._count("hits")
+            return statement
+        
+        self._count("misses")
+        statement = await self.prepare(query)
+        self.prepared_statements[key] = statement
+        while len(self.prepared_statements) > self.statement_cache_limit:
+            self.prepared_statements.popitem(last=False)
+            self._count("evictions")
+        return statement
+    
+    def discard_prepared(self, query: str):
+        """Drop a cached statement, e.g. after it was invalidated by a schema change"""
+        self.prepared_statements.pop(normalize_query(query), None)
+
 class DatabaseManager:
     """Manages database connections and operations"""
     
     def __init__(self):
         self.connection_pool: Optional[asyncpg.Pool] = None
         self.sync_connection = None
+        self.statement_cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
         
     async def connect(self):
         """Establish database connections"""
         try:
-            # Create async connection pool
+            # Create async connection pool. asyncpg's implicit statement cache is
+            # disabled so that prepared vs unprepared execution is an explicit choice.
             self.connection_pool = await asyncpg.create_pool(
                 settings.POSTGRES_URL,
                 min_size=5,
                 max_size=20,
-                command_timeout=60
+                command_timeout=60,
+                connection_class=PreparedStatementConnection,
+                statement_cache_size=0,
+                init=self._init_connection
             )
             
             # Create sync connection for specific operations
@@ -42,6 +110,20 @@ class DatabaseManager:
             logger.error(f"Failed to connect to database: {e}")
             raise
     
+    async def _init_connection(self, conn: PreparedStatementConnection):
+        """Share the manager's statement cache counters with a new pooled connection"""
+        conn.statement_cache_stats = self.statement_cache_stats
+    
+    def get_statement_cache_stats(self) -> Dict[str, Any]:
+        """Prepared statement cache counters, summed over all pooled connections"""
+        lookups = self.statement_cache_stats["hits"] + self.statement_cache_stats["misses"]
+        hit_rate = (self.statement_cache_stats["hits"] / lookups * 100) if lookups > 0 else 0
+        return {
+            **self.statement_cache_stats,
+            "hit_rate_percent": round(hit_rate, 2),
+            "cache_size_per_connection": settings.PREPARED_STATEMENT_CACHE_SIZE
+        }
+    
     async def disconnect(self):
         """Close database connections"""
         if self.connection_pool:
@@ -53,40 +135,213 @@ class DatabaseManager:
     async def health_check(self) -> Dict[str, Any]:
         """Check database health"""
         try:
+            start_ns = now_ns()
             async with self.connection_pool.acquire() as conn:
                 result = await conn.fetchval("SELECT 1")
                 return {
                     "status": "healthy" if result == 1 else "unhealthy",
-                    "latency_ms": 0  # Will be measured in actual implementation
+                    "latency_ms": round(elapsed_ms(start_ns), 3)
                 }
         except Exception as e:
             logger.error(f"Database health check failed: {e}")
             return {"status": "unhealthy", "error": str(e)}
     
-    async def execute_query_async(self, query: str, params: List = None) -> Tuple[List[Dict], float]:
-        """Execute query asynchronously and measure execution time"""
-        start_time = time.time()
+    async def execute_query_async(self, query: str, params: List = None,
+                                  phases: Optional[Dict[str, float]] = None,
+                                  result_format: str = "dicts",
+                                  prepared: bool = False) -> Tuple[Any, float]:
+        """Execute query asynchronously and measure execution time
+        
+        With prepared, the statement is taken from the connection's prepared
+        statement cache (prepared on first use); otherwise the query text is
+        parsed and planned by the server on every execution.
+        
+        result_format selects what is returned (see RESULT_FORMATS): "records"
+        returns the fetched asyncpg Records untouched, so the measured time is the
+        fetch alone; "dicts" and "columnar" include converting the rows in the
+        measured time.
+        
+        If a phases dict is passed it is filled with per-phase durations (ms):
+        pool_acquire (waiting for a pooled connection), prepare (statement cache
+        lookup or preparation, prepared mode only), execute (send, server
+        execution, row transfer and asyncpg record decoding, which asyncpg does
+        not expose separately) and materialize (conversion to result_format).
+        """
+        if result_format not in RESULT_FORMATS:
+            raise ValueError(f"Unknown result format: {result_format}")
+        
+        start_ns = now_ns()
         try:
             async with self.connection_pool.acquire() as conn:
-                if params:
+                acquired_ns = now_ns()
+                prepared_ns = acquired_ns
+                if prepared:
+                    statement = await conn.get_prepared(query)
+                    prepared_ns = now_ns()
+                    try:
+                        rows = await statement.fetch(*(params or []))
+                    except asyncpg.exceptions.InvalidCachedStatementError:
+                        # The schema changed since the statement was prepared; prepare it again
+                        conn.discard_prepared(query)
+                        statement = await conn.get_prepared(query)
+                        rows = await statement.fetch(*(params or []))
+                elif params:
                     rows = await conn.fetch(query, *params)
                 else:
                     rows = await conn.fetch(query)
+                fetched_ns = now_ns()
                 
-                execution_time = (time.time() - start_time) * 1000  # Convert to milliseconds
+                if result_format == "dicts":
+                    result = [dict(row) for row in rows]
+                elif result_format == "columnar":
+                    result = self.records_to_columns(rows)
+                else:
+                    result = rows
+                materialized_ns = now_ns()
                 
-                # Convert to list of dicts
-                result = [dict(row) for row in rows]
+                execution_time = elapsed_ms(start_ns, materialized_ns)
+                
+                if phases is not None:
+                    phases["pool_acquire"] = elapsed_ms(start_ns, acquired_ns)
+                    if prepared:
+                        phases["prepare"] = elapsed_ms(acquired_ns, prepared_ns)
+                    phases["execute"] = elapsed_ms(prepared_ns, fetched_ns)
+                    phases["materialize"] = elapsed_ms(fetched_ns, materialized_ns)
                 return result, execution_time
                 
         except Exception as e:
-            execution_time = (time.time() - start_time) * 1000
             logger.error(f"Query execution failed: {e}")
             raise
     
+    async def execute_batch_async(self, query: str, param_sets: List[List],
+                                  prepared: bool = True) -> Tuple[List[List[asyncpg.Record]], List[float], float]:
+        """Execute a query once per parameter set, back to back on one connection
+        
+        The connection is acquired once and, with prepared, the statement is
+        looked up once. asyncpg cannot pipeline fetches on a connection, so each
+        execution is still its own round trip. Returns the Records of each
+        execution, each execution's time and the total time (ms, including the
+        pool acquire).
+        """
+        start_ns = now_ns()
+        results = []
+        times = []
+        async with self.connection_pool.acquire() as conn:
+            statement = await conn.get_prepared(query) if prepared else None
+            for params in param_sets:
+                query_start_ns = now_ns()
+                if statement is not None:
+                    rows = await statement.fetch(*(params or []))
+                else:
+                    rows = await conn.fetch(query, *(params or []))
+                times.append(elapsed_ms(query_start_ns))
+                results.append(rows)
+        return results, times, elapsed_ms(start_ns)
+    
+    async def stream_query(self, query: str, params: List = None,
+                           batch_size: Optional[int] = None) -> AsyncIterator[List[asyncpg.Record]]:
+        """Stream query results in batches through a server-side cursor
+        
+        Only one batch (default STREAM_BATCH_SIZE rows) is held in memory at a
+        time. The cursor lives in a read-only transaction on a pooled connection
+        that is held until the stream is exhausted or closed.
+        """
+        batch_size = batch_size or settings.STREAM_BATCH_SIZE
+        async with self.connection_pool.acquire() as conn:
+            async with conn.transaction(readonly=True):
+                cursor = await conn.cursor(query, *(params or []))
+                while True:
+                    rows = await cursor.fetch(batch_size)
+                    if not rows:
+                        break
+                    yield rows
+    
+    @staticmethod
+    def records_to_columns(rows: List[asyncpg.Record]) -> Dict[str, List[Any]]:
+        """Convert Records to one list per column, transposing in a single pass"""
+        if not rows:
+            return {}
+        return dict(zip(rows[0].keys(), map(list, zip(*rows))))
+    
+    @staticmethod
+    def to_dicts(result: Any, result_format: str) -> List[Dict[str, Any]]:
+        """Convert a result in any of RESULT_FORMATS to one dict per row"""
+        if result_format == "columnar":
+            return [dict(zip(result.keys(), values)) for values in zip(*result.values())]
+        if result_format == "records":
+            return [dict(row) for row in result]
+        return result
+    
+    @staticmethod
+    def count_rows(result: Any, result_format: str) -> int:
+        """Number of rows in a result in any of RESULT_FORMATS"""
+        if result_format == "columnar":
+            return len(next(iter(result.values()), []))
+        return len(result)
+    
+    async def explain_query(self, query: str, params: List = None, top_nodes: int = 5) -> Dict[str, Any]:
+        """Capture EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) for a query
+        
+        ANALYZE executes the query, so it runs in a transaction that is rolled back.
+        Returns planning/execution time, shared buffer hits/reads and the slowest
+        plan nodes by exclusive time.
+        """
+        explain_sql = f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query.strip().rstrip(';')}"
+        
+        async with self.connection_pool.acquire() as conn:
+            transaction = conn.transaction()
+            await transaction.start()
+            try:
+                raw_plan = await conn.fetchval(explain_sql, *(params or []))
+            finally:
+                await transaction.rollback()
+        
+        plan_json = json.loads(raw_plan) if isinstance(raw_plan, str) else raw_plan
+        plan = plan_json[0]
+        root = plan["Plan"]
+        
+        nodes = []
+        self._collect_plan_nodes(root, nodes)
+        nodes.sort(key=lambda node: node["exclusive_time_ms"], reverse=True)
+        
+        return {
+            "planning_time_ms": plan.get("Planning Time", 0),
+            "execution_time_ms": plan.get("Execution Time", 0),
+            "shared_hit_blocks": root.get("Shared Hit Blocks", 0),
+            "shared_read_blocks": root.get("Shared Read Blocks", 0),
+            "temp_read_blocks": root.get("Temp Read Blocks", 0),
+            "temp_written_blocks": root.get("Temp Written Blocks", 0),
+            "actual_rows": root.get("Actual Rows", 0),
+            "top_nodes": nodes[:top_nodes],
+            "plan": plan_json
+        }
+    
+    def _collect_plan_nodes(self, node: Dict[str, Any], nodes: List[Dict[str, Any]]):
+        """Flatten a JSON plan tree, computing each node's exclusive time"""
+        children = node.get("Plans", [])
+        total_ms = node.get("Actual Total Time", 0) * node.get("Actual Loops", 1)
+        children_ms = sum(
+            child.get("Actual Total Time", 0) * child.get("Actual Loops", 1) for child in children
+        )
+        
+        nodes.append({
+            "node_type": node.get("Node Type"),
+            "relation": node.get("Relation Name"),
+            "index": node.get("Index Name"),
+            "exclusive_time_ms": max(total_ms - children_ms, 0),
+            "total_time_ms": total_ms,
+            "actual_rows": node.get("Actual Rows", 0),
+            "loops": node.get("Actual Loops", 1),
+            "shared_hit_blocks": node.get("Shared Hit Blocks", 0),
+            "shared_read_blocks": node.get("Shared Read Blocks", 0)
+        })
+        
+        for child in children:
+            self._collect_plan_nodes(child, nodes)
+    
     def execute_query_sync(self, query: str, params: List = None) -> Tuple[List[Dict], float]:
         """Execute query synchronously and measure execution time"""
-        start_time = time.time()
+        start_ns = now_ns()
         try:
             with self.sync_connection.cursor(cursor_factory=RealDictCursor) as cursor:
                 if params:
@@ -95,21 +350,20 @@ class DatabaseManager:
                     cursor.execute(query)
                 
                 rows = cursor.fetchall()
-                execution_time = (time.time() - start_time) * 1000
+                execution_time = elapsed_ms(start_ns)
                 
                 # Convert to list of dicts
                 result = [dict(row) for row in rows]
                 return result, execution_time
                 
         except Exception as e:
-            execution_time = (time.time() - start_time) * 1000
             logger.error(f"Sync query execution failed: {e}")
             self.sync_connection.rollback()
             raise
     
     async def execute_bulk_insert(self, table: str, columns: List[str], data: List[List]) -> float:
         """Execute bulk insert operation"""
-        start_time = time.time()
+        start_ns = now_ns()
         try:
             async with self.connection_pool.acquire() as conn:
                 # Use COPY for bulk inserts
@@ -119,7 +373,7 @@ class DatabaseManager:
                     columns=columns
                 )
                 
-                execution_time = (time.time() - start_time) * 1000
+                execution_time = elapsed_ms(start_ns)
                 return execution_time
                 
         except Exception as e:
@@ -0,0 +1,120 @@
+"""
+Payload normalization and content hashing for SQL/GraphQL equivalence checks
+"""
+
+import hashlib
+import itertools
+from datetime import date, datetime, time
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+# Decimal places numeric values are compared at; absorbs float noise in averages
+NUMERIC_PLACES = 6
+
+_HASH_MODULUS = 2 ** 256
+
+def normalize_value(value: Any) -> str:
+    """Canonical text for a scalar, identical for both engines' representations
+
+    Numbers (including numeric strings, which is how Hasura may send NUMERIC)
+    are rounded to NUMERIC_PLACES without trailing zeros; dates and times use
+    ISO 8601.
+    """
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, (int, float, Decimal, str)):
+        try:
+            number = value if isinstance(value, Decimal) else Decimal(str(value))
+            if not number.is_finite():
+                return str(value)
+            number = round(number, NUMERIC_PLACES).normalize()
+        except InvalidOperation:
+            return str(value)
+        return format(number, "f") if number != 0 else "0"
+    return str(value)
+
+def flatten_graphql(data: Dict[str, Any]) -> Iterator[List[Tuple[str, Any]]]:
+    """Flatten a GraphQL payload into join-style rows of (field, value) pairs
+
+    Nested objects contribute their fields to the parent row and nested lists
+    produce one row per item, as a SQL join would. A parent whose nested list
+    is empty produces no rows, matching an inner join.
+    """
+    for value in data.values():
+        for item in value if isinstance(value, list) else [value]:
+            yield from _flatten_object(item)
+
+def _flatten_object(value: Any) -> Iterator[List[Tuple[str, Any]]]:
+    if not isinstance(value, dict):
+        yield [("value", value)]
+        return
+
+    scalars = []
+    expansions = []
+    for key, field in value.items():
+        if isinstance(field, list):
+            expansions.append([row for item in field for row in _flatten_object(item)])
+        elif isinstance(field, dict):
+            expansions.append(list(_flatten_object(field)))
+        else:
+            scalars.append((key, field))
+
+    for combination in itertools.product(*expansions):
+        yield scalars + [pair for row in combination for pair in row]
+
+class PayloadDigest:
+    """Order-insensitive content hash of a result, built one row at a time
+
+    Column names differ between engines (aliases, nesting), so each row is
+    hashed as the sorted multiset of its normalized values. Row hashes are
+    summed, making the digest independent of row order and cheap to stream;
+    an order-sensitive hash is kept alongside for ORDER BY comparisons.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.columns = set()
+        self.widths = set()
+        self._multiset = 0
+        self._ordered = hashlib.sha256()
+
+    def add(self, row: Iterable[Tuple[str, Any]]):
+        """Add one row of (column, value) pairs"""
+        row = list(row)
+        self.columns.update(name for name, _ in row)
+        self.widths.add(len(row))
+        canonical = "\x1f".join(sorted(normalize_value(value) for _, value in row))
+        row_hash = hashlib.sha256(canonical.encode()).digest()
+        self._multiset = (self._multiset + int.from_bytes(row_hash, "big")) % _HASH_MODULUS
+        self._ordered.update(row_hash)
+        self.rows += 1
+
+    def summary(self) -> Dict[str, Any]:
+        """Row count, columns and the content hashes"""
+        return {
+            "rows": self.rows,
+            "columns": sorted(self.columns),
+            "row_widths": sorted(self.widths),
+            "content_hash": f"{self._multiset:064x}",
+            "ordered_hash": self._ordered.hexdigest()
+        }
+
+def compare_digests(sql: Dict[str, Any], graphql: Dict[str, Any]) -> Dict[str, Any]:
+    """Compare two PayloadDigest summaries and explain any difference"""
+    differences = []
+    if sql["rows"] != graphql["rows"]:
+        differences.append(f"row count {sql['rows']} (sql) vs {graphql['rows']} (graphql)")
+    if sql["row_widths"] != graphql["row_widths"]:
+        differences.append(f"values per row {sql['row_widths']} (sql) vs {graphql['row_widths']} (graphql)")
+    if not differences and sql["content_hash"] != graphql["content_hash"]:
+        differences.append("same shape but different row contents")
+
+    return {
+        "equivalent": not differences,
+        "same_order": sql["ordered_hash"] == graphql["ordered_hash"],
+        "differences": differences
+    }
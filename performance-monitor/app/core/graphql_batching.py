@@ -0,0 +1,68 @@
+"""
+Building batched GraphQL requests from single-operation test queries
+"""
+
+import re
+from typing import Any, Dict, List, Tuple
+
+# How N operations are sent to Hasura: N separate requests, one request with a
+# JSON array of operations, or one operation with N aliased root fields
+GRAPHQL_BATCH_MODES = ("separate", "array", "multi_root")
+
+# How N SQL queries are executed: each on its own pooled connection acquire, or
+# back to back on one held connection
+SQL_BATCH_MODES = ("separate", "single_connection")
+
+_VARIABLE = re.compile(r"\$([A-Za-z_][A-Za-z0-9_]*)")
+_ROOT_FIELD = re.compile(r"^\s*([A-Za-z_][A-Za-z0-9_]*)")
+
+def _matching_brace(text: str, start: int) -> int:
+    """Index of the brace closing the one at start"""
+    depth = 0
+    for i in range(start, len(text)):
+        if text[i] == "{":
+            depth += 1
+        elif text[i] == "}":
+            depth -= 1
+            if depth == 0:
+                return i
+    raise ValueError("Unbalanced braces in GraphQL query")
+
+def split_operation(query: str) -> Tuple[str, str]:
+    """Variable definitions (without parentheses) and root selection set of an operation"""
+    open_brace = query.index("{")
+    header = query[:open_brace]
+    definitions = ""
+    if "(" in header:
+        definitions = header[header.index("(") + 1:header.rindex(")")]
+    selection = query[open_brace + 1:_matching_brace(query, open_brace)]
+    return definitions.strip(), selection
+
+def merge_operations(query: str, count: int) -> str:
+    """One operation running a single-root-field query count times
+
+    Copy i gets the alias op<i> and its variables are renamed to $<name>_<i>,
+    so each copy can be given its own values with merge_variables().
+    """
+    definitions, selection = split_operation(query)
+    if not _ROOT_FIELD.match(selection):
+        raise ValueError("Query has no root field to alias")
+
+    merged_definitions = []
+    merged_selections = []
+    for i in range(count):
+        if definitions:
+            merged_definitions.append(_VARIABLE.sub(rf"$\1_{i}", definitions))
+        renamed = _VARIABLE.sub(rf"$\1_{i}", selection)
+        merged_selections.append(_ROOT_FIELD.sub(rf"op{i}: \1", renamed, count=1))
+
+    header = f"query ({', '.join(merged_definitions)})" if merged_definitions else "query"
+    return f"{header} {{\n" + "\n".join(merged_selections) + "\n}"
+
+def merge_variables(variable_sets: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Variables for merge_operations(): copy i's values under <name>_<i>"""
+    return {
+        f"{name}_{i}": value
+        for i, variables in enumerate(variable_sets)
+        for name, value in variables.items()
+    }
@@ -0,0 +1,162 @@
+"""
+Constant-memory latency histograms for streaming performance results
+"""
+
+import math
+from typing import Dict, Optional, Tuple
+
+class LatencyHistogram:
+    """Log-bucketed (HDR-style) latency histogram
+
+    Values are stored as counts in logarithmically sized buckets, so memory is
+    bounded by the value range rather than the number of samples. Each bucket
+    spans a relative width of `precision`, which bounds the relative error of
+    any reported percentile to precision / 2. Exact min, max, count and sum
+    are tracked alongside the buckets.
+    """
+
+    def __init__(self, precision: float = 0.01, lowest_ms: float = 0.001):
+        self.precision = precision
+        self.lowest_ms = lowest_ms
+        self._log_base = math.log1p(precision)
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total_ms = 0.0
+        self.total_sq_ms = 0.0
+        self.min_ms = math.inf
+        self.max_ms = 0.0
+
+    def _bucket_index(self, value_ms: float) -> int:
+        if value_ms <= self.lowest_ms:
+            return 0
+        return int(math.log(value_ms / self.lowest_ms) / self._log_base) + 1
+
+    def _bucket_value(self, index: int) -> float:
+        """Representative (midpoint) value of a bucket"""
+        if index == 0:
+            return self.lowest_ms
+        lower = self.lowest_ms * math.exp((index - 1) * self._log_base)
+        return lower * (1 + self.precision / 2)
+
+    def record(self, value_ms: float, count: int = 1):
+        """Record a latency value (milliseconds)"""
+        index = self._bucket_index(value_ms)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.count += count
+        self.total_ms += value_ms * count
+        self.total_sq_ms += value_ms * value_ms * count
+        self.min_ms = min(self.min_ms, value_ms)
+        self.max_ms = max(self.max_ms, value_ms)
+
+    def merge(self, other: "LatencyHistogram"):
+        """Merge another histogram with the same bucket layout into this one"""
+        if (other.precision, other.lowest_ms) != (self.precision, self.lowest_ms):
+            raise ValueError("Cannot merge histograms with different bucket layouts")
+
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total_ms += other.total_ms
+        self.total_sq_ms += other.total_sq_ms
+        self.min_ms = min(self.min_ms, other.min_ms)
+        self.max_ms = max(self.max_ms, other.max_ms)
+
+    def copy(self) -> "LatencyHistogram":
+        """Independent copy of this histogram"""
+        snapshot = LatencyHistogram(self.precision, self.lowest_ms)
+        snapshot.merge(self)
+        return snapshot
+
+    def percentile(self, percent: float) -> float:
+        """Value at the given percentile (0-100), clamped to the exact min/max"""
+        if self.count == 0:
+            return 0.0
+
+        rank = max(1, math.ceil(percent / 100 * self.count))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(max(self._bucket_value(index), self.min_ms), self.max_ms)
+        return self.max_ms
+
+    def summary(self) -> Dict[str, float]:
+        """Statistics in the same shape as PerformanceAnalyzer._calculate_stats"""
+        if self.count == 0:
+            return {}
+
+        mean = self.total_ms / self.count
+        variance = 0.0
+        if self.count > 1:
+            variance = max(self.total_sq_ms - self.count * mean * mean, 0.0) / (self.count - 1)
+
+        return {
+            "count": self.count,
+            "min_ms": self.min_ms,
+            "max_ms": self.max_ms,
+            "avg_ms": mean,
+            "median_ms": self.percentile(50),
+            "std_dev_ms": math.sqrt(variance),
+            "p90_ms": self.percentile(90),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "p999_ms": self.percentile(99.9)
+        }
+
+    def to_dict(self) -> Dict:
+        """Serializable form, suitable for storing and merging later"""
+        return {
+            "precision": self.precision,
+            "lowest_ms": self.lowest_ms,
+            "counts": {str(index): count for index, count in self.counts.items()},
+            "count": self.count,
+            "total_ms": self.total_ms,
+            "total_sq_ms": self.total_sq_ms,
+            "min_ms": self.min_ms if self.count else None,
+            "max_ms": self.max_ms
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "LatencyHistogram":
+        """Rebuild a histogram from to_dict() output"""
+        histogram = cls(data["precision"], data["lowest_ms"])
+        histogram.counts = {int(index): count for index, count in data["counts"].items()}
+        histogram.count = data["count"]
+        histogram.total_ms = data["total_ms"]
+        histogram.total_sq_ms = data["total_sq_ms"]
+        histogram.min_ms = data["min_ms"] if data["min_ms"] is not None else math.inf
+        histogram.max_ms = data["max_ms"]
+        return histogram
+
+class LatencyRecorder:
+    """Histograms keyed by (test name, engine, series)
+
+    The series label is the cache mode, plus the run variant for single tests.
+    """
+
+    def __init__(self):
+        self.histograms: Dict[Tuple[str, str, str], LatencyHistogram] = {}
+
+    def record(self, test_name: str, engine: str, series: str, value_ms: float):
+        """Record a latency into the histogram for this series"""
+        key = (test_name, engine, series)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = LatencyHistogram()
+        histogram.record(value_ms)
+
+    def get(self, test_name: str, engine: str, series: str) -> Optional[LatencyHistogram]:
+        """Snapshot of one series, or None if nothing was recorded"""
+        histogram = self.histograms.get((test_name, engine, series))
+        return histogram.copy() if histogram else None
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Summaries of every recorded series"""
+        return {
+            f"{test_name}:{engine}:{series}": histogram.summary()
+            for (test_name, engine, series), histogram in self.histograms.items()
+        }
+
+    def reset(self):
+        """Drop all recorded series"""
+        self.histograms = {}
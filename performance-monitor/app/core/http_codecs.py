@@ -0,0 +1,71 @@
+"""
+Response compression and JSON decoding options for GraphQL requests
+"""
+
+import json
+import zlib
+from typing import Any, Callable, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Accept-Encoding requested from Hasura; "identity" asks for an uncompressed body
+RESPONSE_ENCODINGS = ("identity", "gzip", "br")
+
+# JSON libraries a GraphQL response body can be decoded with
+JSON_DECODERS = ("json", "orjson")
+
+def available_encodings() -> Tuple[str, ...]:
+    """Response encodings whose decompressor is installed"""
+    return tuple(e for e in RESPONSE_ENCODINGS if e != "br" or brotli is not None)
+
+def available_decoders() -> Tuple[str, ...]:
+    """JSON decoders that are installed"""
+    return tuple(d for d in JSON_DECODERS if d != "orjson" or orjson is not None)
+
+def check_codecs(encoding: str, decoder: str):
+    """Raise ValueError if an encoding or decoder is unknown or not installed"""
+    if encoding not in RESPONSE_ENCODINGS:
+        raise ValueError(f"Unknown response encoding: {encoding}")
+    if encoding not in available_encodings():
+        raise ValueError(f"Response encoding '{encoding}' needs the brotli package")
+    if decoder not in JSON_DECODERS:
+        raise ValueError(f"Unknown JSON decoder: {decoder}")
+    if decoder not in available_decoders():
+        raise ValueError(f"JSON decoder '{decoder}' needs the orjson package")
+
+def decompress_body(body: bytes, content_encoding: str) -> bytes:
+    """Decompress a response body according to its Content-Encoding header
+
+    Sessions are created with auto_decompress=False so that the compressed
+    size and the decompression time can be measured separately.
+    """
+    content_encoding = (content_encoding or "identity").strip().lower()
+    if content_encoding in ("identity", ""):
+        return body
+    if content_encoding in ("gzip", "x-gzip"):
+        return zlib.decompress(body, 16 + zlib.MAX_WBITS)
+    if content_encoding == "deflate":
+        return zlib.decompress(body)
+    if content_encoding == "br":
+        if brotli is None:
+            raise ValueError("Received a brotli-encoded response but the brotli package is not installed")
+        return brotli.decompress(body)
+    raise ValueError(f"Unsupported Content-Encoding: {content_encoding}")
+
+def get_json_decoder(name: str) -> Callable[[bytes], Any]:
+    """Function that decodes a JSON body with the named library"""
+    if name == "orjson":
+        if orjson is None:
+            raise ValueError("JSON decoder 'orjson' needs the orjson package")
+        return orjson.loads
+    if name == "json":
+        return json.loads
+    raise ValueError(f"Unknown JSON decoder: {name}")
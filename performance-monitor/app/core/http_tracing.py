@@ -0,0 +1,72 @@
+"""
+aiohttp request tracing for phase-level GraphQL latency breakdowns
+"""
+
+from typing import Dict, Optional
+
+import aiohttp
+
+from core.timing import now_ns, ns_to_ms
+
+def _mark(name: str):
+    """Build a trace handler that stores a now_ns() mark under name in the request context"""
+    async def handler(session, trace_config_ctx, params):
+        marks = trace_config_ctx.trace_request_ctx
+        if marks is not None:
+            marks[name] = now_ns()
+    return handler
+
+def create_phase_trace_config() -> aiohttp.TraceConfig:
+    """TraceConfig that records connection and request timestamps
+
+    Pass a dict as trace_request_ctx on each request; it is filled with
+    monotonic nanosecond marks that phases_from_marks() turns into durations.
+    """
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(_mark("request_start"))
+    trace_config.on_connection_queued_start.append(_mark("queued_start"))
+    trace_config.on_connection_queued_end.append(_mark("queued_end"))
+    trace_config.on_connection_create_start.append(_mark("create_start"))
+    trace_config.on_connection_create_end.append(_mark("create_end"))
+    trace_config.on_connection_reuseconn.append(_mark("reuse"))
+    trace_config.on_request_headers_sent.append(_mark("headers_sent"))
+    trace_config.on_request_chunk_sent.append(_mark("body_sent"))
+    trace_config.on_request_end.append(_mark("headers_received"))
+    return trace_config
+
+def phases_from_marks(marks: Dict[str, int], body_read: int, decoded: int,
+                      decompressed: Optional[int] = None) -> Dict[str, float]:
+    """Convert trace marks plus body-read/decode timestamps into phase durations (ms)
+
+    pool_acquire: waiting for a free pooled connection
+    connect:      DNS and TCP connection setup (zero on a reused connection)
+    send:         writing request headers and body
+    first_byte:   server execution plus network until response headers arrive
+    body_read:    reading the full response body
+    decompress:   decompressing the body (only when a decompressed mark is given)
+    decode:       JSON decoding of the body
+    """
+    start = marks.get("request_start")
+    headers_received = marks.get("headers_received")
+    if start is None or headers_received is None:
+        return {}
+
+    pool_acquire = marks["queued_end"] - marks["queued_start"] if "queued_end" in marks else 0
+    connect = marks["create_end"] - marks["create_start"] if "create_end" in marks else 0
+    connection_ready = max(
+        marks.get(name, start) for name in ("queued_end", "create_end", "reuse")
+    )
+    sent = marks.get("body_sent", marks.get("headers_sent", connection_ready))
+
+    phases = {
+        "pool_acquire": ns_to_ms(pool_acquire),
+        "connect": ns_to_ms(connect),
+        "send": ns_to_ms(max(sent - connection_ready, 0)),
+        "first_byte": ns_to_ms(max(headers_received - sent, 0)),
+        "body_read": ns_to_ms(body_read - headers_received)
+    }
+    if decompressed is not None:
+        phases["decompress"] = ns_to_ms(decompressed - body_read)
+        body_read = decompressed
+    phases["decode"] = ns_to_ms(decoded - body_read)
+    return phases
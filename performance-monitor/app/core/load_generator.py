@@ -0,0 +1,214 @@
+"""
+Open-loop load generation for arrival-rate based performance tests
+"""
+
+import asyncio
+import logging
+import random
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from core.config import settings
+from core.histogram import LatencyHistogram
+from core.timing import NS_PER_SECOND, elapsed_ms, elapsed_ns, now_ns, ns_to_seconds
+
+logger = logging.getLogger(__name__)
+
+ARRIVAL_PROFILES = ("fixed", "ramp", "step", "poisson")
+
+class ArrivalSchedule:
+    """Generates intended request start offsets (seconds from test start)
+
+    fixed:   constant rate, evenly spaced arrivals
+    ramp:    rate rises linearly from start_rate to rate over the test
+    step:    rate starts at start_rate and rises by step_rate every step_seconds
+    poisson: exponential inter-arrival times with mean rate
+    """
+
+    def __init__(self, profile: str, rate: float, duration_seconds: float,
+                 start_rate: Optional[float] = None, step_rate: Optional[float] = None,
+                 step_seconds: float = 10.0, seed: Optional[int] = None):
+        if profile not in ARRIVAL_PROFILES:
+            raise ValueError(f"Unknown arrival profile: {profile}")
+        if rate <= 0:
+            raise ValueError("Arrival rate must be positive")
+
+        self.profile = profile
+        self.rate = rate
+        self.duration_seconds = duration_seconds
+        self.start_rate = start_rate if start_rate and start_rate > 0 else max(rate / 10, 0.1)
+        self.step_rate = step_rate if step_rate and step_rate > 0 else self.start_rate
+        self.step_seconds = step_seconds
+        self._random = random.Random(seed)
+
+    def rate_at(self, offset: float) -> float:
+        """Target arrival rate (requests/second) at a given offset"""
+        if self.profile == "ramp":
+            progress = min(offset / self.duration_seconds, 1.0) if self.duration_seconds else 1.0
+            return self.start_rate + (self.rate - self.start_rate) * progress
+        if self.profile == "step":
+            step = int(offset // self.step_seconds)
+            return min(self.start_rate + step * self.step_rate, self.rate)
+        return self.rate
+
+    def offsets(self) -> List[float]:
+        """Intended start offsets for every request in the test"""
+        if self.profile == "fixed":
+            # Computed from the index so float drift cannot add a trailing request
+            return [i / self.rate for i in range(int(self.duration_seconds * self.rate))]
+
+        offsets = []
+        offset = 0.0
+
+        while offset < self.duration_seconds:
+            offsets.append(offset)
+            current_rate = self.rate_at(offset)
+            if self.profile == "poisson":
+                offset += self._random.expovariate(current_rate)
+            else:
+                offset += 1.0 / current_rate
+
+        return offsets
+
+    def windows(self) -> List[Dict[str, float]]:
+        """Reporting windows used to chart throughput and latency against offered load"""
+        window_seconds = self.step_seconds if self.profile == "step" else max(self.duration_seconds / 10, 1.0)
+        windows = []
+        start = 0.0
+
+        while start < self.duration_seconds:
+            end = min(start + window_seconds, self.duration_seconds)
+            windows.append({"start": start, "end": end})
+            start = end
+
+        return windows
+
+class OpenLoopStats:
+    """Streaming summary of open-loop samples, overall and per reporting window"""
+
+    def __init__(self, schedule: ArrivalSchedule):
+        self.schedule = schedule
+        self.windows = schedule.windows()
+        self.service = LatencyHistogram()
+        self.corrected = LatencyHistogram()
+        self.window_corrected = [LatencyHistogram() for _ in self.windows]
+        self.phases: Dict[str, LatencyHistogram] = {}
+        self.window_offered = [0] * len(self.windows)
+        self.window_completed = [0] * len(self.windows)
+        self.total_requests = 0
+        self.errors = 0
+        self.max_start_lag_ms = 0.0
+        self.last_completion_s = 0.0
+
+    def _window_index(self, offset: float) -> Optional[int]:
+        for index, window in enumerate(self.windows):
+            if window["start"] <= offset < window["end"]:
+                return index
+        return None
+
+    def record(self, sample: Dict[str, Any]):
+        """Fold one sample into the summary"""
+        self.total_requests += 1
+        self.max_start_lag_ms = max(self.max_start_lag_ms, sample["start_lag_ms"])
+        self.last_completion_s = max(self.last_completion_s, sample["completed_s"])
+
+        intended_window = self._window_index(sample["intended_start_s"])
+        if intended_window is not None:
+            self.window_offered[intended_window] += 1
+
+        if "error" in sample:
+            self.errors += 1
+            return
+
+        self.service.record(sample["execution_time_ms"])
+        self.corrected.record(sample["corrected_latency_ms"])
+        for phase, duration_ms in sample.get("phases_ms", {}).items():
+            self.phases.setdefault(phase, LatencyHistogram()).record(duration_ms)
+        if intended_window is not None:
+            self.window_corrected[intended_window].record(sample["corrected_latency_ms"])
+        completed_window = self._window_index(sample["completed_s"])
+        if completed_window is not None:
+            self.window_completed[completed_window] += 1
+
+    def summary(self) -> Dict[str, Any]:
+        """Overall and per-window results"""
+        successful = self.total_requests - self.errors
+        elapsed = max(self.last_completion_s, self.schedule.duration_seconds)
+
+        windows = []
+        for index, window in enumerate(self.windows):
+            span = window["end"] - window["start"]
+            windows.append({
+                "start_s": window["start"],
+                "end_s": window["end"],
+                "offered_rate_per_second": self.window_offered[index] / span,
+                "achieved_rate_per_second": self.window_completed[index] / span,
+                "corrected_stats": self.window_corrected[index].summary()
+            })
+
+        return {
+            "total_requests": self.total_requests,
+            "successful_requests": successful,
+            "error_rate_percent": (self.errors / self.total_requests) * 100 if self.total_requests else 0,
+            "achieved_rate_per_second": successful / elapsed if elapsed else 0,
+            "max_start_lag_ms": self.max_start_lag_ms,
+            "service_stats": self.service.summary(),
+            "corrected_stats": self.corrected.summary(),
+            "phase_stats": {phase: histogram.summary() for phase, histogram in self.phases.items()},
+            "windows": windows
+        }
+
+class OpenLoopLoadGenerator:
+    """Issues requests on an arrival schedule, independent of response times
+
+    Each request records its intended start (from the schedule) and its actual
+    start. Latency measured from the intended start is corrected for coordinated
+    omission: when the system under test stalls, the queueing delay it causes is
+    charged to the requests that should have been sent during the stall.
+    """
+
+    def __init__(self, max_in_flight: Optional[int] = None):
+        self.max_in_flight = max_in_flight or settings.MAX_CONCURRENT_REQUESTS
+
+    async def run(self, schedule: ArrivalSchedule,
+                  request: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Run request() at every scheduled offset and return the streamed summary"""
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        stats = OpenLoopStats(schedule)
+        in_flight = set()
+        test_start_ns = now_ns()
+
+        async def issue(intended_offset: float):
+            intended_ns = test_start_ns + round(intended_offset * NS_PER_SECOND)
+            async with semaphore:
+                actual_start_ns = now_ns()
+                result = await request()
+                completed_ns = now_ns()
+
+            # Only timings are kept; the response payload is dropped here
+            sample = {
+                "execution_time_ms": result["execution_time_ms"],
+                "intended_start_s": intended_offset,
+                "start_lag_ms": elapsed_ms(intended_ns, actual_start_ns),
+                "corrected_latency_ms": elapsed_ms(intended_ns, completed_ns),
+                "completed_s": ns_to_seconds(elapsed_ns(test_start_ns, completed_ns))
+            }
+            if "phases_ms" in result:
+                sample["phases_ms"] = result["phases_ms"]
+            if "error" in result:
+                sample["error"] = result["error"]
+            stats.record(sample)
+
+        for offset in schedule.offsets():
+            delay = ns_to_seconds(test_start_ns + round(offset * NS_PER_SECOND) - now_ns())
+            if delay > 0:
+                await asyncio.sleep(delay)
+            task = asyncio.create_task(issue(offset))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+
+        if in_flight:
+            await asyncio.gather(*in_flight)
+
+        logger.info(f"Open-loop run issued {stats.total_requests} requests "
+                   f"({schedule.profile}, target {schedule.rate} req/s)")
+        return stats.summary()
@@ -0,0 +1,94 @@
+"""
+In-process LRU cache used as the L1 tier in front of Redis
+"""
+
+import time
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+from typing import Any, Dict, Optional, Tuple
+
+class LocalCache:
+    """Byte-bounded LRU cache with per-entry expiry
+
+    Entries hold already-decoded values, so a hit costs a dict lookup instead
+    of a Redis round trip plus JSON decoding. Each entry's size is the length
+    of its serialized form, and least recently used entries are evicted until
+    the total fits max_bytes. Expiry uses the monotonic clock.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self._entries: "OrderedDict[str, Tuple[Any, int, float]]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "sets": 0, "evictions": 0, "expirations": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Cached value for key, or None if absent or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+
+        value, size, expires_at = entry
+        if time.monotonic() >= expires_at:
+            self._remove(key)
+            self.stats["expirations"] += 1
+            self.stats["misses"] += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return value
+
+    def set(self, key: str, value: Any, size_bytes: int, ttl_seconds: float) -> bool:
+        """Store a value for ttl_seconds; values larger than the whole cache are not stored"""
+        if key in self._entries:
+            self._remove(key)
+        if size_bytes > self.max_bytes or ttl_seconds <= 0:
+            return False
+
+        self._entries[key] = (value, size_bytes, time.monotonic() + ttl_seconds)
+        self.size_bytes += size_bytes
+        self.stats["sets"] += 1
+        while self.size_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats["evictions"] += 1
+        return True
+
+    def delete(self, key: str) -> bool:
+        """Remove a key; returns whether it was present"""
+        if key not in self._entries:
+            return False
+        self._remove(key)
+        return True
+
+    def delete_matching(self, pattern: str) -> int:
+        """Remove every key matching a Redis-style glob pattern"""
+        keys = [key for key in self._entries if fnmatchcase(key, pattern)]
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    def clear(self):
+        """Remove every entry (counters are kept)"""
+        self._entries.clear()
+        self.size_bytes = 0
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self.size_bytes -= size
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters plus current entry count and size"""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate_percent": round(self.stats["hits"] / lookups * 100, 2) if lookups else 0,
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes
+        }
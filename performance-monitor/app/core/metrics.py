@@ -34,6 +34,40 @@ db_query_duration_seconds = Histogram(
     ['query_type']
 )
 
+query_phase_duration_seconds = Histogram(
+    'northwind_query_phase_duration_seconds',
+    'Duration of each phase of a measured query in seconds',
+    ['engine', 'phase'],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+
+query_response_bytes = Histogram(
+    'northwind_query_response_bytes',
+    'Response payload size of a measured query in bytes',
+    ['engine', 'measure'],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+)
+
+query_decoded_objects = Histogram(
+    'northwind_query_decoded_objects',
+    'Number of objects decoded from a measured query response',
+    ['engine'],
+    buckets=(10, 100, 1000, 10000, 100000, 1000000, 10000000)
+)
+
+query_parse_duration_seconds = Histogram(
+    'northwind_query_parse_duration_seconds',
+    'Client-side deserialization time of a measured query response in seconds',
+    ['engine'],
+    buckets=(0.00001, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+)
+
+db_statement_cache_total = Counter(
+    'northwind_db_statement_cache_total',
+    'Prepared statement cache lookups and evictions',
+    ['result']
+)
+
 db_connections_active = Gauge(
     'northwind_db_connections_active',
     'Number of active database connections'
@@ -46,6 +80,19 @@ cache_operations_total = Counter(
     ['operation', 'status']
 )
 
+cache_get_duration_seconds = Histogram(
+    'northwind_cache_get_duration_seconds',
+    'Duration of cache lookups in seconds, per tier and outcome',
+    ['tier', 'result'],
+    buckets=(0.000001, 0.000005, 0.00001, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05)
+)
+
+cache_single_flight_total = Counter(
+    'northwind_cache_single_flight_total',
+    'Cache misses by single-flight role (leader, coalesced, remote)',
+    ['role']
+)
+
 cache_hit_rate = Gauge(
     'northwind_cache_hit_rate',
     'Cache hit rate as a percentage'
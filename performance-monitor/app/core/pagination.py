@@ -0,0 +1,119 @@
+"""
+Page queries and latency curves for the pagination depth benchmark
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# "offset" skips rows with OFFSET (cost grows with depth); "keyset" seeks past the
+# last key of the previous page (WHERE key > $last), which an index serves directly
+PAGINATION_STRATEGIES = ("offset", "keyset")
+
+# Tables the benchmark can page through: unique sort key, its GraphQL type and the columns read
+PAGINATION_TARGETS = {
+    "customers": {
+        "key": "customer_id",
+        "graphql_key_type": "String",
+        "columns": ("customer_id", "company_name", "contact_name", "city", "country"),
+    },
+    "orders": {
+        "key": "order_id",
+        "graphql_key_type": "Int",
+        "columns": ("order_id", "customer_id", "employee_id", "order_date", "freight"),
+    },
+}
+
+def _sql_page_query(table: str, strategy: str, first_page: bool) -> str:
+    target = PAGINATION_TARGETS[table]
+    columns = ", ".join(target["columns"])
+    key = target["key"]
+
+    if strategy == "offset":
+        return f"SELECT {columns} FROM {table} ORDER BY {key} OFFSET $1 LIMIT $2"
+    if first_page:
+        return f"SELECT {columns} FROM {table} ORDER BY {key} LIMIT $1"
+    return f"SELECT {columns} FROM {table} WHERE {key} > $1 ORDER BY {key} LIMIT $2"
+
+def _graphql_page_query(table: str, strategy: str, first_page: bool) -> str:
+    target = PAGINATION_TARGETS[table]
+    columns = " ".join(target["columns"])
+    key = target["key"]
+
+    if strategy == "offset":
+        return (f"query ($offset: Int!, $limit: Int!) {{ {table}(order_by: {{{key}: asc}}, "
+                f"offset: $offset, limit: $limit) {{ {columns} }} }}")
+    if first_page:
+        return f"query ($limit: Int!) {{ {table}(order_by: {{{key}: asc}}, limit: $limit) {{ {columns} }} }}"
+    return (f"query ($last: {target['graphql_key_type']}!, $limit: Int!) {{ {table}("
+            f"where: {{{key}: {{_gt: $last}}}}, order_by: {{{key}: asc}}, limit: $limit) {{ {columns} }} }}")
+
+def page_request(engine: str, table: str, strategy: str, page: int, page_size: int,
+                 last_key: Any = None) -> Tuple[str, Any]:
+    """Query and bind values (SQL params or GraphQL variables) for one page
+
+    Keyset pages after the first need the key of the previous page's last row.
+    """
+    if table not in PAGINATION_TARGETS:
+        raise ValueError(f"Unknown pagination table: {table}")
+    if strategy not in PAGINATION_STRATEGIES:
+        raise ValueError(f"Unknown pagination strategy: {strategy}")
+
+    first_page = strategy == "keyset" and page == 0
+    if engine == "sql":
+        query = _sql_page_query(table, strategy, first_page)
+        if strategy == "offset":
+            return query, [page * page_size, page_size]
+        return query, [page_size] if first_page else [last_key, page_size]
+
+    query = _graphql_page_query(table, strategy, first_page)
+    if strategy == "offset":
+        return query, {"offset": page * page_size, "limit": page_size}
+    return query, {"limit": page_size} if first_page else {"last": last_key, "limit": page_size}
+
+def latency_curve(walks: List[List[float]], page_size: int,
+                  max_points: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Median latency per page depth over repeated walks
+
+    Each walk is the list of page latencies (ms) in page order; walks that ended
+    early only contribute to the pages they reached. With max_points the curve
+    is thinned to evenly spaced pages, always keeping the first and last.
+    """
+    depth = max((len(walk) for walk in walks), default=0)
+    pages = list(range(depth))
+    if max_points and depth > max_points:
+        pages = sorted({round(i * (depth - 1) / (max_points - 1)) for i in range(max_points)})
+
+    curve = []
+    for page in pages:
+        samples = [walk[page] for walk in walks if page < len(walk)]
+        curve.append({
+            "page": page,
+            "offset_rows": page * page_size,
+            "median_ms": float(np.median(samples)),
+            "min_ms": min(samples),
+            "max_ms": max(samples),
+            "walks": len(samples)
+        })
+    return curve
+
+def summarize_curve(curve: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """First/last page latency and the least-squares growth rate of a curve"""
+    if not curve:
+        return None
+
+    first = curve[0]["median_ms"]
+    last = curve[-1]["median_ms"]
+    slope = 0.0
+    if len(curve) > 1:
+        depths = np.array([point["offset_rows"] for point in curve], dtype=float)
+        latencies = np.array([point["median_ms"] for point in curve], dtype=float)
+        slope = float(np.polyfit(depths, latencies, 1)[0])
+
+    return {
+        "pages": curve[-1]["page"] + 1,
+        "first_page_ms": first,
+        "last_page_ms": last,
+        "growth_ratio": last / first if first else None,
+        "ms_per_10k_rows": slope * 10000
+    }
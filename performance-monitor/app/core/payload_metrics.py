@@ -0,0 +1,97 @@
+"""
+Response size and deserialization cost of measured query results
+"""
+
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Optional
+
+# Postgres DataRow framing: message type (1) + length (4) + column count (2), and a 4-byte length per value
+_DATA_ROW_HEADER_BYTES = 7
+_VALUE_HEADER_BYTES = 4
+
+def count_json_objects(value: Any) -> int:
+    """Number of values (objects, arrays and scalars) in a decoded JSON document"""
+    count = 0
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        count += 1
+        if isinstance(item, dict):
+            stack.extend(item.values())
+        elif isinstance(item, list):
+            stack.extend(item)
+    return count
+
+def _value_wire_bytes(value: Any) -> int:
+    """Approximate size of a value in Postgres' binary format"""
+    if value is None:
+        return 0
+    if isinstance(value, bool):
+        return 1
+    if isinstance(value, int):
+        return 4 if -2 ** 31 <= value < 2 ** 31 else 8
+    if isinstance(value, float):
+        return 8
+    if isinstance(value, Decimal):
+        # numeric: 8-byte header plus one 2-byte word per 4 decimal digits
+        return 8 + 2 * -(-len(value.as_tuple().digits) // 4)
+    if isinstance(value, (datetime, time, timedelta)):
+        return 8
+    if isinstance(value, date):
+        return 4
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    return len(str(value).encode())
+
+def estimate_row_wire_bytes(values: Iterable[Any]) -> int:
+    """Estimated bytes of one DataRow message as sent by the server
+
+    asyncpg does not expose byte counters, so SQL wire size is estimated from
+    the decoded values and the binary format asyncpg requests for builtin types.
+    """
+    return _DATA_ROW_HEADER_BYTES + sum(_VALUE_HEADER_BYTES + _value_wire_bytes(v) for v in values)
+
+def sql_payload_metrics(result: Any, result_format: str,
+                        phases: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """Payload size and decode cost of a SQL result in any of RESULT_FORMATS
+
+    decoded_objects counts one object per row (Record or dict) plus one per
+    value; for columnar results, one per column plus one per value. parse_ms is
+    the row conversion (materialize phase); asyncpg's own record decoding runs
+    inside the fetch and is not separable.
+    """
+    if result_format == "columnar":
+        rows = list(zip(*result.values()))
+        containers = len(result)
+    else:
+        rows = [row.values() for row in result]
+        containers = len(rows)
+
+    wire_bytes = 0
+    values = 0
+    for row in rows:
+        row = list(row)
+        wire_bytes += estimate_row_wire_bytes(row)
+        values += len(row)
+
+    return {
+        "response_bytes": wire_bytes,
+        "wire_bytes": wire_bytes,
+        "decoded_objects": containers + values,
+        "parse_ms": (phases or {}).get("materialize", 0.0)
+    }
+
+def graphql_payload_metrics(body: bytes, wire_bytes: int, decoded: Any,
+                            parse_ms: float) -> Dict[str, Any]:
+    """Payload size and decode cost of a GraphQL response
+
+    response_bytes is the decompressed JSON body; wire_bytes is the body as it
+    crossed the network, before decompression.
+    """
+    return {
+        "response_bytes": len(body),
+        "wire_bytes": wire_bytes,
+        "decoded_objects": count_json_objects(decoded),
+        "parse_ms": parse_ms
+    }
@@ -3,12 +3,12 @@ Performance analyzer for comparing SQL vs GraphQL performance
 """
 
 import asyncio
-import json
 import logging
 import random
 import time
+from contextlib import aclosing
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from concurrent.futures import ThreadPoolExecutor
 import statistics
 
@@ -16,310 +16,782 @@ import aiohttp
 import psutil
 
 from core.config import settings
-from core.database import DatabaseManager
-from core.cache import CacheManager
+from core.database import RESULT_FORMATS, STATEMENT_MODES, DatabaseManager
+from core.cache import CACHE_TIERS, CacheManager
+from core.benchmark_stats import bootstrap_ci, bootstrap_difference_ci, mann_whitney_u
+from core.equivalence import PayloadDigest, compare_digests, flatten_graphql
+from core.graphql_batching import GRAPHQL_BATCH_MODES, SQL_BATCH_MODES, merge_operations, merge_variables
+from core.histogram import LatencyHistogram, LatencyRecorder
+from core.http_codecs import available_decoders, check_codecs, decompress_body, get_json_decoder
+from core.http_tracing import create_phase_trace_config, phases_from_marks
+from core.load_generator import ArrivalSchedule, OpenLoopLoadGenerator
+from core.pagination import PAGINATION_STRATEGIES, PAGINATION_TARGETS, latency_curve, page_request, summarize_curve
+from core.payload_metrics import graphql_payload_metrics, sql_payload_metrics
+from core.persisted_queries import GRAPHQL_QUERY_MODES, PersistedQueryRegistry
+from core.query_params import PARAM_MODES, ParameterSampler, ParameterSources, default_param_seed
+from core.result_store import ResultStore, run_variant
+from core.scenarios import ScenarioCatalog
+from core.metrics import (
+    query_decoded_objects, query_parse_duration_seconds, query_phase_duration_seconds, query_response_bytes
+)
+from core.timing import NS_PER_SECOND, elapsed_ms, elapsed_ns, ms_to_ns, now_ns, ns_to_ms, ns_to_seconds
 
 logger = logging.getLogger(__name__)
 
+# GraphQL connection modes: reuse pooled keep-alive connections or open a new one per request
+CONNECTION_MODES = ("warm", "cold")
+
+# How SQL and GraphQL iterations of a single test are scheduled relative to each other
+EXECUTION_MODES = ("sequential", "interleaved", "concurrent")
+
+# Where cache warming takes its tests from: every scenario, or the most executed ones in the result store
+CACHE_WARM_SOURCES = ("catalog", "history")
+
+# Large-result scan used by the streaming benchmark ($1 = row limit)
+LARGE_SCAN_QUERY = """
+    SELECT order_id, customer_id, employee_id, order_date, ship_country, freight
+    FROM orders
+    ORDER BY order_id
+    LIMIT $1
+"""
+
 class PerformanceAnalyzer:
     """Analyzes and compares performance between SQL and GraphQL queries"""
     
-    def __init__(self, db_manager: DatabaseManager, cache_manager: CacheManager):
+    def __init__(self, db_manager: DatabaseManager, cache_manager: CacheManager,
+                 result_store: Optional[ResultStore] = None,
+                 scenario_catalog: Optional[ScenarioCatalog] = None):
         self.db_manager = db_manager
         self.cache_manager = cache_manager
+        self.result_store = result_store
+        self.current_run_id: Optional[int] = None
         self.test_results = []
         self.test_status = "idle"
         
-        # Test queries for performance comparison
-        self.test_queries = self._get_test_queries()
+        # Streaming latency histograms per (test, engine, cache mode)
+        self.latency_recorder = LatencyRecorder()
+        
+        # Latest server-side EXPLAIN capture per test, and tests captured in the current run
+        self.query_plans: Dict[str, Dict[str, Any]] = {}
+        self._plans_captured_this_run = set()
+        
+        # Latest SQL/GraphQL payload equivalence check per test
+        self.equivalence_checks: Dict[str, Dict[str, Any]] = {}
+        
+        # Long-lived HTTP client for GraphQL requests (created in start())
+        self.http_session: Optional[aiohttp.ClientSession] = None
+        
+        # Test scenarios for performance comparison, and the real values their parameters sample
+        if scenario_catalog is None:
+            scenario_catalog = ScenarioCatalog()
+            scenario_catalog.load()
+        self.scenario_catalog = scenario_catalog
+        self.param_sources = ParameterSources(db_manager)
+        
+        # Test queries registered in Hasura as REST endpoints for the "persisted" query mode
+        self.persisted_queries = PersistedQueryRegistry()
+        
+        # Progress of the latest cache warming run
+        self.warm_progress: Dict[str, Any] = {"status": "idle"}
     
-    def _get_test_queries(self) -> Dict[str, Dict]:
-        """Get predefined test queries for performance analysis"""
-        return {
-            "simple_select": {
-                "sql": "SELECT customer_id, company_name, city, country FROM customers LIMIT 100;",
-                "graphql": """
-                    query {
-                        customers(limit: 100) {
-                            customer_id
-                            company_name
-                            city
-                            country
-                        }
-                    }
-                """,
-                "description": "Simple SELECT query with LIMIT"
-            },
-            "customer_orders": {
-                "sql": """
-                    SELECT c.customer_id, c.company_name, o.order_id, o.order_date, o.freight
-                    FROM customers c
-                    JOIN orders o ON c.customer_id = o.customer_id
-                    WHERE c.country = 'USA'
-                    ORDER BY o.order_date DESC
-                    LIMIT 1000;
-                """,
-                "graphql": """
-                    query {
-                        customers(where: {country: {_eq: "USA"}}) {
-                            customer_id
-                            company_name
-                            orders(order_by: {order_date: desc}, limit: 1000) {
-                                order_id
-                                order_date
-                                freight
-                            }
-                        }
-                    }
-                """,
-                "description": "JOIN query with filtering and ordering"
-            },
-            "order_aggregation": {
-                "sql": """
-                    SELECT 
-                        DATE_TRUNC('month', order_date) as month,
-                        COUNT(*) as order_count,
-                        SUM(freight) as total_freight,
-                        AVG(freight) as avg_freight
-                    FROM orders
-                    WHERE order_date >= '2023-01-01'
-                    GROUP BY DATE_TRUNC('month', order_date)
-                    ORDER BY month;
-                """,
-                "graphql": """
-                    query {
-                        orders_aggregate(
-                            where: {order_date: {_gte: "2023-01-01"}}
-                        ) {
-                            aggregate {
-                                count
-                                sum {
-                                    freight
-                                }
-                                avg {
-                                    freight
-                                }
-                            }
-                        }
-                    }
-                """,
-                "description": "Aggregation query with date filtering"
-            },
-            "complex_join": {
-                "sql": """
-                    SELECT 
-                        c.company_name,
-                        p.product_name,
-                        cat.category_name,
-                        s.company_name as supplier_name,
-                        od.quantity,
-                        od.unit_price,
-                        od.line_total,
-                        o.order_date
-                    FROM customers c
-                    JOIN orders o ON c.customer_id = o.customer_id
-                    JOIN order_details od ON o.order_id = od.order_id
-                    JOIN products p ON od.product_id = p.product_id
-                    JOIN categories cat ON p.category_id = cat.category_id
-                    JOIN suppliers s ON p.supplier_id = s.supplier_id
-                    WHERE o.order_date >= '2024-01-01'
-                    ORDER BY o.order_date DESC, od.line_total DESC
-                    LIMIT 500;
-                """,
-                "graphql": """
-                    query {
-                        orders(
-                            where: {order_date: {_gte: "2024-01-01"}},
-                            order_by: [{order_date: desc}, {order_details: {line_total: desc}}],
-                            limit: 500
-                        ) {
-                            order_date
-                            customer {
-                                company_name
-                            }
-                            order_details {
-                                quantity
-                                unit_price
-                                line_total
-                                product {
-                                    product_name
-                                    category {
-                                        category_name
-                                    }
-                                    supplier {
-                                        company_name
-                                    }
-                                }
-                            }
-                        }
-                    }
-                """,
-                "description": "Complex multi-table JOIN query"
-            },
-            "pagination_test": {
-                "sql": """
-                    SELECT customer_id, company_name, contact_name, city, country
-                    FROM customers
-                    ORDER BY customer_id
-                    OFFSET 1000 LIMIT 100;
-                """,
-                "graphql": """
-                    query {
-                        customers(
-                            order_by: {customer_id: asc},
-                            offset: 1000,
-                            limit: 100
-                        ) {
-                            customer_id
-                            company_name
-                            contact_name
-                            city
-                            country
-                        }
-                    }
-                """,
-                "description": "Pagination performance test"
-            }
-        }
+    def _create_connector(self, keep_alive: bool = True) -> aiohttp.TCPConnector:
+        """Create a TCP connector for GraphQL requests"""
+        if not keep_alive:
+            # A fresh connection per request, closed as soon as the response is read
+            return aiohttp.TCPConnector(force_close=True, limit=1)
+        
+        return aiohttp.TCPConnector(
+            limit=settings.MAX_CONCURRENT_REQUESTS,
+            limit_per_host=settings.HTTP_CONNECTION_LIMIT_PER_HOST,
+            keepalive_timeout=settings.HTTP_KEEPALIVE_TIMEOUT_SECONDS
+        )
+    
+    async def start(self):
+        """Create the shared, pooled HTTP session used for warm GraphQL requests"""
+        if self.http_session is None or self.http_session.closed:
+            self.http_session = aiohttp.ClientSession(
+                connector=self._create_connector(keep_alive=True),
+                timeout=aiohttp.ClientTimeout(total=settings.HTTP_REQUEST_TIMEOUT_SECONDS),
+                trace_configs=[create_phase_trace_config()],
+                # Bodies are decompressed by execute_graphql_query so the cost can be timed
+                auto_decompress=False
+            )
+            logger.info(
+                f"GraphQL HTTP session created (limit_per_host={settings.HTTP_CONNECTION_LIMIT_PER_HOST}, "
+                f"keepalive={settings.HTTP_KEEPALIVE_TIMEOUT_SECONDS}s)"
+            )
+    
+    async def close(self):
+        """Close the shared HTTP session"""
+        if self.http_session and not self.http_session.closed:
+            await self.http_session.close()
+        self.http_session = None
+        logger.info("GraphQL HTTP session closed")
+    
+    async def _get_http_session(self) -> aiohttp.ClientSession:
+        """Get the shared HTTP session, creating it if start() was not called"""
+        if self.http_session is None or self.http_session.closed:
+            await self.start()
+        return self.http_session
+    
+    @property
+    def test_queries(self) -> Dict[str, Dict[str, Any]]:
+        """Test scenarios by name, from the scenario catalog
+        
+        SQL queries bind $1..$n in the order of "params"; GraphQL queries receive
+        the same values as variables named after each param. See ParameterSampler
+        for the available distributions and scenarios/*.yaml for the definitions.
+        """
+        return self.scenario_catalog.scenarios
+    
+    async def _create_param_samplers(self, test_name: str, param_mode: Optional[str] = None,
+                                     seed: Optional[int] = None) -> Tuple[ParameterSampler, ParameterSampler]:
+        """Identically seeded parameter samplers for the SQL and GraphQL side of a test
+        
+        Both engines see the same sequence of parameter values without sharing
+        state, so neither benefits from rows the other just touched.
+        """
+        param_mode = param_mode or settings.TEST_PARAM_MODE
+        if param_mode not in PARAM_MODES:
+            raise ValueError(f"Unknown parameter mode: {param_mode}")
+        
+        specs = self.test_queries[test_name].get("params", [])
+        seed = default_param_seed() if seed is None else seed
+        samplers = (ParameterSampler(specs, seed, param_mode), ParameterSampler(specs, seed, param_mode))
+        for sampler in samplers:
+            await sampler.load(self.param_sources)
+        return samplers
     
-    async def execute_sql_query(self, query: str, use_cache: bool = False) -> Dict[str, Any]:
-        """Execute SQL query and measure performance"""
-        cache_hit = False
-        cache_time = 0
+    def _test_sql(self, test_name: str, sampler: ParameterSampler, **kwargs):
+        """Execute a test's SQL query with the sampler's next parameter values"""
+        kwargs.setdefault("cache_policy", self.test_queries[test_name].get("cache"))
+        return self.execute_sql_query(self.test_queries[test_name]["sql"], params=sampler.sample() or None, **kwargs)
+    
+    def _test_graphql(self, test_name: str, sampler: ParameterSampler, query_mode: Optional[str] = None, **kwargs):
+        """Execute a test's GraphQL query with the sampler's next values as variables
+        
+        In "persisted" query mode the test's registered REST endpoint is called
+        instead; ensure_persisted_queries() must have run first.
+        """
+        if (query_mode or settings.GRAPHQL_QUERY_MODE) == "persisted":
+            kwargs["endpoint_url"] = self.persisted_queries.endpoint_url(test_name)
+        kwargs.setdefault("cache_policy", self.test_queries[test_name].get("cache"))
+        variables = sampler.graphql_variables(sampler.sample())
+        return self.execute_graphql_query(self.test_queries[test_name]["graphql"], variables=variables or None, **kwargs)
+    
+    async def ensure_persisted_queries(self) -> Dict[str, str]:
+        """Register the catalog's GraphQL queries in Hasura unless already current"""
+        loaded_at = self.scenario_catalog.loaded_at
+        if not self.persisted_queries.is_current(loaded_at):
+            await self.persisted_queries.register(await self._get_http_session(), self.test_queries, loaded_at)
+        return self.persisted_queries.endpoints
+    
+    async def execute_sql_query(self, query: str, use_cache: bool = False,
+                                result_format: Optional[str] = None,
+                                statement_mode: Optional[str] = None,
+                                params: List = None,
+                                cache_tiers: Optional[str] = None,
+                                cache_policy: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Execute SQL query and measure performance
+        
+        params are bound to the query's $1..$n placeholders and are part of the cache key.
+        cache_tiers (default CACHE_TIERS) selects the cache tiers used with use_cache;
+        concurrent misses on one key share a single execution (see _execute_coalesced()).
+        cache_policy sets the entry's TTL, stale window and early refresh; stale and
+        early-refresh hits are served from cache while the entry reloads in the background.
+        
+        result_format (default TEST_SQL_RESULT_FORMAT) controls how much client-side
+        work is timed: "records" measures the fetch only, "dicts" and "columnar"
+        add the conversion cost. Rows are converted for the cache after timing.
+        statement_mode (default TEST_SQL_STATEMENT_MODE) selects a cached prepared
+        statement or plain query text that is planned on every execution.
+        """
+        result_format = result_format or settings.TEST_SQL_RESULT_FORMAT
+        statement_mode = statement_mode or settings.TEST_SQL_STATEMENT_MODE
         
         if use_cache:
+            load = self._cache_loader(
+                query, params, cache_tiers, cache_policy,
+                lambda: self.execute_sql_query(query, False, result_format, statement_mode, params),
+                lambda response: self.db_manager.to_dicts(response["data"], response["result_format"])
+            )
             # Check cache first
-            cached_result = await self.cache_manager.get_cached_query(query)
+            cached_result = await self.cache_manager.get_cached_query(query, params, cache_tiers)
             if cached_result:
+                if cached_result["cache_state"] != "fresh":
+                    self.cache_manager.refresh_in_background(query, params, load, cache_tiers)
                 return {
                     "data": cached_result["data"],
                     "execution_time_ms": cached_result["cache_retrieval_time_ms"],
+                    "execution_time_ns": cached_result["cache_retrieval_time_ns"],
                     "row_count": len(cached_result["data"]),
                     "cache_hit": True,
+                    "cache_tier": cached_result["cache_tier"],
+                    "cache_state": cached_result["cache_state"],
+                    "result_format": "dicts",
                     "query_type": "sql"
                 }
+            return await self._execute_coalesced("sql", query, params, cache_tiers, load)
         
         # Execute query
-        start_time = time.time()
+        start_ns = now_ns()
         try:
-            result, execution_time = await self.db_manager.execute_query_async(query)
+            phases = {}
+            result, execution_time = await self.db_manager.execute_query_async(
+                query, params, phases=phases, result_format=result_format,
+                prepared=statement_mode == "prepared"
+            )
+            self._observe_phases("sql", phases)
+            payload_stats = sql_payload_metrics(result, result_format, phases)
+            self._observe_payload("sql", payload_stats)
             
             response = {
                 "data": result,
                 "execution_time_ms": execution_time,
-                "row_count": len(result),
+                "execution_time_ns": ms_to_ns(execution_time),
+                "phases_ms": phases,
+                "payload": payload_stats,
+                "row_count": self.db_manager.count_rows(result, result_format),
                 "cache_hit": False,
+                "result_format": result_format,
+                "statement_mode": statement_mode,
                 "query_type": "sql"
             }
             
-            # Cache result if caching is enabled
-            if use_cache:
-                await self.cache_manager.cache_query_result(query, result)
-            
             return response
             
         except Exception as e:
             logger.error(f"SQL query execution failed: {e}")
+            execution_ns = elapsed_ns(start_ns)
             return {
                 "error": str(e),
-                "execution_time_ms": (time.time() - start_time) * 1000,
+                "execution_time_ms": ns_to_ms(execution_ns),
+                "execution_time_ns": execution_ns,
                 "query_type": "sql"
             }
     
-    async def execute_graphql_query(self, query: str, use_cache: bool = False) -> Dict[str, Any]:
-        """Execute GraphQL query and measure performance"""
+    async def execute_graphql_query(self, query: str, use_cache: bool = False,
+                                    connection_mode: str = "warm",
+                                    variables: Optional[Dict[str, Any]] = None,
+                                    response_encoding: Optional[str] = None,
+                                    json_decoder: Optional[str] = None,
+                                    endpoint_url: Optional[str] = None,
+                                    cache_tiers: Optional[str] = None,
+                                    cache_policy: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Execute GraphQL query and measure performance
+        
+        connection_mode "warm" reuses the shared keep-alive session; "cold" opens
+        a new connection for the request so connection setup is part of the timing.
+        variables are sent with the query and are part of the cache key.
+        response_encoding (default GRAPHQL_RESPONSE_ENCODING) is sent as
+        Accept-Encoding and json_decoder (default GRAPHQL_JSON_DECODER) decodes the
+        body; decompression and decoding are timed as separate phases.
+        With endpoint_url (a persisted query's REST endpoint) only the variables
+        are posted there; query is then just the cache key.
+        cache_tiers (default CACHE_TIERS) selects the cache tiers used with use_cache;
+        concurrent misses on one key share a single execution (see _execute_coalesced()).
+        cache_policy sets the entry's expiry, see execute_sql_query().
+        """
+        if connection_mode not in CONNECTION_MODES:
+            raise ValueError(f"Unknown connection mode: {connection_mode}")
+        response_encoding = response_encoding or settings.GRAPHQL_RESPONSE_ENCODING
+        json_decoder = json_decoder or settings.GRAPHQL_JSON_DECODER
+        check_codecs(response_encoding, json_decoder)
+        decode = get_json_decoder(json_decoder)
+        
+        cache_params = sorted(variables.items()) if variables else None
         if use_cache:
+            load = self._cache_loader(
+                query, cache_params, cache_tiers, cache_policy,
+                lambda: self.execute_graphql_query(query, False, connection_mode, variables,
+                                                   response_encoding, json_decoder, endpoint_url),
+                lambda response: None if response.get("errors") else response["data"]
+            )
             # Check cache first
-            cached_result = await self.cache_manager.get_cached_query(query)
+            cached_result = await self.cache_manager.get_cached_query(query, cache_params, cache_tiers)
             if cached_result:
+                if cached_result["cache_state"] != "fresh":
+                    self.cache_manager.refresh_in_background(query, cache_params, load, cache_tiers)
                 return {
                     "data": cached_result["data"],
                     "execution_time_ms": cached_result["cache_retrieval_time_ms"],
+                    "execution_time_ns": cached_result["cache_retrieval_time_ns"],
+                    "row_count": self._count_rows(cached_result["data"]),
                     "cache_hit": True,
+                    "cache_tier": cached_result["cache_tier"],
+                    "cache_state": cached_result["cache_state"],
                     "query_type": "graphql"
                 }
+            return await self._execute_coalesced("graphql", query, cache_params, cache_tiers, load)
         
         # Execute GraphQL query
-        start_time = time.time()
+        start_ns = now_ns()
         try:
             headers = {
                 "Content-Type": "application/json",
+                "Accept-Encoding": response_encoding,
                 "x-hasura-admin-secret": settings.HASURA_ADMIN_SECRET
             }
             
-            payload = {"query": query}
+            if endpoint_url:
+                payload = variables or {}
+            else:
+                payload = {"query": query}
+                if variables:
+                    payload["variables"] = variables
             
-            async with aiohttp.ClientSession() as session:
+            if connection_mode == "cold":
+                session = aiohttp.ClientSession(
+                    connector=self._create_connector(keep_alive=False),
+                    timeout=aiohttp.ClientTimeout(total=settings.HTTP_REQUEST_TIMEOUT_SECONDS),
+                    trace_configs=[create_phase_trace_config()],
+                    auto_decompress=False
+                )
+            else:
+                session = await self._get_http_session()
+            
+            marks = {}
+            try:
                 async with session.post(
-                    settings.HASURA_URL,
+                    endpoint_url or settings.HASURA_URL,
                     json=payload,
                     headers=headers,
-                    timeout=aiohttp.ClientTimeout(total=60)
+                    trace_request_ctx=marks
                 ) as response:
-                    execution_time = (time.time() - start_time) * 1000
-                    
                     if response.status == 200:
-                        result = await response.json()
+                        raw_body = await response.read()
+                        body_read_ns = now_ns()
+                        content_encoding = response.headers.get("Content-Encoding", "identity")
+                        body = decompress_body(raw_body, content_encoding)
+                        decompressed_ns = now_ns()
+                        result = decode(body)
+                        decoded_ns = now_ns()
+                        
+                        # End-to-end, including full body read, decompression and JSON decoding
+                        execution_ns = elapsed_ns(start_ns, decoded_ns)
+                        phases = phases_from_marks(marks, body_read_ns, decoded_ns, decompressed_ns)
+                        self._observe_phases("graphql", phases)
+                        payload_stats = graphql_payload_metrics(
+                            body, len(raw_body), result, ns_to_ms(decoded_ns - decompressed_ns)
+                        )
+                        self._observe_payload("graphql", payload_stats)
                         
                         response_data = {
                             "data": result.get("data", {}),
-                            "execution_time_ms": execution_time,
+                            "execution_time_ms": ns_to_ms(execution_ns),
+                            "execution_time_ns": execution_ns,
+                            "phases_ms": phases,
+                            "payload": payload_stats,
+                            "row_count": self._count_rows(result.get("data", {})),
                             "cache_hit": False,
+                            "connection_mode": connection_mode,
+                            "response_encoding": response_encoding,
+                            "content_encoding": content_encoding,
+                            "json_decoder": json_decoder,
+                            "query_mode": "persisted" if endpoint_url else "adhoc",
                             "query_type": "graphql"
                         }
                         
-                        # Cache result if caching is enabled
-                        if use_cache and "errors" not in result:
-                            await self.cache_manager.cache_query_result(query, result.get("data", {}))
-                        
                         if "errors" in result:
                             response_data["errors"] = result["errors"]
                         
                         return response_data
                     else:
-                        error_text = await response.text()
+                        raw_body = await response.read()
+                        error_text = decompress_body(
+                            raw_body, response.headers.get("Content-Encoding", "identity")
+                        ).decode(errors="replace")
+                        execution_ns = elapsed_ns(start_ns)
                         return {
                             "error": f"HTTP {response.status}: {error_text}",
-                            "execution_time_ms": execution_time,
+                            "execution_time_ms": ns_to_ms(execution_ns),
+                            "execution_time_ns": execution_ns,
+                            "connection_mode": connection_mode,
                             "query_type": "graphql"
                         }
+            finally:
+                if connection_mode == "cold":
+                    await session.close()
                         
         except Exception as e:
-            execution_time = (time.time() - start_time) * 1000
+            execution_ns = elapsed_ns(start_ns)
             logger.error(f"GraphQL query execution failed: {e}")
             return {
                 "error": str(e),
-                "execution_time_ms": execution_time,
+                "execution_time_ms": ns_to_ms(execution_ns),
+                "execution_time_ns": execution_ns,
+                "connection_mode": connection_mode,
                 "query_type": "graphql"
             }
     
-    async def run_single_test(self, test_name: str, iterations: int = 10, 
-                            use_cache: bool = False) -> Dict[str, Any]:
-        """Run a single performance test with multiple iterations"""
-        if test_name not in self.test_queries:
-            raise ValueError(f"Unknown test: {test_name}")
+    def _cache_loader(self, query: str, cache_params: Optional[List], cache_tiers: Optional[str],
+                      cache_policy: Optional[Dict[str, Any]], execute, cacheable):
+        """Coroutine function that runs execute() uncached and caches cacheable(response)
         
-        test_config = self.test_queries[test_name]
+        cacheable returning None skips caching. The execution time is stored
+        with the entry to scale its early refresh.
+        """
+        async def load():
+            response = await execute()
+            if "error" not in response:
+                value = cacheable(response)
+                if value is not None:
+                    await self.cache_manager.cache_query_result(
+                        query, value, cache_params, tiers=cache_tiers, policy=cache_policy,
+                        compute_ms=response["execution_time_ms"]
+                    )
+            return response
+        return load
+    
+    async def _execute_coalesced(self, engine: str, query: str, cache_params: Optional[List],
+                                 cache_tiers: Optional[str], load) -> Dict[str, Any]:
+        """Execute a cache miss with load() (see _cache_loader()) through the cache manager's single-flight
+        
+        Callers coalesced onto the leader get its response, and callers served
+        from another worker's cached entry get that entry; both are timed from
+        their own start, so their latency is the time they waited.
+        """
+        start_ns = now_ns()
+        response, role = await self.cache_manager.single_flight(query, cache_params, load, cache_tiers)
+        if role == "leader":
+            # A copy, so dropping the payload does not affect coalesced callers
+            return dict(response)
+        
+        wait_ns = elapsed_ns(start_ns)
+        if role == "coalesced":
+            shared = {k: v for k, v in response.items() if k not in ("phases_ms", "payload")}
+        else:
+            data = response["data"]
+            shared = {
+                "data": data,
+                "row_count": len(data) if engine == "sql" else self._count_rows(data),
+                "cache_hit": True,
+                "cache_tier": response["cache_tier"],
+                "cache_state": response["cache_state"],
+                "query_type": engine
+            }
+            if engine == "sql":
+                shared["result_format"] = "dicts"
+        return {**shared, "execution_time_ms": ns_to_ms(wait_ns), "execution_time_ns": wait_ns,
+                "coalesced": role}
+    
+    async def execute_graphql_batch(self, operations: List[Tuple[str, Optional[Dict[str, Any]]]],
+                                    response_encoding: Optional[str] = None,
+                                    json_decoder: Optional[str] = None) -> Dict[str, Any]:
+        """Send several operations in one request as a JSON array (Hasura batching)
+        
+        Timing is end-to-end for the whole batch, including body read,
+        decompression and decoding of every operation's result.
+        """
+        response_encoding = response_encoding or settings.GRAPHQL_RESPONSE_ENCODING
+        json_decoder = json_decoder or settings.GRAPHQL_JSON_DECODER
+        check_codecs(response_encoding, json_decoder)
+        decode = get_json_decoder(json_decoder)
+        
+        headers = {
+            "Content-Type": "application/json",
+            "Accept-Encoding": response_encoding,
+            "x-hasura-admin-secret": settings.HASURA_ADMIN_SECRET
+        }
+        payload = [
+            {"query": query, **({"variables": variables} if variables else {})}
+            for query, variables in operations
+        ]
+        
+        start_ns = now_ns()
+        try:
+            session = await self._get_http_session()
+            async with session.post(settings.HASURA_URL, json=payload, headers=headers) as response:
+                raw_body = await response.read()
+                body = decompress_body(raw_body, response.headers.get("Content-Encoding", "identity"))
+                if response.status != 200:
+                    execution_ns = elapsed_ns(start_ns)
+                    return {
+                        "error": f"HTTP {response.status}: {body.decode(errors='replace')}",
+                        "execution_time_ms": ns_to_ms(execution_ns),
+                        "execution_time_ns": execution_ns,
+                        "query_type": "graphql"
+                    }
+                results = decode(body)
+                execution_ns = elapsed_ns(start_ns)
+        except Exception as e:
+            execution_ns = elapsed_ns(start_ns)
+            logger.error(f"GraphQL batch execution failed: {e}")
+            return {
+                "error": str(e),
+                "execution_time_ms": ns_to_ms(execution_ns),
+                "execution_time_ns": execution_ns,
+                "query_type": "graphql"
+            }
+        
+        if not isinstance(results, list) or len(results) != len(operations):
+            return {
+                "error": f"Expected {len(operations)} batched results, got {type(results).__name__}",
+                "execution_time_ms": ns_to_ms(execution_ns),
+                "execution_time_ns": execution_ns,
+                "query_type": "graphql"
+            }
+        
+        response_data = {
+            "data": [result.get("data", {}) for result in results],
+            "execution_time_ms": ns_to_ms(execution_ns),
+            "execution_time_ns": execution_ns,
+            "operations": len(operations),
+            "row_count": sum(self._count_rows(result.get("data", {})) for result in results),
+            "wire_bytes": len(raw_body),
+            "query_type": "graphql"
+        }
+        errors = [error for result in results for error in result.get("errors", [])]
+        if errors:
+            response_data["errors"] = errors
+        return response_data
+    
+    @staticmethod
+    def _observe_phases(engine: str, phases: Dict[str, float]):
+        """Export per-phase durations to Prometheus"""
+        for phase, duration_ms in phases.items():
+            query_phase_duration_seconds.labels(engine=engine, phase=phase).observe(duration_ms / 1000)
+    
+    @staticmethod
+    def _observe_payload(engine: str, payload: Dict[str, Any]):
+        """Export response size, decoded object count and parse time to Prometheus"""
+        query_response_bytes.labels(engine=engine, measure="response").observe(payload["response_bytes"])
+        query_response_bytes.labels(engine=engine, measure="wire").observe(payload["wire_bytes"])
+        query_decoded_objects.labels(engine=engine).observe(payload["decoded_objects"])
+        query_parse_duration_seconds.labels(engine=engine).observe(payload["parse_ms"] / 1000)
+    
+    def _calculate_payload_stats(self, results: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Aggregate per-iteration payload size, object count and parse time"""
+        payloads = [r["payload"] for r in results if "payload" in r]
+        if not payloads:
+            return None
+        
+        stats = {}
+        for measure in ("response_bytes", "wire_bytes", "decoded_objects", "parse_ms"):
+            values = [p[measure] for p in payloads]
+            stats[measure] = {
+                "avg": statistics.mean(values),
+                "median": statistics.median(values),
+                "max": max(values)
+            }
+        rows = sum(r["row_count"] for r in results if "payload" in r)
+        if rows:
+            stats["bytes_per_row"] = sum(p["response_bytes"] for p in payloads) / rows
+        return stats
+    
+    def _calculate_phase_stats(self, results: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+        """Aggregate per-iteration phase breakdowns, with each phase's share of the total"""
+        phase_times: Dict[str, List[float]] = {}
+        for result in results:
+            for phase, duration_ms in result.get("phases_ms", {}).items():
+                phase_times.setdefault(phase, []).append(duration_ms)
+        
+        total_mean = sum(statistics.mean(times) for times in phase_times.values())
+        return {
+            phase: {
+                "avg_ms": statistics.mean(times),
+                "median_ms": statistics.median(times),
+                "max_ms": max(times),
+                "share_percent": (statistics.mean(times) / total_mean) * 100 if total_mean else 0
+            }
+            for phase, times in phase_times.items()
+        }
+    
+    @staticmethod
+    def _check_row_counts(test_config: Dict[str, Any], sql_results: List[Dict[str, Any]],
+                          graphql_results: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Compare row counts against the scenario's expected_rows bounds"""
+        check = {}
+        for engine, results in (("sql", sql_results), ("graphql", graphql_results)):
+            bounds = test_config.get("expected_rows", {}).get(engine)
+            if not bounds:
+                continue
+            outside = [
+                r["row_count"] for r in results
+                if "error" not in r and not (bounds.get("min", 0) <= r["row_count"] <= bounds.get("max", float("inf")))
+            ]
+            check[engine] = {"expected": bounds, "mismatches": len(outside), "ok": not outside}
+            if outside:
+                logger.warning(f"{engine} row counts outside {bounds}: {sorted(set(outside))[:5]}")
+        return check
+    
+    @staticmethod
+    def _count_rows(data: Any) -> int:
+        """Count rows in a GraphQL payload (list root fields count their items)"""
+        if not isinstance(data, dict):
+            return 0
+        return sum(len(value) if isinstance(value, list) else 1 for value in data.values())
+    
+    def _record_result(self, test_name: str, result: Dict[str, Any], series: str,
+                       keep_payload: bool = False) -> Dict[str, Any]:
+        """Record a result's latency under a series label and drop its payload unless asked to keep it"""
+        if "error" not in result:
+            self.latency_recorder.record(test_name, result["query_type"], series, result["execution_time_ms"])
+        if not keep_payload:
+            result.pop("data", None)
+        elif result.get("result_format") == "records":
+            # Records are not serializable; convert the kept payload outside the timing
+            result["data"] = self.db_manager.to_dicts(result["data"], "records")
+            result["result_format"] = "dicts"
+        return result
+    
+    async def _run_iterations(self, iterations: int, run_sql, run_graphql,
+                              execution_mode: str, iteration_delay: float,
+                              max_fanout: int) -> Tuple[List[Dict], List[Dict]]:
+        """Run SQL and GraphQL iterations according to the execution mode
+        
+        sequential:  all SQL iterations, then all GraphQL iterations
+        interleaved: alternating A/B pairs, swapping which engine goes first
+                     each iteration so neither is always measured second
+        concurrent:  both engines' iterations in flight together, bounded by max_fanout
+        """
         sql_results = []
         graphql_results = []
         
-        logger.info(f"Running test '{test_name}' with {iterations} iterations (cache: {use_cache})")
+        if execution_mode == "sequential":
+            for _ in range(iterations):
+                sql_results.append(await run_sql())
+                if iteration_delay:
+                    await asyncio.sleep(iteration_delay)
+            for _ in range(iterations):
+                graphql_results.append(await run_graphql())
+                if iteration_delay:
+                    await asyncio.sleep(iteration_delay)
         
-        # Run SQL tests
-        for i in range(iterations):
-            result = await self.execute_sql_query(test_config["sql"], use_cache)
-            sql_results.append(result)
-            
-            # Small delay between iterations
-            await asyncio.sleep(0.1)
+        elif execution_mode == "interleaved":
+            for i in range(iterations):
+                if i % 2 == 0:
+                    sql_results.append(await run_sql())
+                    graphql_results.append(await run_graphql())
+                else:
+                    graphql_results.append(await run_graphql())
+                    sql_results.append(await run_sql())
+                if iteration_delay:
+                    await asyncio.sleep(iteration_delay)
         
-        # Run GraphQL tests
-        for i in range(iterations):
-            result = await self.execute_graphql_query(test_config["graphql"], use_cache)
-            graphql_results.append(result)
+        elif execution_mode == "concurrent":
+            semaphore = asyncio.Semaphore(max_fanout)
+            
+            async def bounded(run):
+                async with semaphore:
+                    result = await run()
+                    if iteration_delay:
+                        await asyncio.sleep(iteration_delay)
+                    return result
             
-            # Small delay between iterations
-            await asyncio.sleep(0.1)
+            sql_tasks = []
+            graphql_tasks = []
+            for _ in range(iterations):
+                sql_tasks.append(asyncio.create_task(bounded(run_sql)))
+                graphql_tasks.append(asyncio.create_task(bounded(run_graphql)))
+            sql_results = list(await asyncio.gather(*sql_tasks))
+            graphql_results = list(await asyncio.gather(*graphql_tasks))
+        
+        else:
+            raise ValueError(f"Unknown execution mode: {execution_mode}")
+        
+        return sql_results, graphql_results
+    
+    async def run_single_test(self, test_name: str, iterations: Optional[int] = None,
+                            use_cache: bool = False,
+                            connection_mode: str = "warm",
+                            keep_payload: bool = False,
+                            execution_mode: Optional[str] = None,
+                            iteration_delay: Optional[float] = None,
+                            max_fanout: Optional[int] = None,
+                            warmup_iterations: Optional[int] = None,
+                            capture_plan: Optional[bool] = None,
+                            result_format: Optional[str] = None,
+                            statement_mode: Optional[str] = None,
+                            param_mode: Optional[str] = None,
+                            response_encoding: Optional[str] = None,
+                            json_decoder: Optional[str] = None,
+                            query_mode: Optional[str] = None) -> Dict[str, Any]:
+        """Run a single performance test with multiple iterations
+        
+        iterations defaults to the scenario's iterations. Result payloads are dropped
+        once row counts are taken unless keep_payload is set. Execution mode, inter-iteration delay, fan-out and warm-up iterations default to
+        the TEST_* settings. Warm-up iterations are executed but excluded from the results.
+        With capture_plan (default TEST_CAPTURE_PLANS) the SQL query's EXPLAIN ANALYZE
+        breakdown is captured once per run and stored next to the client-side latency.
+        result_format (default TEST_SQL_RESULT_FORMAT) selects the SQL row conversion
+        included in the timing and statement_mode (default TEST_SQL_STATEMENT_MODE)
+        prepared vs unprepared SQL execution, see execute_sql_query(). param_mode
+        (default TEST_PARAM_MODE) samples bind parameters per execution or pins them
+        to their defaults. response_encoding and json_decoder select the GraphQL
+        response compression and JSON library, see execute_graphql_query().
+        query_mode (default GRAPHQL_QUERY_MODE) sends the GraphQL query text ("adhoc")
+        or calls it as a registered persisted query ("persisted").
+        """
+        if test_name not in self.test_queries:
+            raise ValueError(f"Unknown test: {test_name}")
+        
+        execution_mode = execution_mode or settings.TEST_EXECUTION_MODE
+        iteration_delay = settings.TEST_ITERATION_DELAY_SECONDS if iteration_delay is None else iteration_delay
+        max_fanout = max_fanout or settings.TEST_MAX_FANOUT
+        warmup_iterations = settings.TEST_WARMUP_ITERATIONS if warmup_iterations is None else warmup_iterations
+        result_format = result_format or settings.TEST_SQL_RESULT_FORMAT
+        statement_mode = statement_mode or settings.TEST_SQL_STATEMENT_MODE
+        if execution_mode not in EXECUTION_MODES:
+            raise ValueError(f"Unknown execution mode: {execution_mode}")
+        if result_format not in RESULT_FORMATS:
+            raise ValueError(f"Unknown result format: {result_format}")
+        if statement_mode not in STATEMENT_MODES:
+            raise ValueError(f"Unknown statement mode: {statement_mode}")
+        response_encoding = response_encoding or settings.GRAPHQL_RESPONSE_ENCODING
+        json_decoder = json_decoder or settings.GRAPHQL_JSON_DECODER
+        check_codecs(response_encoding, json_decoder)
+        query_mode = query_mode or settings.GRAPHQL_QUERY_MODE
+        if query_mode not in GRAPHQL_QUERY_MODES:
+            raise ValueError(f"Unknown GraphQL query mode: {query_mode}")
+        if query_mode == "persisted":
+            await self.ensure_persisted_queries()
+        
+        test_config = self.test_queries[test_name]
+        iterations = iterations or test_config.get("iterations", 10)
+        param_mode = param_mode or settings.TEST_PARAM_MODE
+        sql_sampler, graphql_sampler = await self._create_param_samplers(test_name, param_mode)
+        
+        logger.info(f"Running test '{test_name}' with {iterations} iterations "
+                   f"(cache: {use_cache}, connection: {connection_mode}, mode: {execution_mode}, "
+                   f"params: {param_mode})")
+        
+        def execute_sql():
+            return self._test_sql(test_name, sql_sampler, use_cache=use_cache,
+                                  result_format=result_format, statement_mode=statement_mode)
+        
+        def execute_graphql():
+            return self._test_graphql(test_name, graphql_sampler, use_cache=use_cache,
+                                      connection_mode=connection_mode, query_mode=query_mode,
+                                      response_encoding=response_encoding, json_decoder=json_decoder)
+        
+        # Latency series per cache mode and run variant, e.g. "uncached:cold:unprepared:..."
+        series = ":".join(filter(None, ("cached" if use_cache else "uncached", run_variant({
+            "connection_mode": connection_mode,
+            "sql_statement_mode": statement_mode,
+            "sql_result_format": result_format,
+            "param_mode": param_mode,
+            "graphql_query_mode": query_mode,
+            "graphql_response_encoding": response_encoding,
+            "graphql_json_decoder": json_decoder
+        }))))
+        
+        async def run_sql():
+            return self._record_result(test_name, await execute_sql(), series, keep_payload)
+        
+        async def run_graphql():
+            return self._record_result(test_name, await execute_graphql(), series, keep_payload)
+        
+        # Warm plan caches, connections and Postgres buffers; results are discarded
+        if warmup_iterations:
+            await self._run_iterations(
+                warmup_iterations, execute_sql, execute_graphql,
+                execution_mode, iteration_delay, max_fanout
+            )
+        
+        sql_results, graphql_results = await self._run_iterations(
+            iterations, run_sql, run_graphql, execution_mode, iteration_delay, max_fanout
+        )
         
         # Calculate statistics
         sql_times = [r["execution_time_ms"] for r in sql_results if "error" not in r]
@@ -329,111 +801,419 @@ class PerformanceAnalyzer:
             "test_name": test_name,
             "description": test_config["description"],
             "iterations": iterations,
+            "warmup_iterations": warmup_iterations,
             "use_cache": use_cache,
+            "connection_mode": connection_mode,
+            "execution_mode": execution_mode,
+            "iteration_delay_seconds": iteration_delay,
+            "sql_result_format": result_format,
+            "sql_statement_mode": statement_mode,
+            "param_mode": param_mode,
+            "param_seed": sql_sampler.seed,
+            "graphql_response_encoding": response_encoding,
+            "graphql_json_decoder": json_decoder,
+            "graphql_query_mode": query_mode,
             "timestamp": datetime.utcnow().isoformat(),
-            "sql_stats": self._calculate_stats(sql_times) if sql_times else None,
-            "graphql_stats": self._calculate_stats(graphql_times) if graphql_times else None,
+            "sql_stats": self._calculate_sample_stats(sql_times) if sql_times else None,
+            "graphql_stats": self._calculate_sample_stats(graphql_times) if graphql_times else None,
+            "sql_phase_stats": self._calculate_phase_stats(sql_results),
+            "graphql_phase_stats": self._calculate_phase_stats(graphql_results),
+            "sql_payload_stats": self._calculate_payload_stats(sql_results),
+            "graphql_payload_stats": self._calculate_payload_stats(graphql_results),
+            "row_count_check": self._check_row_counts(test_config, sql_results, graphql_results),
+            "payload_equivalent": self.get_equivalence_status(test_name),
             "sql_results": sql_results,
             "graphql_results": graphql_results
         }
         
         # Add comparison metrics
         if sql_times and graphql_times:
-            sql_avg = statistics.mean(sql_times)
-            graphql_avg = statistics.mean(graphql_times)
-            
-            test_result["comparison"] = {
-                "sql_avg_ms": sql_avg,
-                "graphql_avg_ms": graphql_avg,
-                "performance_difference_percent": ((graphql_avg - sql_avg) / sql_avg) * 100,
-                "faster_option": "sql" if sql_avg < graphql_avg else "graphql"
-            }
+            test_result["comparison"] = self._compare_engines(sql_times, graphql_times)
+        
+        capture_plan = settings.TEST_CAPTURE_PLANS if capture_plan is None else capture_plan
+        if capture_plan and test_name not in self._plans_captured_this_run:
+            plan = await self.capture_query_plan(test_name, sql_times)
+            if plan:
+                test_result["sql_plan"] = {k: v for k, v in plan.items() if k != "plan"}
         
         return test_result
     
+    async def capture_query_plan(self, test_name: str,
+                                 client_times: Optional[List[float]] = None) -> Optional[Dict[str, Any]]:
+        """Capture the server-side execution breakdown for a test's SQL query
+        
+        Parameterized queries are explained with one set of sampled values.
+        """
+        try:
+            sampler, _ = await self._create_param_samplers(test_name)
+            params = sampler.sample()
+            plan = await self.db_manager.explain_query(self.test_queries[test_name]["sql"], params or None)
+        except Exception as e:
+            logger.error(f"Failed to capture query plan for '{test_name}': {e}")
+            return None
+        
+        plan["test_name"] = test_name
+        plan["params"] = sampler.graphql_variables(params)
+        plan["captured_at"] = datetime.utcnow().isoformat()
+        if client_times:
+            client_median = statistics.median(client_times)
+            server_ms = plan["planning_time_ms"] + plan["execution_time_ms"]
+            plan["client_median_ms"] = client_median
+            # Pool acquire, network, protocol decoding and Python materialisation
+            plan["client_overhead_ms"] = client_median - server_ms
+        
+        self.query_plans[test_name] = plan
+        self._plans_captured_this_run.add(test_name)
+        return plan
+    
+    def get_query_plans(self, include_plan: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Get the latest captured query plan breakdown per test"""
+        if include_plan:
+            return self.query_plans
+        return {
+            test_name: {k: v for k, v in plan.items() if k != "plan"}
+            for test_name, plan in self.query_plans.items()
+        }
+    
+    async def verify_equivalence(self, test_name: str, param_mode: Optional[str] = None,
+                                 seed: Optional[int] = None) -> Dict[str, Any]:
+        """Check that a test's SQL and GraphQL queries return the same data
+        
+        Both queries run once with the same parameter values. SQL rows are
+        streamed through a cursor into a PayloadDigest and discarded before the
+        GraphQL request is made, so only one payload is in memory at a time.
+        GraphQL payloads are flattened into join-style rows before hashing.
+        """
+        if test_name not in self.test_queries:
+            raise ValueError(f"Unknown test: {test_name}")
+        
+        test_config = self.test_queries[test_name]
+        sql_sampler, graphql_sampler = await self._create_param_samplers(test_name, param_mode, seed)
+        params = sql_sampler.sample()
+        variables = graphql_sampler.graphql_variables(graphql_sampler.sample())
+        check = {
+            "test_name": test_name,
+            "params": variables,
+            "param_seed": sql_sampler.seed,
+            "checked_at": datetime.utcnow().isoformat()
+        }
+        
+        try:
+            sql_digest = PayloadDigest()
+            stream = self.db_manager.stream_query(test_config["sql"], params or None)
+            async with aclosing(stream):
+                async for batch in stream:
+                    for row in batch:
+                        sql_digest.add(row.items())
+            check["sql"] = sql_digest.summary()
+        except Exception as e:
+            logger.error(f"SQL equivalence query for '{test_name}' failed: {e}")
+            check.update({"equivalent": None, "error": f"sql: {e}"})
+            self.equivalence_checks[test_name] = check
+            return check
+        
+        result = await self.execute_graphql_query(test_config["graphql"], variables=variables or None)
+        if "error" in result or result.get("errors"):
+            check.update({"equivalent": None, "error": f"graphql: {result.get('error') or result['errors']}"})
+            self.equivalence_checks[test_name] = check
+            return check
+        
+        graphql_digest = PayloadDigest()
+        for row in flatten_graphql(result["data"]):
+            graphql_digest.add(row)
+        check["graphql"] = graphql_digest.summary()
+        check.update(compare_digests(check["sql"], check["graphql"]))
+        
+        if not check["equivalent"]:
+            logger.warning(f"SQL and GraphQL payloads for '{test_name}' differ: {'; '.join(check['differences'])}")
+        self.equivalence_checks[test_name] = check
+        return check
+    
+    async def verify_all_equivalence(self, param_mode: Optional[str] = None,
+                                     seed: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """Run the equivalence check for every test in the catalog"""
+        checks = {}
+        for test_name in self.test_queries:
+            checks[test_name] = await self.verify_equivalence(test_name, param_mode, seed)
+        
+        flagged = [name for name, check in checks.items() if check["equivalent"] is False]
+        if flagged:
+            logger.warning(f"Non-equivalent SQL/GraphQL test pairs: {', '.join(flagged)}")
+        return checks
+    
+    def get_equivalence_status(self, test_name: str) -> Optional[bool]:
+        """Whether a test's payloads were found equivalent; None if unchecked or the check failed"""
+        check = self.equivalence_checks.get(test_name)
+        return check["equivalent"] if check else None
+    
     def _calculate_stats(self, times: List[float]) -> Dict[str, float]:
         """Calculate statistical metrics for execution times"""
         if not times:
             return {}
         
+        # Interpolated percentiles, so small samples don't just report max(times)
+        percentiles = statistics.quantiles(times, n=100, method="inclusive") if len(times) > 1 else times * 99
+        
         return {
             "min_ms": min(times),
             "max_ms": max(times),
             "avg_ms": statistics.mean(times),
             "median_ms": statistics.median(times),
             "std_dev_ms": statistics.stdev(times) if len(times) > 1 else 0,
-            "p95_ms": statistics.quantiles(times, n=20)[18] if len(times) >= 20 else max(times),
-            "p99_ms": statistics.quantiles(times, n=100)[98] if len(times) >= 100 else max(times)
+            "p90_ms": percentiles[89],
+            "p95_ms": percentiles[94],
+            "p99_ms": percentiles[98]
         }
     
-    async def run_concurrent_test(self, test_name: str, concurrent_users: int = 10, 
-                                duration_seconds: int = 60) -> Dict[str, Any]:
-        """Run concurrent user simulation test"""
-        logger.info(f"Running concurrent test '{test_name}' with {concurrent_users} users for {duration_seconds}s")
+    def _calculate_sample_stats(self, times: List[float]) -> Dict[str, Any]:
+        """Statistics plus bootstrap confidence intervals on the mean and median"""
+        stats = self._calculate_stats(times)
+        confidence = settings.TEST_CONFIDENCE_LEVEL
+        resamples = settings.TEST_BOOTSTRAP_RESAMPLES
         
-        self.test_status = "running_concurrent"
+        stats["confidence_level"] = confidence
+        stats["mean_ci_ms"] = bootstrap_ci(times, "mean", confidence, resamples)
+        stats["median_ci_ms"] = bootstrap_ci(times, "median", confidence, resamples)
+        return stats
+    
+    def _compare_engines(self, sql_times: List[float], graphql_times: List[float]) -> Dict[str, Any]:
+        """Compare engines, declaring a faster option only when the difference is significant"""
+        sql_avg = statistics.mean(sql_times)
+        graphql_avg = statistics.mean(graphql_times)
+        test = mann_whitney_u(sql_times, graphql_times)
+        significant = test["p_value"] < settings.TEST_SIGNIFICANCE_ALPHA
         
+        if not significant:
+            faster_option = "inconclusive"
+        else:
+            faster_option = "sql" if statistics.median(sql_times) < statistics.median(graphql_times) else "graphql"
+        
+        return {
+            "sql_avg_ms": sql_avg,
+            "graphql_avg_ms": graphql_avg,
+            "performance_difference_percent": ((graphql_avg - sql_avg) / sql_avg) * 100,
+            "difference_ci_ms": bootstrap_difference_ci(
+                sql_times, graphql_times, settings.TEST_CONFIDENCE_LEVEL, settings.TEST_BOOTSTRAP_RESAMPLES
+            ),
+            "test": "mann_whitney_u",
+            "p_value": test["p_value"],
+            "alpha": settings.TEST_SIGNIFICANCE_ALPHA,
+            "significant": significant,
+            "faster_option": faster_option
+        }
+    
+    def resolve_concurrency(self, test_name: str, concurrent_users: Optional[int] = None,
+                            duration_seconds: Optional[int] = None, load_model: Optional[str] = None,
+                            arrival_rate: Optional[float] = None,
+                            arrival_profile: Optional[str] = None) -> Dict[str, Any]:
+        """Concurrency options for a test: explicit values, then the scenario's profile, then defaults"""
         if test_name not in self.test_queries:
             raise ValueError(f"Unknown test: {test_name}")
         
-        test_config = self.test_queries[test_name]
-        results = []
-        start_time = time.time()
+        profile = self.test_queries[test_name].get("concurrency", {})
+        concurrent_users = concurrent_users or profile.get("concurrent_users", 10)
+        return {
+            "concurrent_users": concurrent_users,
+            "duration_seconds": duration_seconds or profile.get("duration_seconds", 60),
+            "load_model": load_model or profile.get("load_model", "open"),
+            "arrival_rate": arrival_rate or profile.get("arrival_rate") or float(concurrent_users),
+            "arrival_profile": arrival_profile or profile.get("arrival_profile", "fixed")
+        }
+    
+    async def run_concurrent_test(self, test_name: str, concurrent_users: Optional[int] = None,
+                                duration_seconds: Optional[int] = None, load_model: Optional[str] = None,
+                                arrival_rate: Optional[float] = None,
+                                arrival_profile: Optional[str] = None,
+                                use_cache: bool = False) -> Dict[str, Any]:
+        """Run concurrent user simulation test
+        
+        The default "open" load model issues requests at a target arrival rate
+        (concurrent_users requests/second unless arrival_rate is given). The
+        legacy "closed" model runs concurrent_users loops that wait for each
+        response and then sleep, which under-reports latency under saturation.
+        Unset arguments come from the scenario's concurrency profile.
+        With use_cache, results report how many cache misses were coalesced.
+        """
+        options = self.resolve_concurrency(test_name, concurrent_users, duration_seconds,
+                                           load_model, arrival_rate, arrival_profile)
+        concurrent_users = options["concurrent_users"]
+        duration_seconds = options["duration_seconds"]
+        load_model = options["load_model"]
+        
+        if load_model == "open":
+            return await self.run_open_loop_test(
+                test_name,
+                arrival_rate=options["arrival_rate"],
+                duration_seconds=duration_seconds,
+                profile=options["arrival_profile"],
+                use_cache=use_cache
+            )
+        if load_model != "closed":
+            raise ValueError(f"Unknown load model: {load_model}")
+        
+        logger.info(f"Running concurrent test '{test_name}' with {concurrent_users} users for {duration_seconds}s")
+        
+        self.test_status = "running_concurrent"
+        
+        sql_sampler, graphql_sampler = await self._create_param_samplers(test_name)
+        histograms = {"sql": LatencyHistogram(), "graphql": LatencyHistogram()}
+        counts = {"total": 0, "errors": 0}
+        single_flight_before = dict(self.cache_manager.single_flight_stats)
+        start_ns = now_ns()
+        duration_ns = duration_seconds * NS_PER_SECOND
+        
+        def record(result: Dict[str, Any]):
+            counts["total"] += 1
+            if "error" in result:
+                counts["errors"] += 1
+                return
+            histograms[result["query_type"]].record(result["execution_time_ms"])
+            self.latency_recorder.record(test_name, result["query_type"], "concurrent", result["execution_time_ms"])
         
         async def user_simulation(user_id: int):
             """Simulate a single user's queries"""
-            user_results = []
-            user_start = time.time()
+            request_count = 0
             
-            while (time.time() - start_time) < duration_seconds:
+            while elapsed_ns(start_ns) < duration_ns:
                 # Alternate between SQL and GraphQL
-                if len(user_results) % 2 == 0:
-                    result = await self.execute_sql_query(test_config["sql"])
-                    result["user_id"] = user_id
+                if request_count % 2 == 0:
+                    result = await self._test_sql(test_name, sql_sampler, use_cache=use_cache)
                 else:
-                    result = await self.execute_graphql_query(test_config["graphql"])
-                    result["user_id"] = user_id
+                    result = await self._test_graphql(test_name, graphql_sampler, use_cache=use_cache)
                 
-                user_results.append(result)
+                record(result)
+                request_count += 1
                 
                 # Random delay between requests (0.5-2 seconds)
                 await asyncio.sleep(random.uniform(0.5, 2.0))
-            
-            return user_results
         
         # Run concurrent users
         tasks = [user_simulation(i) for i in range(concurrent_users)]
-        all_user_results = await asyncio.gather(*tasks)
-        
-        # Flatten results
-        for user_results in all_user_results:
-            results.extend(user_results)
+        await asyncio.gather(*tasks)
         
         self.test_status = "idle"
         
-        # Analyze results
-        sql_results = [r for r in results if r.get("query_type") == "sql" and "error" not in r]
-        graphql_results = [r for r in results if r.get("query_type") == "graphql" and "error" not in r]
-        error_results = [r for r in results if "error" in r]
-        
         return {
             "test_name": f"{test_name}_concurrent",
+            "load_model": "closed",
             "concurrent_users": concurrent_users,
             "duration_seconds": duration_seconds,
-            "total_requests": len(results),
-            "successful_requests": len(sql_results) + len(graphql_results),
-            "error_rate_percent": (len(error_results) / len(results)) * 100 if results else 0,
-            "requests_per_second": len(results) / duration_seconds,
-            "sql_stats": self._calculate_stats([r["execution_time_ms"] for r in sql_results]),
-            "graphql_stats": self._calculate_stats([r["execution_time_ms"] for r in graphql_results]),
+            "use_cache": use_cache,
+            "single_flight": self._single_flight_delta(single_flight_before),
+            "total_requests": counts["total"],
+            "successful_requests": counts["total"] - counts["errors"],
+            "error_rate_percent": (counts["errors"] / counts["total"]) * 100 if counts["total"] else 0,
+            "requests_per_second": counts["total"] / duration_seconds,
+            "sql_stats": histograms["sql"].summary(),
+            "graphql_stats": histograms["graphql"].summary(),
             "timestamp": datetime.utcnow().isoformat()
         }
     
+    def _single_flight_delta(self, before: Dict[str, int]) -> Dict[str, Any]:
+        """Single-flight counts since a snapshot of the cache manager's counters"""
+        delta = {role: count - before[role] for role, count in self.cache_manager.single_flight_stats.items()}
+        misses = delta["leader"] + delta["coalesced"] + delta["remote"]
+        return {
+            **delta,
+            "mode": self.cache_manager.single_flight_mode,
+            "coalesced_percent": (delta["coalesced"] + delta["remote"]) / misses * 100 if misses else 0
+        }
+    
+    async def run_open_loop_test(self, test_name: str, arrival_rate: float,
+                                 duration_seconds: int = 60, profile: str = "fixed",
+                                 start_rate: Optional[float] = None,
+                                 step_rate: Optional[float] = None,
+                                 step_seconds: float = 10.0,
+                                 use_cache: bool = False) -> Dict[str, Any]:
+        """Run an open-loop arrival-rate test against each engine in turn
+        
+        Each engine gets the full arrival schedule so their saturation points
+        can be compared directly.
+        """
+        if test_name not in self.test_queries:
+            raise ValueError(f"Unknown test: {test_name}")
+        
+        logger.info(f"Running open-loop test '{test_name}' at {arrival_rate} req/s "
+                   f"({profile}) for {duration_seconds}s")
+        
+        self.test_status = "running_concurrent"
+        sql_sampler, graphql_sampler = await self._create_param_samplers(test_name)
+        generator = OpenLoopLoadGenerator()
+        engines = {
+            "sql": lambda: self._test_sql(test_name, sql_sampler, use_cache=use_cache),
+            "graphql": lambda: self._test_graphql(test_name, graphql_sampler, use_cache=use_cache)
+        }
+        single_flight_before = dict(self.cache_manager.single_flight_stats)
+        
+        try:
+            engine_results = {}
+            for engine, request in engines.items():
+                schedule = ArrivalSchedule(
+                    profile, arrival_rate, duration_seconds,
+                    start_rate=start_rate, step_rate=step_rate, step_seconds=step_seconds
+                )
+                engine_results[engine] = await generator.run(schedule, request)
+        finally:
+            self.test_status = "idle"
+        
+        return {
+            "test_name": f"{test_name}_concurrent",
+            "load_model": "open",
+            "arrival_profile": profile,
+            "target_rate_per_second": arrival_rate,
+            "duration_seconds": duration_seconds,
+            "use_cache": use_cache,
+            "single_flight": self._single_flight_delta(single_flight_before),
+            "sql": engine_results["sql"],
+            "graphql": engine_results["graphql"],
+            "sql_stats": engine_results["sql"]["corrected_stats"],
+            "graphql_stats": engine_results["graphql"]["corrected_stats"],
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    
+    async def _store_result(self, run: Dict[str, Any], test_result: Dict[str, Any]):
+        """Keep a result with its run and persist it if a store is configured"""
+        run["results"].append(test_result)
+        
+        if self.result_store:
+            try:
+                await self.result_store.record_result(run["run_id"], test_result)
+            except Exception as e:
+                logger.error(f"Failed to persist result for '{test_result.get('test_name')}': {e}")
+    
+    async def _start_run(self, kind: str, config: Dict[str, Any]) -> Dict[str, Any]:
+        """Open a run in the result store, if configured, and return it
+        
+        The run is passed to _store_result() and _finish_run(), so overlapping
+        runs keep their own id and results. test_results and current_run_id
+        follow the most recently started run; earlier runs are only kept in
+        the store.
+        """
+        run = {"run_id": None, "kind": kind, "results": []}
+        self.test_results = run["results"]
+        self._plans_captured_this_run = set()
+        if self.result_store:
+            try:
+                run["run_id"] = await self.result_store.start_run(kind, config)
+            except Exception as e:
+                logger.error(f"Failed to start run in result store: {e}")
+        self.current_run_id = run["run_id"]
+        return run
+    
+    async def _finish_run(self, run: Optional[Dict[str, Any]], status: str):
+        """Close a run in the result store, if configured and the run was opened"""
+        if self.result_store and run and run["run_id"] is not None:
+            try:
+                await self.result_store.finish_run(run["run_id"], status)
+            except Exception as e:
+                logger.error(f"Failed to finish run in result store: {e}")
+    
     async def run_comprehensive_tests(self):
         """Run all performance tests"""
         logger.info("Starting comprehensive performance tests...")
         self.test_status = "running_comprehensive"
-        self.test_results = []
+        self.latency_recorder.reset()
+        run = None
         
         try:
             # Test scenarios
@@ -441,31 +1221,61 @@ class PerformanceAnalyzer:
                 {"cache": False, "iterations": 10},
                 {"cache": True, "iterations": 10},
                 {"cache": False, "iterations": 50},  # Load test
+                {"cache": False, "iterations": 10, "connection_mode": "cold"},  # Connection setup cost
+                {"cache": False, "iterations": 10, "result_format": "records"},  # Without row materialisation
+                {"cache": False, "iterations": 10, "statement_mode": "unprepared"},  # Parse/plan cost
+                {"cache": False, "iterations": 10, "param_mode": "fixed"},  # Single hot row set
+                {"cache": False, "iterations": 10, "response_encoding": "gzip"},  # Transport compression
             ]
+            if "orjson" in available_decoders():
+                scenarios.append({"cache": False, "iterations": 10, "json_decoder": "orjson"})  # JSON parse cost
+            try:
+                await self.ensure_persisted_queries()
+                scenarios.append({"cache": False, "iterations": 10, "query_mode": "persisted"})  # Hasura parse/validate cost
+            except Exception as e:
+                logger.warning(f"Skipping persisted query scenario, registration failed: {e}")
+            run = await self._start_run("comprehensive", {"scenarios": scenarios})
+            
+            # Flag test pairs whose engines return different data before timing them
+            if settings.TEST_VERIFY_EQUIVALENCE:
+                await self.verify_all_equivalence()
             
             for scenario in scenarios:
                 for test_name in self.test_queries.keys():
                     test_result = await self.run_single_test(
                         test_name, 
-                        iterations=scenario["iterations"],
-                        use_cache=scenario["cache"]
+                        iterations=scenario.get("iterations"),
+                        use_cache=scenario["cache"],
+                        connection_mode=scenario.get("connection_mode", "warm"),
+                        result_format=scenario.get("result_format"),
+                        statement_mode=scenario.get("statement_mode"),
+                        param_mode=scenario.get("param_mode"),
+                        response_encoding=scenario.get("response_encoding"),
+                        json_decoder=scenario.get("json_decoder"),
+                        query_mode=scenario.get("query_mode")
                     )
-                    self.test_results.append(test_result)
+                    await self._store_result(run, test_result)
             
-            # Run concurrent tests
+            # Run concurrent tests, stepping the arrival rate up to find the saturation knee
             for test_name in ["simple_select", "customer_orders"]:
-                concurrent_result = await self.run_concurrent_test(
-                    test_name, 
-                    concurrent_users=20, 
-                    duration_seconds=60
+                concurrent_result = await self.run_open_loop_test(
+                    test_name,
+                    arrival_rate=100,
+                    duration_seconds=60,
+                    profile="step",
+                    start_rate=10,
+                    step_rate=10,
+                    step_seconds=6
                 )
-                self.test_results.append(concurrent_result)
+                await self._store_result(run, concurrent_result)
             
             self.test_status = "completed"
+            await self._finish_run(run, "completed")
             logger.info("Comprehensive performance tests completed")
             
         except Exception as e:
             self.test_status = "failed"
+            await self._finish_run(run, "failed")
             logger.error(f"Comprehensive tests failed: {e}")
             raise
     
@@ -510,56 +1320,122 @@ class PerformanceAnalyzer:
         }
     
     def get_test_results(self) -> List[Dict[str, Any]]:
-        """Get all test results"""
+        """Get results of the current (or most recent) run"""
         return self.test_results
+    
+    async def run_concurrent_and_record(self, test_name: str, concurrent_users: Optional[int] = None,
+                                        duration_seconds: Optional[int] = None, **kwargs) -> Dict[str, Any]:
+        """Run a concurrent test as its own run and persist the result"""
+        run = await self._start_run("concurrent", {"test_name": test_name, "concurrent_users": concurrent_users,
+                                                   "duration_seconds": duration_seconds, **kwargs})
+        try:
+            result = await self.run_concurrent_test(test_name, concurrent_users, duration_seconds, **kwargs)
+        except Exception:
+            await self._finish_run(run, "failed")
+            raise
+        await self._store_result(run, result)
+        await self._finish_run(run, "completed")
+        return result
+    
+    def get_latency_histograms(self) -> Dict[str, Dict[str, float]]:
+        """Get latency summaries for every recorded (test, engine, series) histogram"""
+        return self.latency_recorder.snapshot()
         
-    async def run_individual_test(self, test_name: str, iterations: int = 10, use_cache: bool = False) -> Dict[str, Any]:
+    async def run_individual_test(self, test_name: str, iterations: Optional[int] = None, use_cache: bool = False,
+                                  connection_mode: str = "warm",
+                                  execution_mode: Optional[str] = None,
+                                  iteration_delay: Optional[float] = None,
+                                  result_format: Optional[str] = None,
+                                  statement_mode: Optional[str] = None,
+                                  param_mode: Optional[str] = None,
+                                  response_encoding: Optional[str] = None,
+                                  json_decoder: Optional[str] = None,
+                                  query_mode: Optional[str] = None) -> Dict[str, Any]:
         """Run a single performance test"""
-        logger.info(f"Running individual test '{test_name}' with {iterations} iterations (cache: {use_cache})")
+        execution_mode = execution_mode or settings.TEST_EXECUTION_MODE
+        response_encoding = response_encoding or settings.GRAPHQL_RESPONSE_ENCODING
+        json_decoder = json_decoder or settings.GRAPHQL_JSON_DECODER
+        query_mode = query_mode or settings.GRAPHQL_QUERY_MODE
+        result_format = result_format or settings.TEST_SQL_RESULT_FORMAT
+        statement_mode = statement_mode or settings.TEST_SQL_STATEMENT_MODE
+        iteration_delay = settings.TEST_ITERATION_DELAY_SECONDS if iteration_delay is None else iteration_delay
         
         if test_name not in self.test_queries:
             raise ValueError(f"Unknown test: {test_name}")
         
+        iterations = iterations or self.test_queries[test_name].get("iterations", 10)
+        logger.info(f"Running individual test '{test_name}' with {iterations} iterations "
+                   f"(cache: {use_cache}, connection: {connection_mode}, mode: {execution_mode})")
+        
         self.test_status = "running_individual"
+        run = await self._start_run("individual", {"test_name": test_name, "iterations": iterations})
         
         try:
             test_config = self.test_queries[test_name]
             sql_query = test_config["sql"]
-            graphql_query = test_config["graphql"]
+            sql_sampler, graphql_sampler = await self._create_param_samplers(test_name, param_mode)
+            if query_mode == "persisted":
+                await self.ensure_persisted_queries()
             
-            # Run SQL test
-            sql_results = []
-            for i in range(iterations):
-                start_time = time.time()
-                _, sql_time = await self.db_manager.execute_query_async(sql_query)
-                sql_results.append(sql_time)
+            async def run_sql():
+                _, sql_time = await self.db_manager.execute_query_async(
+                    sql_query, sql_sampler.sample() or None,
+                    result_format=result_format, prepared=statement_mode == "prepared"
+                )
+                return sql_time / 1000.0  # Convert to seconds
             
-            # Run GraphQL test  
-            graphql_results = []
-            for i in range(iterations):
-                result = await self.execute_graphql_query(graphql_query, use_cache)
+            async def run_graphql():
+                result = await self._test_graphql(test_name, graphql_sampler,
+                                                  use_cache=use_cache, connection_mode=connection_mode,
+                                                  response_encoding=response_encoding,
+                                                  json_decoder=json_decoder, query_mode=query_mode)
                 if "error" not in result:
-                    graphql_results.append(result["execution_time_ms"] / 1000.0)  # Convert to seconds
-                else:
-                    graphql_results.append(0)
+                    return result["execution_time_ms"] / 1000.0  # Convert to seconds
+                return 0
+            
+            # Warm-up iterations are executed but excluded
+            if settings.TEST_WARMUP_ITERATIONS:
+                await self._run_iterations(
+                    settings.TEST_WARMUP_ITERATIONS, run_sql, run_graphql,
+                    execution_mode, iteration_delay, settings.TEST_MAX_FANOUT
+                )
+            
+            sql_results, graphql_results = await self._run_iterations(
+                iterations, run_sql, run_graphql, execution_mode, iteration_delay, settings.TEST_MAX_FANOUT
+            )
             
             # Calculate statistics
             avg_sql_time = sum(sql_results) / len(sql_results)
             avg_graphql_time = sum(graphql_results) / len(graphql_results)
+            sql_times = [t * 1000 for t in sql_results]
+            graphql_times = [t * 1000 for t in graphql_results if t]  # 0 marks a failed query
             
             test_result = {
                 "test_name": test_name,
                 "timestamp": datetime.utcnow().isoformat(),
                 "iterations": iterations,
                 "use_cache": use_cache,
+                "connection_mode": connection_mode,
+                "execution_mode": execution_mode,
+                "sql_result_format": result_format,
+                "sql_statement_mode": statement_mode,
+                "param_mode": sql_sampler.mode,
+                "graphql_response_encoding": response_encoding,
+                "graphql_json_decoder": json_decoder,
+                "graphql_query_mode": query_mode,
                 "sql_time": avg_sql_time,
                 "graphql_time": avg_graphql_time,
                 "sql_times": sql_results,
                 "graphql_times": graphql_results,
-                "performance_ratio": avg_graphql_time / avg_sql_time if avg_sql_time > 0 else 0
+                "performance_ratio": avg_graphql_time / avg_sql_time if avg_sql_time > 0 else 0,
+                "sql_stats": self._calculate_sample_stats(sql_times) if sql_times else None,
+                "graphql_stats": self._calculate_sample_stats(graphql_times) if graphql_times else None
             }
+            if sql_times and graphql_times:
+                test_result["comparison"] = self._compare_engines(sql_times, graphql_times)
             
-            self.test_results.append(test_result)
+            await self._store_result(run, test_result)
+            await self._finish_run(run, "completed")
             self.test_status = "completed"
             
             logger.info(f"Individual test '{test_name}' completed. SQL: {avg_sql_time:.3f}s, GraphQL: {avg_graphql_time:.3f}s")
@@ -569,8 +1445,734 @@ class PerformanceAnalyzer:
         except Exception as e:
             logger.error(f"Individual test '{test_name}' failed: {e}")
             self.test_status = "failed"
+            await self._finish_run(run, "failed")
             raise
         finally:
             # Reset status after a delay
             await asyncio.sleep(2)
             self.test_status = "idle"
+    
+    async def measure_streamed_scan(self, query: str, params: List = None,
+                                    batch_size: Optional[int] = None) -> Dict[str, Any]:
+        """Read a query through a server-side cursor, timing first row and throughput"""
+        start_ns = now_ns()
+        first_row_ns = None
+        rows = 0
+        batches = 0
+        
+        stream = self.db_manager.stream_query(query, params, batch_size)
+        async with aclosing(stream):
+            async for batch in stream:
+                if first_row_ns is None:
+                    first_row_ns = now_ns()
+                rows += len(batch)
+                batches += 1
+        total_ns = elapsed_ns(start_ns)
+        
+        return {
+            "mode": "streamed",
+            "rows": rows,
+            "batches": batches,
+            "batch_size": batch_size or settings.STREAM_BATCH_SIZE,
+            "time_to_first_row_ms": elapsed_ms(start_ns, first_row_ns) if first_row_ns else ns_to_ms(total_ns),
+            "total_time_ms": ns_to_ms(total_ns),
+            "rows_per_second": rows / ns_to_seconds(total_ns) if total_ns else 0
+        }
+    
+    async def measure_buffered_scan(self, query: str, params: List = None) -> Dict[str, Any]:
+        """Read a query with a single buffered fetch; the first row arrives with the last"""
+        rows, execution_time = await self.db_manager.execute_query_async(query, params, result_format="records")
+        return {
+            "mode": "buffered",
+            "rows": len(rows),
+            "time_to_first_row_ms": execution_time,
+            "total_time_ms": execution_time,
+            "rows_per_second": len(rows) / (execution_time / 1000) if execution_time else 0
+        }
+    
+    async def run_streaming_test(self, iterations: int = 3, row_limit: Optional[int] = None,
+                                 batch_size: Optional[int] = None,
+                                 compare_buffered: bool = True) -> Dict[str, Any]:
+        """Large-scan benchmark: time-to-first-row and rows/second, streamed vs buffered
+        
+        Scans up to row_limit (default TEST_STREAM_ROW_LIMIT) orders. The buffered
+        comparison holds the whole result in memory, so keep row_limit modest when
+        enabling it.
+        """
+        row_limit = row_limit or settings.TEST_STREAM_ROW_LIMIT
+        query = LARGE_SCAN_QUERY
+        params = [row_limit]
+        logger.info(f"Running streaming scan test ({iterations} iterations, {row_limit} rows)")
+        
+        self.test_status = "running_streaming"
+        run = await self._start_run("streaming", {"iterations": iterations, "row_limit": row_limit,
+                                                  "batch_size": batch_size, "compare_buffered": compare_buffered})
+        try:
+            streamed = [await self.measure_streamed_scan(query, params, batch_size) for _ in range(iterations)]
+            buffered = []
+            if compare_buffered:
+                buffered = [await self.measure_buffered_scan(query, params) for _ in range(iterations)]
+            
+            def summarize(samples: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+                if not samples:
+                    return None
+                return {
+                    "rows": samples[-1]["rows"],
+                    "time_to_first_row_ms": statistics.median(s["time_to_first_row_ms"] for s in samples),
+                    "total_time_ms": statistics.median(s["total_time_ms"] for s in samples),
+                    "rows_per_second": statistics.median(s["rows_per_second"] for s in samples)
+                }
+            
+            test_result = {
+                "test_name": "large_scan",
+                "description": "Large result set scan, streamed through a server-side cursor vs buffered",
+                "timestamp": datetime.utcnow().isoformat(),
+                "iterations": iterations,
+                "row_limit": row_limit,
+                "batch_size": batch_size or settings.STREAM_BATCH_SIZE,
+                "use_cache": False,
+                "sql_stats": self._calculate_stats([s["total_time_ms"] for s in streamed]),
+                "streamed": summarize(streamed),
+                "buffered": summarize(buffered),
+                "streamed_results": streamed,
+                "buffered_results": buffered
+            }
+            
+            await self._store_result(run, test_result)
+            await self._finish_run(run, "completed")
+            self.test_status = "completed"
+            return test_result
+        
+        except Exception as e:
+            logger.error(f"Streaming scan test failed: {e}")
+            await self._finish_run(run, "failed")
+            self.test_status = "failed"
+            raise
+        finally:
+            await asyncio.sleep(2)
+            self.test_status = "idle"
+    
+    async def _walk_pages(self, engine: str, table: str, strategy: str,
+                          pages: int, page_size: int) -> Dict[str, Any]:
+        """Read pages 0..pages-1 in order, timing each page request"""
+        key = PAGINATION_TARGETS[table]["key"]
+        latencies = []
+        last_key = None
+        error = None
+        
+        for page in range(pages):
+            query, args = page_request(engine, table, strategy, page, page_size, last_key)
+            if engine == "sql":
+                # Row dicts whatever TEST_SQL_RESULT_FORMAT is, so the last key can be read by name
+                result = await self.execute_sql_query(query, result_format="dicts", params=args)
+                rows = result.get("data")
+            else:
+                result = await self.execute_graphql_query(query, variables=args)
+                rows = (result.get("data") or {}).get(table)
+            
+            if "error" in result or result.get("errors"):
+                error = result.get("error") or str(result["errors"])
+                break
+            if not rows:
+                # Ran off the end of the table
+                break
+            latencies.append(result["execution_time_ms"])
+            last_key = rows[-1][key]
+        
+        return {"latencies_ms": latencies, "error": error}
+    
+    async def run_pagination_test(self, table: str = "customers", pages: Optional[int] = None,
+                                  page_size: Optional[int] = None, walks: int = 3,
+                                  strategies: Optional[List[str]] = None,
+                                  curve_points: int = 50) -> Dict[str, Any]:
+        """Pagination depth benchmark: page latency vs depth, OFFSET vs keyset, SQL vs GraphQL
+        
+        Every engine/strategy pair walks the first `pages` pages (default
+        TEST_PAGINATION_PAGES) of page_size rows in order, as a client paging
+        through a list would; keyset pages seek past the previous page's last
+        key. The walk is repeated `walks` times, rotating the pair order, and
+        each curve point is the median over walks. Curves are thinned to
+        curve_points pages; the growth summary uses every page.
+        """
+        if table not in PAGINATION_TARGETS:
+            raise ValueError(f"Unknown pagination table: {table}")
+        strategies = list(strategies or PAGINATION_STRATEGIES)
+        for strategy in strategies:
+            if strategy not in PAGINATION_STRATEGIES:
+                raise ValueError(f"Unknown pagination strategy: {strategy}")
+        pages = pages or settings.TEST_PAGINATION_PAGES
+        page_size = page_size or settings.TEST_PAGINATION_PAGE_SIZE
+        series = [(engine, strategy) for engine in ("sql", "graphql") for strategy in strategies]
+        logger.info(f"Running pagination test on {table} ({pages} pages of {page_size}, {walks} walks)")
+        
+        self.test_status = "running_pagination"
+        run = await self._start_run("pagination", {"table": table, "pages": pages, "page_size": page_size,
+                                                   "walks": walks, "strategies": strategies})
+        try:
+            walk_latencies = {f"{engine}_{strategy}": [] for engine, strategy in series}
+            errors = {}
+            for walk in range(walks):
+                shift = walk % len(series)
+                for engine, strategy in series[shift:] + series[:shift]:
+                    name = f"{engine}_{strategy}"
+                    result = await self._walk_pages(engine, table, strategy, pages, page_size)
+                    walk_latencies[name].append(result["latencies_ms"])
+                    if result["error"]:
+                        errors[name] = result["error"]
+            
+            curves = {}
+            summary = {}
+            for name, latencies in walk_latencies.items():
+                summary[name] = summarize_curve(latency_curve(latencies, page_size))
+                curves[name] = latency_curve(latencies, page_size, max_points=curve_points)
+            
+            def all_samples(engine: str) -> List[float]:
+                return [ms for strategy in strategies
+                        for walk in walk_latencies[f"{engine}_{strategy}"] for ms in walk]
+            
+            test_result = {
+                "test_name": f"pagination_depth_{table}",
+                "description": f"Page latency vs depth on {table}, OFFSET vs keyset pagination",
+                "timestamp": datetime.utcnow().isoformat(),
+                "table": table,
+                "pages": pages,
+                "page_size": page_size,
+                "walks": walks,
+                "strategies": strategies,
+                "use_cache": False,
+                "sql_stats": self._calculate_stats(all_samples("sql")),
+                "graphql_stats": self._calculate_stats(all_samples("graphql")),
+                "summary": summary,
+                "curves": curves,
+                "errors": errors
+            }
+            
+            await self._store_result(run, test_result)
+            await self._finish_run(run, "completed")
+            self.test_status = "completed"
+            return test_result
+        
+        except Exception as e:
+            logger.error(f"Pagination test failed: {e}")
+            await self._finish_run(run, "failed")
+            self.test_status = "failed"
+            raise
+        finally:
+            await asyncio.sleep(2)
+            self.test_status = "idle"
+    
+    async def _run_batch(self, mode: str, test_name: str, batch_size: int,
+                         sql_sampler: ParameterSampler, graphql_sampler: ParameterSampler,
+                         multi_root_query: Optional[str]) -> Dict[str, Any]:
+        """Run one batch of batch_size operations in the given "<engine>_<mode>" way"""
+        test_config = self.test_queries[test_name]
+        start_ns = now_ns()
+        
+        if mode == "sql_separate":
+            results = [await self._test_sql(test_name, sql_sampler) for _ in range(batch_size)]
+            errors = [r["error"] for r in results if "error" in r]
+            operation_times = [r["execution_time_ms"] for r in results if "error" not in r]
+        elif mode == "sql_single_connection":
+            param_sets = [sql_sampler.sample() for _ in range(batch_size)]
+            try:
+                _, operation_times, _ = await self.db_manager.execute_batch_async(
+                    test_config["sql"], param_sets, prepared=settings.TEST_SQL_STATEMENT_MODE == "prepared"
+                )
+                errors = []
+            except Exception as e:
+                operation_times, errors = [], [str(e)]
+        elif mode == "graphql_separate":
+            results = [await self._test_graphql(test_name, graphql_sampler) for _ in range(batch_size)]
+            errors = [r.get("error") or str(r["errors"]) for r in results if "error" in r or r.get("errors")]
+            operation_times = [r["execution_time_ms"] for r in results if "error" not in r]
+        elif mode == "graphql_array":
+            operations = [
+                (test_config["graphql"], graphql_sampler.graphql_variables(graphql_sampler.sample()) or None)
+                for _ in range(batch_size)
+            ]
+            result = await self.execute_graphql_batch(operations)
+            errors = [result["error"]] if "error" in result else [str(e) for e in result.get("errors", [])]
+            operation_times = []
+        else:
+            variable_sets = [graphql_sampler.graphql_variables(graphql_sampler.sample()) for _ in range(batch_size)]
+            result = await self.execute_graphql_query(multi_root_query, variables=merge_variables(variable_sets) or None)
+            errors = [result["error"]] if "error" in result else [str(e) for e in result.get("errors", [])]
+            operation_times = []
+        
+        batch_ms = elapsed_ms(start_ns)
+        return {
+            "batch_ms": batch_ms,
+            # Operations sent together share one latency: the whole batch
+            "operation_times_ms": operation_times or ([batch_ms] * batch_size if not errors else []),
+            "errors": errors
+        }
+    
+    async def run_batching_test(self, test_name: str, batch_size: Optional[int] = None,
+                                iterations: int = 10,
+                                modes: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Batching benchmark: N operations per round trip vs N separate calls
+        
+        Each iteration runs batch_size operations of the test, with freshly
+        sampled parameters per operation, in every mode:
+        
+        graphql_separate:      batch_size sequential GraphQL requests
+        graphql_array:         one request carrying a JSON array of operations
+        graphql_multi_root:    one operation with batch_size aliased root fields
+        sql_separate:          batch_size queries, each acquiring a pooled connection
+        sql_single_connection: batch_size queries back to back on one held connection
+        
+        Per-operation latency is each request's own latency for the separate
+        modes and the whole batch's latency for the batched ones; throughput is
+        operations per second of batch wall time. Modes are rotated between
+        iterations so drift does not favour one of them.
+        """
+        if test_name not in self.test_queries:
+            raise ValueError(f"Unknown test: {test_name}")
+        all_modes = [f"graphql_{mode}" for mode in GRAPHQL_BATCH_MODES] + [f"sql_{mode}" for mode in SQL_BATCH_MODES]
+        modes = list(modes or all_modes)
+        for mode in modes:
+            if mode not in all_modes:
+                raise ValueError(f"Unknown batching mode: {mode}")
+        batch_size = batch_size or settings.TEST_GRAPHQL_BATCH_SIZE
+        
+        multi_root_query = None
+        if "graphql_multi_root" in modes:
+            multi_root_query = merge_operations(self.test_queries[test_name]["graphql"], batch_size)
+        sql_sampler, graphql_sampler = await self._create_param_samplers(test_name)
+        logger.info(f"Running batching test '{test_name}' ({iterations} iterations of {batch_size} operations)")
+        
+        self.test_status = "running_batching"
+        run = await self._start_run("batching", {"test_name": test_name, "batch_size": batch_size,
+                                                 "iterations": iterations, "modes": modes})
+        try:
+            samples = {mode: [] for mode in modes}
+            for iteration in range(iterations):
+                shift = iteration % len(modes)
+                for mode in modes[shift:] + modes[:shift]:
+                    samples[mode].append(await self._run_batch(
+                        mode, test_name, batch_size, sql_sampler, graphql_sampler, multi_root_query
+                    ))
+            
+            summary = {}
+            for mode, batches in samples.items():
+                ok = [b for b in batches if not b["errors"]]
+                batch_times = [b["batch_ms"] for b in ok]
+                summary[mode] = {
+                    "batch_stats": self._calculate_stats(batch_times),
+                    "operation_stats": self._calculate_stats([t for b in ok for t in b["operation_times_ms"]]),
+                    "operations_per_second": batch_size / (statistics.median(batch_times) / 1000) if batch_times else 0,
+                    "failed_batches": len(batches) - len(ok),
+                    "errors": sorted({e for b in batches for e in b["errors"]})[:5]
+                }
+            
+            test_result = {
+                "test_name": f"batching_{test_name}",
+                "description": f"{batch_size} operations of {test_name} per round trip vs separate calls",
+                "timestamp": datetime.utcnow().isoformat(),
+                "source_test": test_name,
+                "batch_size": batch_size,
+                "iterations": iterations,
+                "param_seed": sql_sampler.seed,
+                "use_cache": False,
+                "modes": summary
+            }
+            # Stored per-engine stats are the best batched mode's per-operation latency
+            for engine, mode in (("sql", "sql_single_connection"), ("graphql", "graphql_array")):
+                if mode in summary and summary[mode]["operation_stats"]:
+                    test_result[f"{engine}_stats"] = summary[mode]["operation_stats"]
+            
+            await self._store_result(run, test_result)
+            await self._finish_run(run, "completed")
+            self.test_status = "completed"
+            return test_result
+        
+        except Exception as e:
+            logger.error(f"Batching test failed: {e}")
+            await self._finish_run(run, "failed")
+            self.test_status = "failed"
+            raise
+        finally:
+            await asyncio.sleep(2)
+            self.test_status = "idle"
+    
+    async def _run_cache_tier_pass(self, test_name: str, config: str, iterations: int,
+                                   seed: int) -> Tuple[List[Dict], List[Dict]]:
+        """One pass over a seeded parameter sequence with the given cache configuration"""
+        sql_sampler, graphql_sampler = await self._create_param_samplers(test_name, seed=seed)
+        use_cache = config != "none"
+        tiers = config if use_cache else None
+        sql_results = []
+        graphql_results = []
+        for _ in range(iterations):
+            sql_results.append(await self._test_sql(test_name, sql_sampler, use_cache=use_cache, cache_tiers=tiers))
+            graphql_results.append(await self._test_graphql(test_name, graphql_sampler, use_cache=use_cache,
+                                                            cache_tiers=tiers))
+        return sql_results, graphql_results
+    
+    async def run_cache_tier_test(self, test_name: str, iterations: Optional[int] = None) -> Dict[str, Any]:
+        """Cache tier benchmark: no cache vs L1 vs L2 vs L1+L2
+        
+        For every configuration the cache is emptied, one pass over a seeded
+        parameter sequence fills it, and a second pass over the same sequence
+        is measured. "none" measures the uncached queries. Each configuration
+        reports per-engine latency, hit rate and which tier served the hits;
+        latencies are also recorded as the "cache_<config>" latency series.
+        """
+        if test_name not in self.test_queries:
+            raise ValueError(f"Unknown test: {test_name}")
+        iterations = iterations or self.test_queries[test_name].get("iterations", 10)
+        seed = default_param_seed()
+        configs = ("none",) + CACHE_TIERS
+        logger.info(f"Running cache tier test '{test_name}' ({iterations} iterations per configuration)")
+        
+        self.test_status = "running_cache_tiers"
+        run = await self._start_run("cache_tiers", {"test_name": test_name, "iterations": iterations,
+                                                    "configs": list(configs)})
+        try:
+            summary = {}
+            for config in configs:
+                self.cache_manager.local_cache.clear()
+                await self.cache_manager.invalidate_cache_pattern("query:*")
+                if config != "none":
+                    await self._run_cache_tier_pass(test_name, config, iterations, seed)
+                sql_results, graphql_results = await self._run_cache_tier_pass(test_name, config, iterations, seed)
+                
+                summary[config] = {}
+                for engine, results in (("sql", sql_results), ("graphql", graphql_results)):
+                    ok = [r for r in results if "error" not in r]
+                    times = [r["execution_time_ms"] for r in ok]
+                    for value_ms in times:
+                        self.latency_recorder.record(test_name, engine, f"cache_{config}", value_ms)
+                    hits_by_tier = {}
+                    for r in ok:
+                        if r.get("cache_hit"):
+                            hits_by_tier[r["cache_tier"]] = hits_by_tier.get(r["cache_tier"], 0) + 1
+                    summary[config][engine] = {
+                        "stats": self._calculate_stats(times),
+                        "hit_rate_percent": sum(hits_by_tier.values()) / len(ok) * 100 if ok else 0,
+                        "hits_by_tier": hits_by_tier,
+                        "errors": len(results) - len(ok)
+                    }
+            
+            test_result = {
+                "test_name": f"cache_tiers_{test_name}",
+                "description": f"{test_name} with no cache, L1, L2 and L1+L2 caching",
+                "timestamp": datetime.utcnow().isoformat(),
+                "source_test": test_name,
+                "iterations": iterations,
+                "param_seed": seed,
+                "use_cache": True,
+                "configs": summary,
+                "cache_stats": await self.cache_manager.get_cache_stats()
+            }
+            # Stored per-engine stats are the layered configuration's
+            for engine in ("sql", "graphql"):
+                if summary["l1+l2"][engine]["stats"]:
+                    test_result[f"{engine}_stats"] = summary["l1+l2"][engine]["stats"]
+            
+            await self._store_result(run, test_result)
+            await self._finish_run(run, "completed")
+            self.test_status = "completed"
+            return test_result
+        
+        except Exception as e:
+            logger.error(f"Cache tier test failed: {e}")
+            await self._finish_run(run, "failed")
+            self.test_status = "failed"
+            raise
+        finally:
+            await asyncio.sleep(2)
+            self.test_status = "idle"
+    
+    async def run_cache_codec_test(self, test_name: str, iterations: int = 20) -> Dict[str, Any]:
+        """Cache codec benchmark on a test's real SQL and GraphQL results
+        
+        Both engines' results for one set of sampled parameters are encoded with
+        every installed codec and compression, reporting median encode/decode
+        time, encoded size, Redis memory per entry and whether the value came
+        back with its original types.
+        """
+        if test_name not in self.test_queries:
+            raise ValueError(f"Unknown test: {test_name}")
+        sql_sampler, graphql_sampler = await self._create_param_samplers(test_name)
+        logger.info(f"Running cache codec test '{test_name}' ({iterations} iterations per codec)")
+        
+        self.test_status = "running_cache_codecs"
+        run = await self._start_run("cache_codecs", {"test_name": test_name, "iterations": iterations})
+        try:
+            sql_result = await self._test_sql(test_name, sql_sampler, result_format="dicts")
+            graphql_result = await self._test_graphql(test_name, graphql_sampler)
+            
+            engines = {}
+            for engine, result in (("sql", sql_result), ("graphql", graphql_result)):
+                if "error" in result:
+                    raise RuntimeError(f"{engine} query failed: {result['error']}")
+                # Benchmark the value exactly as cache_query_result() stores it
+                entry = {"data": result["data"], "cached_at": time.time(), "ttl": settings.CACHE_TTL_SECONDS}
+                engines[engine] = {
+                    "row_count": result["row_count"],
+                    "codecs": await self.cache_manager.benchmark_codecs(entry, iterations)
+                }
+            
+            test_result = {
+                "test_name": f"cache_codecs_{test_name}",
+                "description": f"Cache entry encoding of {test_name} results per codec",
+                "timestamp": datetime.utcnow().isoformat(),
+                "source_test": test_name,
+                "iterations": iterations,
+                "param_seed": sql_sampler.seed,
+                "use_cache": False,
+                "configured_codec": self.cache_manager.codec.name,
+                "compression_min_bytes": settings.CACHE_COMPRESSION_MIN_BYTES,
+                "engines": engines
+            }
+            
+            await self._store_result(run, test_result)
+            await self._finish_run(run, "completed")
+            self.test_status = "completed"
+            return test_result
+        
+        except Exception as e:
+            logger.error(f"Cache codec test failed: {e}")
+            await self._finish_run(run, "failed")
+            self.test_status = "failed"
+            raise
+        finally:
+            await asyncio.sleep(2)
+            self.test_status = "idle"
+    
+    async def run_cache_refresh_test(self, test_name: str, duration_seconds: int = 60,
+                                     ttl_seconds: int = 5, concurrent_users: int = 10,
+                                     early_refresh_beta: float = 1.0) -> Dict[str, Any]:
+        """Cache expiry benchmark: hard TTL vs stale-while-revalidate vs early refresh
+        
+        Each policy runs concurrent_users closed-loop users against one hot key
+        (fixed parameters) with caching and a short TTL, so the entry expires
+        many times per run. With a hard TTL every expiry sends the next requests
+        to the database; stale-while-revalidate and XFetch early refresh reload
+        the entry in the background instead. Reports per-engine latency, the
+        p99 difference from hard TTL and how requests were served.
+        """
+        if test_name not in self.test_queries:
+            raise ValueError(f"Unknown test: {test_name}")
+        policies = {
+            "hard_ttl": {"ttl_seconds": ttl_seconds, "stale_seconds": 0, "early_refresh_beta": 0},
+            "stale_while_revalidate": {"ttl_seconds": ttl_seconds, "stale_seconds": ttl_seconds,
+                                       "early_refresh_beta": 0},
+            "early_refresh": {"ttl_seconds": ttl_seconds, "stale_seconds": 0,
+                              "early_refresh_beta": early_refresh_beta},
+            "stale_while_revalidate+early_refresh": {"ttl_seconds": ttl_seconds, "stale_seconds": ttl_seconds,
+                                                     "early_refresh_beta": early_refresh_beta}
+        }
+        logger.info(f"Running cache refresh test '{test_name}' ({len(policies)} policies, "
+                    f"{duration_seconds}s each, TTL {ttl_seconds}s)")
+        
+        self.test_status = "running_cache_refresh"
+        run = await self._start_run("cache_refresh", {"test_name": test_name, "duration_seconds": duration_seconds,
+                                                      "ttl_seconds": ttl_seconds, "concurrent_users": concurrent_users,
+                                                      "early_refresh_beta": early_refresh_beta})
+        try:
+            summary = {}
+            for name, policy in policies.items():
+                self.cache_manager.local_cache.clear()
+                await self.cache_manager.invalidate_cache_pattern("query:*")
+                sql_sampler, graphql_sampler = await self._create_param_samplers(test_name, "fixed")
+                histograms = {"sql": LatencyHistogram(), "graphql": LatencyHistogram()}
+                served = {"sql": {}, "graphql": {}}
+                refresh_before = dict(self.cache_manager.refresh_stats)
+                start_ns = now_ns()
+                duration_ns = duration_seconds * NS_PER_SECOND
+                
+                async def user_simulation(user_id: int):
+                    request_count = user_id
+                    while elapsed_ns(start_ns) < duration_ns:
+                        if request_count % 2 == 0:
+                            result = await self._test_sql(test_name, sql_sampler, use_cache=True,
+                                                          cache_policy=policy)
+                        else:
+                            result = await self._test_graphql(test_name, graphql_sampler, use_cache=True,
+                                                              cache_policy=policy)
+                        request_count += 1
+                        engine = result["query_type"]
+                        if "error" in result:
+                            outcome = "error"
+                        elif result.get("cache_hit"):
+                            outcome = result["cache_state"]
+                        else:
+                            outcome = "miss"
+                        served[engine][outcome] = served[engine].get(outcome, 0) + 1
+                        if outcome != "error":
+                            histograms[engine].record(result["execution_time_ms"])
+                            self.latency_recorder.record(test_name, engine, f"refresh_{name}",
+                                                         result["execution_time_ms"])
+                        await asyncio.sleep(random.uniform(0, 0.05))
+                
+                await asyncio.gather(*[user_simulation(i) for i in range(concurrent_users)])
+                summary[name] = {
+                    "policy": policy,
+                    **{f"{engine}_stats": histograms[engine].summary() for engine in histograms},
+                    "served": served,
+                    "refresh": {key: count - refresh_before[key]
+                                for key, count in self.cache_manager.refresh_stats.items()}
+                }
+            
+            for name, result in summary.items():
+                result["p99_vs_hard_ttl_ms"] = {
+                    engine: result[f"{engine}_stats"]["p99_ms"] - summary["hard_ttl"][f"{engine}_stats"]["p99_ms"]
+                    for engine in ("sql", "graphql")
+                    if result[f"{engine}_stats"] and summary["hard_ttl"][f"{engine}_stats"]
+                }
+            
+            test_result = {
+                "test_name": f"cache_refresh_{test_name}",
+                "description": f"{test_name} on one hot key with hard TTL vs stale-while-revalidate vs early refresh",
+                "timestamp": datetime.utcnow().isoformat(),
+                "source_test": test_name,
+                "duration_seconds": duration_seconds,
+                "ttl_seconds": ttl_seconds,
+                "concurrent_users": concurrent_users,
+                "use_cache": True,
+                "policies": summary
+            }
+            
+            await self._store_result(run, test_result)
+            await self._finish_run(run, "completed")
+            self.test_status = "completed"
+            return test_result
+        
+        except Exception as e:
+            logger.error(f"Cache refresh test failed: {e}")
+            await self._finish_run(run, "failed")
+            self.test_status = "failed"
+            raise
+        finally:
+            await asyncio.sleep(2)
+            self.test_status = "idle"
+    
+    async def _select_warm_tests(self, source: str, top_n: Optional[int]) -> List[str]:
+        """Scenario names to warm, most executed first for the "history" source"""
+        if source == "catalog":
+            return list(self.test_queries)[:top_n] if top_n else list(self.test_queries)
+        if not self.result_store:
+            raise ValueError("Warming from history needs a result store (RESULT_STORE_PATH)")
+        
+        # Derived results (e.g. "<test>_concurrent") are not scenarios and are skipped
+        frequency = await self.result_store.get_test_frequency(limit=max(top_n or 0, 1000))
+        tests = [row["test_name"] for row in frequency if row["test_name"] in self.test_queries]
+        if not tests:
+            raise ValueError("No recorded history for any current scenario")
+        return tests[:top_n] if top_n else tests
+    
+    async def warm_cache(self, source: str = "catalog", top_n: Optional[int] = None,
+                         params_per_test: Optional[int] = None, workers: Optional[int] = None,
+                         tiers: Optional[str] = None) -> Dict[str, Any]:
+        """Execute the selected tests' queries and cache their results under the real query keys
+        
+        Each test's SQL and GraphQL queries are executed uncached for up to
+        params_per_test distinct sampled parameter sets (seeded like test runs,
+        so with TEST_PARAM_SEED the warmed keys are the ones tests will hit), at
+        most workers executions at a time. Results are written to the cache in
+        pipelined batches of CACHE_WARM_BATCH_SIZE. Progress is kept in
+        warm_progress; the estimated time saved is the execution time of every
+        warmed query, which its first cached request no longer spends.
+        Callers starting a warm in the background set warm_progress to
+        "preparing" first, so a second warm is refused until this one ends.
+        """
+        params_per_test = params_per_test or settings.CACHE_WARM_PARAMS_PER_TEST
+        workers = workers or settings.CACHE_WARM_WORKERS
+        self.warm_progress = {"status": "preparing", "source": source,
+                              "started_at": datetime.utcnow().isoformat()}
+        try:
+            if source not in CACHE_WARM_SOURCES:
+                raise ValueError(f"Unknown cache warm source: {source}")
+            tests = await self._select_warm_tests(source, top_n)
+        except Exception as e:
+            self.warm_progress.update({"status": "failed", "error": str(e)})
+            raise
+        
+        self.warm_progress["tests"] = tests
+        run = await self._start_run("cache_warm", {"source": source, "tests": tests,
+                                                   "params_per_test": params_per_test, "workers": workers})
+        try:
+            jobs = []
+            for test_name in tests:
+                test_config = self.test_queries[test_name]
+                sql_sampler, graphql_sampler = await self._create_param_samplers(test_name)
+                seen = set()
+                for _ in range(params_per_test):
+                    params = sql_sampler.sample()
+                    variables = graphql_sampler.graphql_variables(graphql_sampler.sample())
+                    key = repr(params)
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    policy = test_config.get("cache")
+                    jobs.append((test_name, "sql", test_config["sql"], params or None, policy))
+                    jobs.append((test_name, "graphql", test_config["graphql"], variables or None, policy))
+            
+            progress = {"status": "running", "source": source, "tests": tests,
+                        "started_at": self.warm_progress["started_at"],
+                        "total": len(jobs), "completed": 0, "failed": 0, "cached": 0,
+                        "estimated_time_saved_ms": 0.0, "cached_bytes": 0}
+            self.warm_progress = progress
+            logger.info(f"Warming cache with {len(jobs)} queries from {len(tests)} tests ({source})")
+            
+            start_ns = now_ns()
+            semaphore = asyncio.Semaphore(workers)
+            pending = []
+            
+            async def flush():
+                batch = pending[:]
+                pending.clear()
+                stored = await self.cache_manager.warm_cache(batch, tiers)
+                progress["cached"] += stored["warmed"]
+                progress["failed"] += stored["total"] - stored["warmed"]
+                progress["cached_bytes"] += stored["bytes"]
+                progress["estimated_time_saved_ms"] += stored["compute_ms"]
+            
+            async def warm(job):
+                test_name, engine, query, params, policy = job
+                async with semaphore:
+                    if engine == "sql":
+                        response = await self.execute_sql_query(query, result_format="dicts", params=params)
+                        cache_params = params
+                    else:
+                        response = await self.execute_graphql_query(query, variables=params)
+                        cache_params = sorted(params.items()) if params else None
+                progress["completed"] += 1
+                if "error" in response or response.get("errors"):
+                    progress["failed"] += 1
+                    logger.warning(f"Cache warming of {test_name} ({engine}) failed: "
+                                   f"{response.get('error') or response.get('errors')}")
+                    return
+                pending.append({"query": query, "params": cache_params, "data": response["data"],
+                                "policy": policy, "compute_ms": response["execution_time_ms"]})
+                if len(pending) >= settings.CACHE_WARM_BATCH_SIZE:
+                    await flush()
+            
+            await asyncio.gather(*[warm(job) for job in jobs])
+            if pending:
+                await flush()
+            
+            progress.update({
+                "status": "completed",
+                "duration_ms": elapsed_ms(start_ns),
+                "finished_at": datetime.utcnow().isoformat()
+            })
+            await self._store_result(run, {
+                "test_name": "cache_warm",
+                "description": f"Cache warming from {source}",
+                "timestamp": progress["finished_at"],
+                "use_cache": True,
+                **{k: v for k, v in progress.items() if k not in ("status", "started_at", "finished_at")}
+            })
+            await self._finish_run(run, "completed")
+            logger.info(f"Cache warmed: {progress['cached']}/{progress['total']} queries in "
+                        f"{progress['duration_ms']:.0f}ms, ~{progress['estimated_time_saved_ms']:.0f}ms saved")
+            return progress
+        
+        except Exception as e:
+            logger.error(f"Cache warming failed: {e}")
+            self.warm_progress.update({"status": "failed", "error": str(e)})
+            await self._finish_run(run, "failed")
+            raise
@@ -0,0 +1,102 @@
+"""
+Registration of test queries as Hasura persisted queries (REST endpoints)
+"""
+
+import logging
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# "adhoc" posts the full query text on every request; "persisted" calls a
+# registered REST endpoint by name, so Hasura skips parsing and validation
+GRAPHQL_QUERY_MODES = ("adhoc", "persisted")
+
+# Path prefix of the REST endpoints created for test queries
+ENDPOINT_PREFIX = "perf"
+
+class PersistedQueryRegistry:
+    """Keeps Hasura's query collection and REST endpoints in sync with the scenarios
+
+    Every scenario's GraphQL query is stored in one query collection (which is
+    also added to the allow list) and exposed as POST /api/rest/perf/<test>.
+    Registration goes through the metadata API and replaces the whole
+    collection, so scenarios removed from the catalog disappear from Hasura too.
+    """
+
+    def __init__(self):
+        self.collection = settings.HASURA_QUERY_COLLECTION
+        self.registered_at: Optional[str] = None
+        self.endpoints: Dict[str, str] = {}
+
+    def endpoint_url(self, test_name: str) -> str:
+        """REST endpoint URL of a registered test query"""
+        return f"{settings.HASURA_REST_URL.rstrip('/')}/{self.endpoints[test_name]}"
+
+    async def _metadata(self, session: aiohttp.ClientSession, request: Dict[str, Any]) -> Any:
+        async with session.post(
+            settings.HASURA_METADATA_URL,
+            json=request,
+            headers={"x-hasura-admin-secret": settings.HASURA_ADMIN_SECRET}
+        ) as response:
+            body = await response.json(content_type=None)
+            if response.status != 200:
+                raise RuntimeError(f"Hasura metadata request failed ({response.status}): {body}")
+            return body
+
+    async def register(self, session: aiohttp.ClientSession, scenarios: Dict[str, Dict[str, Any]],
+                       catalog_version: Optional[str] = None) -> Dict[str, str]:
+        """Replace the collection and endpoints with the given scenarios' queries"""
+        try:
+            await self._metadata(session, {
+                "type": "drop_query_collection",
+                "args": {"collection": self.collection, "cascade": True}
+            })
+        except RuntimeError as e:
+            # Nothing to drop on first registration
+            if "not-exists" not in str(e) and "does not exist" not in str(e):
+                raise
+
+        endpoints = {name: f"{ENDPOINT_PREFIX}/{name}" for name in scenarios}
+        requests = [
+            {
+                "type": "create_query_collection",
+                "args": {
+                    "name": self.collection,
+                    "comment": "Performance monitor test queries",
+                    "definition": {
+                        "queries": [
+                            {"name": name, "query": scenario["graphql"]}
+                            for name, scenario in scenarios.items()
+                        ]
+                    }
+                }
+            },
+            {"type": "add_collection_to_allowlist", "args": {"collection": self.collection}}
+        ]
+        requests += [
+            {
+                "type": "create_rest_endpoint",
+                "args": {
+                    "name": name,
+                    "url": endpoints[name],
+                    "methods": ["POST"],
+                    "definition": {"query": {"collection_name": self.collection, "query_name": name}},
+                    "comment": scenarios[name]["description"]
+                }
+            }
+            for name in scenarios
+        ]
+        await self._metadata(session, {"type": "bulk", "args": requests})
+
+        self.endpoints = endpoints
+        self.registered_at = catalog_version
+        logger.info(f"Registered {len(endpoints)} persisted queries in Hasura collection '{self.collection}'")
+        return endpoints
+
+    def is_current(self, catalog_version: Optional[str]) -> bool:
+        """Whether the registered queries match the given scenario catalog load"""
+        return bool(self.endpoints) and self.registered_at == catalog_version
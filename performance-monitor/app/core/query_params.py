@@ -0,0 +1,170 @@
+"""
+Bind parameter sampling for parameterized test queries
+"""
+
+import logging
+import random
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from core.config import settings
+from core.database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+# Value distributions a test query parameter can declare
+DISTRIBUTIONS = ("constant", "choice", "uniform_int", "zipf", "date_range")
+
+# "sampled" draws every execution from the declared distributions; "fixed" always
+# uses each parameter's default, reproducing a single hot row set
+PARAM_MODES = ("sampled", "fixed")
+
+# Real values from the dataset that distributions can sample from
+PARAM_SOURCES = {
+    "customer_ids": "SELECT customer_id FROM customers ORDER BY customer_id",
+    "countries": "SELECT DISTINCT country FROM customers WHERE country IS NOT NULL ORDER BY country",
+}
+
+# Options each distribution requires; "choice" and "zipf" need either values or a source
+REQUIRED_OPTIONS = {
+    "constant": ("value",),
+    "choice": (),
+    "uniform_int": ("min", "max"),
+    "zipf": (),
+    "date_range": ("min_days_ago", "max_days_ago"),
+}
+
+def validate_param_spec(spec: Any) -> List[str]:
+    """Problems with a parameter spec, or an empty list if it is valid"""
+    if not isinstance(spec, dict):
+        return ["parameter must be a mapping"]
+    name = spec.get("name")
+    if not isinstance(name, str) or not name:
+        return ["parameter is missing a name"]
+
+    distribution = spec.get("distribution")
+    if distribution not in DISTRIBUTIONS:
+        return [f"parameter '{name}' has unknown distribution {distribution!r}"]
+
+    errors = [f"parameter '{name}' is missing '{option}'"
+              for option in REQUIRED_OPTIONS[distribution] if option not in spec]
+    if distribution in ("choice", "zipf"):
+        if "values" not in spec and "source" not in spec:
+            errors.append(f"parameter '{name}' needs 'values' or 'source'")
+        elif "source" in spec and spec["source"] not in PARAM_SOURCES:
+            errors.append(f"parameter '{name}' has unknown source {spec['source']!r}")
+    if distribution != "constant" and "default" not in spec:
+        errors.append(f"parameter '{name}' is missing 'default'")
+    return errors
+
+class ParameterSources:
+    """Loads and caches the real values used by "choice" and "zipf" parameters"""
+
+    def __init__(self, db_manager: DatabaseManager):
+        self.db_manager = db_manager
+        self.values: Dict[str, List[Any]] = {}
+
+    async def get(self, source: str) -> List[Any]:
+        """Values of a named source, loaded from the database on first use"""
+        if source not in self.values:
+            if source not in PARAM_SOURCES:
+                raise ValueError(f"Unknown parameter source: {source}")
+            rows, _ = await self.db_manager.execute_query_async(PARAM_SOURCES[source], result_format="records")
+            self.values[source] = [row[0] for row in rows]
+            logger.info(f"Loaded {len(self.values[source])} values for parameter source '{source}'")
+        return self.values[source]
+
+    def clear(self):
+        """Forget loaded values, e.g. after regenerating data"""
+        self.values = {}
+
+class ParameterSampler:
+    """Draws bind parameter values for one test query
+
+    Each spec is a dict with a name (the GraphQL variable name; SQL parameters
+    are bound as $1..$n in spec order), a distribution and its options:
+
+    constant:    value
+    choice:      values, or source (uniform over the values)
+    uniform_int: min, max, optional step
+    zipf:        source or values, optional exponent (default 1.1); ranks are
+                 shuffled with the sampler's seed so hot keys are spread over
+                 the key space rather than being the lowest ids
+    date_range:  min_days_ago, max_days_ago (relative to today)
+
+    Every spec also has a default, used in "fixed" mode. Samplers created with
+    the same seed produce the same sequence, so SQL and GraphQL can be given the
+    same workload without sharing a sampler.
+    """
+
+    def __init__(self, specs: List[Dict[str, Any]], seed: Optional[int] = None, mode: str = "sampled"):
+        if mode not in PARAM_MODES:
+            raise ValueError(f"Unknown parameter mode: {mode}")
+        for spec in specs:
+            if spec["distribution"] not in DISTRIBUTIONS:
+                raise ValueError(f"Unknown distribution for parameter '{spec['name']}': {spec['distribution']}")
+
+        self.specs = specs
+        self.seed = seed
+        self.mode = mode
+        self.rng = random.Random(seed)
+        self._values: Dict[str, List[Any]] = {}
+        self._zipf_cdf: Dict[str, np.ndarray] = {}
+
+    async def load(self, sources: ParameterSources):
+        """Resolve source-backed values and precompute Zipfian weights"""
+        for spec in self.specs:
+            name = spec["name"]
+            if spec["distribution"] in ("choice", "zipf"):
+                values = list(spec["values"]) if "values" in spec else list(await sources.get(spec["source"]))
+                if not values:
+                    raise ValueError(f"No values to sample for parameter '{name}'")
+                self._values[name] = values
+
+            if spec["distribution"] == "zipf":
+                # Rank r has weight 1 / r^s; shuffle which key holds which rank
+                self.rng.shuffle(self._values[name])
+                ranks = np.arange(1, len(self._values[name]) + 1, dtype=float)
+                weights = ranks ** -spec.get("exponent", 1.1)
+                self._zipf_cdf[name] = np.cumsum(weights) / weights.sum()
+
+    def _draw(self, spec: Dict[str, Any]) -> Any:
+        distribution = spec["distribution"]
+        name = spec["name"]
+
+        if distribution == "constant":
+            return spec["value"]
+        if distribution == "choice":
+            return self.rng.choice(self._values[name])
+        if distribution == "uniform_int":
+            return self.rng.randrange(spec["min"], spec["max"] + 1, spec.get("step", 1))
+        if distribution == "zipf":
+            index = int(np.searchsorted(self._zipf_cdf[name], self.rng.random(), side="right"))
+            return self._values[name][min(index, len(self._values[name]) - 1)]
+        days_ago = self.rng.randint(spec["min_days_ago"], spec["max_days_ago"])
+        return date.today() - timedelta(days=days_ago)
+
+    def _default(self, spec: Dict[str, Any]) -> Any:
+        value = spec.get("default", spec.get("value"))
+        if spec["distribution"] == "date_range" and isinstance(value, str):
+            return date.fromisoformat(value)
+        return value
+
+    def sample(self) -> List[Any]:
+        """Next set of values, in spec order (the SQL $n order)"""
+        if self.mode == "fixed":
+            return [self._default(spec) for spec in self.specs]
+        return [self._draw(spec) for spec in self.specs]
+
+    def graphql_variables(self, values: List[Any]) -> Dict[str, Any]:
+        """The same values as JSON-ready GraphQL variables"""
+        return {
+            spec["name"]: value.isoformat() if isinstance(value, date) else value
+            for spec, value in zip(self.specs, values)
+        }
+
+def default_param_seed() -> int:
+    """TEST_PARAM_SEED if set, otherwise a fresh random seed"""
+    return settings.TEST_PARAM_SEED if settings.TEST_PARAM_SEED is not None else random.randrange(2 ** 32)
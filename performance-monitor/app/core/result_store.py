@@ -0,0 +1,315 @@
+"""
+Persistent storage for performance test runs and results
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    finished_at TEXT,
+    config TEXT
+);
+
+CREATE TABLE IF NOT EXISTS scenarios (
+    scenario_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id INTEGER REFERENCES runs(run_id) ON DELETE CASCADE,
+    test_name TEXT NOT NULL,
+    cache_mode TEXT NOT NULL,
+    variant TEXT NOT NULL DEFAULT '',
+    iterations INTEGER,
+    created_at TEXT NOT NULL,
+    result TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS scenario_stats (
+    scenario_id INTEGER REFERENCES scenarios(scenario_id) ON DELETE CASCADE,
+    test_name TEXT NOT NULL,
+    engine TEXT NOT NULL,
+    cache_mode TEXT NOT NULL,
+    variant TEXT NOT NULL DEFAULT '',
+    created_at TEXT NOT NULL,
+    sample_count INTEGER,
+    min_ms REAL,
+    avg_ms REAL,
+    p50_ms REAL,
+    p90_ms REAL,
+    p95_ms REAL,
+    p99_ms REAL,
+    p999_ms REAL,
+    max_ms REAL,
+    significant INTEGER,
+    PRIMARY KEY (scenario_id, engine)
+);
+
+CREATE INDEX IF NOT EXISTS idx_runs_started_at ON runs(started_at);
+CREATE INDEX IF NOT EXISTS idx_scenarios_run ON scenarios(run_id);
+CREATE INDEX IF NOT EXISTS idx_scenarios_lookup ON scenarios(test_name, cache_mode, variant, created_at);
+CREATE INDEX IF NOT EXISTS idx_scenarios_created_at ON scenarios(created_at);
+CREATE INDEX IF NOT EXISTS idx_stats_lookup ON scenario_stats(test_name, engine, cache_mode, variant, created_at);
+"""
+
+ENGINES = ("sql", "graphql")
+
+# Run settings that change what a test measures, in variant label order
+VARIANT_FIELDS = (
+    "connection_mode",
+    "sql_statement_mode",
+    "sql_result_format",
+    "param_mode",
+    "graphql_query_mode",
+    "graphql_response_encoding",
+    "graphql_json_decoder"
+)
+
+def run_variant(result: Dict[str, Any]) -> str:
+    """Label for the run settings of a result, e.g. "cold:unprepared:dicts:sampled:adhoc:identity:json"
+
+    Results are only averaged and compared with results of the same variant.
+    Results without these settings get an empty variant.
+    """
+    return ":".join(str(result[field]) for field in VARIANT_FIELDS if result.get(field) is not None)
+
+class ResultStore:
+    """SQLite-backed store of test runs, scenarios and per-percentile summaries
+
+    Results are written as each test completes, so a crashed or restarted
+    service keeps everything recorded so far. SQLite calls run in a worker
+    thread and are serialized with a lock.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.RESULT_STORE_PATH
+        self.connection: Optional[sqlite3.Connection] = None
+        self._lock = asyncio.Lock()
+
+    async def connect(self):
+        """Open the store and create the schema if needed"""
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.row_factory = sqlite3.Row
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA foreign_keys=ON")
+            self.connection.executescript(SCHEMA)
+            self.connection.commit()
+            logger.info(f"Result store opened at {self.path}")
+        except Exception as e:
+            logger.error(f"Failed to open result store: {e}")
+            raise
+
+    async def disconnect(self):
+        """Close the store"""
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+        logger.info("Result store closed")
+
+    async def _run(self, func, *args):
+        async with self._lock:
+            return await asyncio.to_thread(func, *args)
+
+    @staticmethod
+    def _cache_mode(result: Dict[str, Any]) -> str:
+        return "cached" if result.get("use_cache") else "uncached"
+
+    @staticmethod
+    def _significant(result: Dict[str, Any]) -> Optional[int]:
+        """1 if the engines differed significantly, 0 if not, None without a comparison"""
+        significant = result.get("comparison", {}).get("significant")
+        return None if significant is None else int(significant)
+
+    # Writes
+
+    async def start_run(self, kind: str, config: Dict[str, Any] = None) -> int:
+        """Create a run and return its id"""
+        def insert():
+            cursor = self.connection.execute(
+                "INSERT INTO runs (kind, status, started_at, config) VALUES (?, ?, ?, ?)",
+                (kind, "running", datetime.utcnow().isoformat(), json.dumps(config or {}, default=str))
+            )
+            self.connection.commit()
+            return cursor.lastrowid
+
+        return await self._run(insert)
+
+    async def finish_run(self, run_id: int, status: str = "completed"):
+        """Mark a run as finished"""
+        def update():
+            self.connection.execute(
+                "UPDATE runs SET status = ?, finished_at = ? WHERE run_id = ?",
+                (status, datetime.utcnow().isoformat(), run_id)
+            )
+            self.connection.commit()
+
+        await self._run(update)
+
+    async def record_result(self, run_id: Optional[int], result: Dict[str, Any]) -> int:
+        """Store one test result and its per-engine percentile summaries"""
+        created_at = result.get("timestamp") or datetime.utcnow().isoformat()
+        cache_mode = self._cache_mode(result)
+        variant = run_variant(result)
+        significant = self._significant(result)
+
+        def insert():
+            cursor = self.connection.execute(
+                "INSERT INTO scenarios (run_id, test_name, cache_mode, variant, iterations, created_at, result) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (run_id, result["test_name"], cache_mode, variant, result.get("iterations"),
+                 created_at, json.dumps(result, default=str))
+            )
+            scenario_id = cursor.lastrowid
+
+            for engine in ENGINES:
+                stats = result.get(f"{engine}_stats")
+                if not stats:
+                    continue
+                self.connection.execute(
+                    "INSERT INTO scenario_stats (scenario_id, test_name, engine, cache_mode, variant, created_at, "
+                    "sample_count, min_ms, avg_ms, p50_ms, p90_ms, p95_ms, p99_ms, p999_ms, max_ms, significant) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (scenario_id, result["test_name"], engine, cache_mode, variant, created_at,
+                     stats.get("count", result.get("iterations")), stats.get("min_ms"), stats.get("avg_ms"),
+                     stats.get("median_ms"), stats.get("p90_ms"), stats.get("p95_ms"),
+                     stats.get("p99_ms"), stats.get("p999_ms"), stats.get("max_ms"), significant)
+                )
+
+            self.connection.commit()
+            return scenario_id
+
+        return await self._run(insert)
+
+    async def clear(self) -> int:
+        """Delete all stored runs and results"""
+        def delete():
+            deleted = self.connection.execute("SELECT COUNT(*) FROM scenarios").fetchone()[0]
+            self.connection.execute("DELETE FROM scenario_stats")
+            self.connection.execute("DELETE FROM scenarios")
+            self.connection.execute("DELETE FROM runs")
+            self.connection.commit()
+            return deleted
+
+        return await self._run(delete)
+
+    # Queries
+
+    async def get_results(self, limit: int = 50, offset: int = 0, test_name: str = None,
+                          cache_mode: str = None, variant: str = None, run_id: int = None,
+                          since: str = None, until: str = None) -> Dict[str, Any]:
+        """Page through stored results, newest first"""
+        conditions, params = [], []
+        for column, value in (("test_name", test_name), ("cache_mode", cache_mode),
+                              ("variant", variant), ("run_id", run_id)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if since:
+            conditions.append("created_at >= ?")
+            params.append(since)
+        if until:
+            conditions.append("created_at < ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        def select():
+            total = self.connection.execute(f"SELECT COUNT(*) FROM scenarios {where}", params).fetchone()[0]
+            rows = self.connection.execute(
+                f"SELECT scenario_id, run_id, variant, result FROM scenarios {where} "
+                f"ORDER BY created_at DESC, scenario_id DESC LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+            results = []
+            for row in rows:
+                result = json.loads(row["result"])
+                result["scenario_id"] = row["scenario_id"]
+                result["run_id"] = row["run_id"]
+                result["variant"] = row["variant"]
+                results.append(result)
+            return {"results": results, "total_results": total}
+
+        return await self._run(select)
+
+    async def get_runs(self, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+        """List runs, newest first"""
+        def select():
+            rows = self.connection.execute(
+                "SELECT r.run_id, r.kind, r.status, r.started_at, r.finished_at, r.config, "
+                "COUNT(s.scenario_id) AS scenario_count "
+                "FROM runs r LEFT JOIN scenarios s ON s.run_id = r.run_id "
+                "GROUP BY r.run_id ORDER BY r.started_at DESC LIMIT ? OFFSET ?",
+                (limit, offset)
+            ).fetchall()
+            return [{**dict(row), "config": json.loads(row["config"] or "{}")} for row in rows]
+
+        return await self._run(select)
+
+    async def get_test_frequency(self, limit: int = 10, since: str = None) -> List[Dict[str, Any]]:
+        """Tests ordered by how many query executions were recorded for them"""
+        where, params = "", []
+        if since:
+            where = "WHERE created_at >= ?"
+            params.append(since)
+
+        def select():
+            rows = self.connection.execute(
+                "SELECT test_name, SUM(sample_count) AS executions, MAX(created_at) AS last_run_at "
+                f"FROM scenario_stats {where} "
+                "GROUP BY test_name ORDER BY executions DESC LIMIT ?",
+                params + [limit]
+            ).fetchall()
+            return [dict(row) for row in rows]
+
+        return await self._run(select)
+
+    async def get_engine_summary(self, test_name: str = None, variant: str = None, since: str = None,
+                                 until: str = None) -> List[Dict[str, Any]]:
+        """Average percentile summaries grouped by test, engine, cache mode and variant
+
+        compared_count is the number of scenarios with an engine comparison and
+        significant_count how many of those found a significant difference.
+        """
+        conditions, params = [], []
+        if test_name:
+            conditions.append("test_name = ?")
+            params.append(test_name)
+        if variant is not None:
+            conditions.append("variant = ?")
+            params.append(variant)
+        if since:
+            conditions.append("created_at >= ?")
+            params.append(since)
+        if until:
+            conditions.append("created_at < ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        def select():
+            rows = self.connection.execute(
+                "SELECT test_name, engine, cache_mode, variant, COUNT(*) AS scenario_count, "
+                "SUM(sample_count) AS sample_count, AVG(avg_ms) AS avg_ms, AVG(p50_ms) AS p50_ms, "
+                "AVG(p95_ms) AS p95_ms, AVG(p99_ms) AS p99_ms, MAX(max_ms) AS max_ms, "
+                "MAX(created_at) AS last_run_at, COUNT(significant) AS compared_count, "
+                "COALESCE(SUM(significant), 0) AS significant_count "
+                f"FROM scenario_stats {where} "
+                "GROUP BY test_name, engine, cache_mode, variant ORDER BY test_name, cache_mode, variant, engine",
+                params
+            ).fetchall()
+            return [dict(row) for row in rows]
+
+        return await self._run(select)
@@ -0,0 +1,181 @@
+"""
+Test scenario catalog loaded from YAML files
+"""
+
+import logging
+import os
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import yaml
+
+from core.cache import CACHE_POLICY_FIELDS
+from core.config import settings
+from core.load_generator import ARRIVAL_PROFILES
+from core.query_params import validate_param_spec
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_FIELDS = ("name", "description", "sql", "graphql")
+OPTIONAL_FIELDS = ("params", "iterations", "concurrency", "expected_rows", "cache")
+CONCURRENCY_FIELDS = ("concurrent_users", "duration_seconds", "load_model", "arrival_rate", "arrival_profile")
+LOAD_MODELS = ("open", "closed")
+ENGINES = ("sql", "graphql")
+
+_SQL_PLACEHOLDER = re.compile(r"\$(\d+)")
+
+class ScenarioError(ValueError):
+    """Raised when scenario files are missing or invalid"""
+
+    def __init__(self, errors: List[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+def validate_scenario(scenario: Any) -> List[str]:
+    """Problems with one scenario definition, or an empty list if it is valid"""
+    if not isinstance(scenario, dict):
+        return ["scenario must be a mapping"]
+
+    errors = [f"missing '{field}'" for field in REQUIRED_FIELDS
+              if not isinstance(scenario.get(field), str) or not scenario[field].strip()]
+    errors += [f"unknown field '{field}'" for field in scenario
+               if field not in REQUIRED_FIELDS + OPTIONAL_FIELDS]
+
+    params = scenario.get("params", [])
+    if not isinstance(params, list):
+        errors.append("'params' must be a list")
+        params = []
+    for spec in params:
+        errors += validate_param_spec(spec)
+    names = [spec.get("name") for spec in params if isinstance(spec, dict)]
+    if len(names) != len(set(names)):
+        errors.append("parameter names must be unique")
+
+    # SQL binds $1..$n in params order, so every placeholder needs a parameter
+    if isinstance(scenario.get("sql"), str):
+        placeholders = {int(n) for n in _SQL_PLACEHOLDER.findall(scenario["sql"])}
+        if placeholders != set(range(1, len(params) + 1)):
+            errors.append(f"SQL placeholders {sorted(placeholders)} do not match {len(params)} params")
+
+    iterations = scenario.get("iterations", 1)
+    if not isinstance(iterations, int) or iterations < 1:
+        errors.append("'iterations' must be a positive integer")
+
+    concurrency = scenario.get("concurrency", {})
+    if not isinstance(concurrency, dict):
+        errors.append("'concurrency' must be a mapping")
+    else:
+        errors += [f"unknown concurrency field '{field}'" for field in concurrency if field not in CONCURRENCY_FIELDS]
+        if concurrency.get("load_model", "open") not in LOAD_MODELS:
+            errors.append(f"unknown load model {concurrency['load_model']!r}")
+        if concurrency.get("arrival_profile", "fixed") not in ARRIVAL_PROFILES:
+            errors.append(f"unknown arrival profile {concurrency['arrival_profile']!r}")
+
+    cache = scenario.get("cache", {})
+    if not isinstance(cache, dict):
+        errors.append("'cache' must be a mapping")
+    else:
+        errors += [f"unknown cache field '{field}'" for field in cache if field not in CACHE_POLICY_FIELDS]
+        errors += [f"cache.{field} must be a non-negative number" for field, value in cache.items()
+                   if field in CACHE_POLICY_FIELDS
+                   and (isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0)]
+        if cache.get("ttl_seconds") == 0:
+            errors.append("cache.ttl_seconds must be positive")
+
+    expected_rows = scenario.get("expected_rows", {})
+    if not isinstance(expected_rows, dict):
+        errors.append("'expected_rows' must be a mapping")
+    else:
+        for engine, bounds in expected_rows.items():
+            if engine not in ENGINES:
+                errors.append(f"unknown expected_rows engine '{engine}'")
+            elif not isinstance(bounds, dict) or not set(bounds) <= {"min", "max"} or not bounds:
+                errors.append(f"expected_rows.{engine} must have 'min' and/or 'max'")
+
+    return errors
+
+class ScenarioCatalog:
+    """Validated test scenarios, one YAML file per scenario
+
+    Files are read and validated once at startup and kept in memory. reload()
+    re-reads the directory and only replaces the catalog if every file is
+    valid, so a bad edit never removes working scenarios.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or settings.SCENARIO_DIR
+        self.scenarios: Dict[str, Dict[str, Any]] = {}
+        self.loaded_at: Optional[str] = None
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.isdir(self.directory):
+            raise ScenarioError([f"scenario directory {self.directory} does not exist"])
+
+        scenarios, errors = {}, []
+        for filename in sorted(os.listdir(self.directory)):
+            if not filename.endswith((".yaml", ".yml")):
+                continue
+            path = os.path.join(self.directory, filename)
+            try:
+                with open(path) as f:
+                    scenario = yaml.safe_load(f)
+            except (OSError, yaml.YAMLError) as e:
+                errors.append(f"{filename}: {e}")
+                continue
+
+            problems = validate_scenario(scenario)
+            if problems:
+                errors += [f"{filename}: {problem}" for problem in problems]
+                continue
+            if scenario["name"] in scenarios:
+                errors.append(f"{filename}: duplicate scenario name '{scenario['name']}'")
+                continue
+
+            scenario.setdefault("params", [])
+            scenario.setdefault("concurrency", {})
+            scenario.setdefault("expected_rows", {})
+            scenario.setdefault("cache", {})
+            scenario["source_file"] = filename
+            scenarios[scenario["name"]] = scenario
+
+        if errors:
+            raise ScenarioError(errors)
+        if not scenarios:
+            raise ScenarioError([f"no scenario files found in {self.directory}"])
+        return scenarios
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """Read and validate every scenario file, replacing the catalog on success"""
+        self.scenarios = self._read()
+        self.loaded_at = datetime.utcnow().isoformat()
+        logger.info(f"Loaded {len(self.scenarios)} test scenarios from {self.directory}")
+        return self.scenarios
+
+    def reload(self) -> Dict[str, Any]:
+        """Reload the scenario files; the current catalog is kept if any file is invalid"""
+        previous = set(self.scenarios)
+        self.load()
+        current = set(self.scenarios)
+        return {
+            "scenarios": sorted(current),
+            "added": sorted(current - previous),
+            "removed": sorted(previous - current),
+            "loaded_at": self.loaded_at
+        }
+
+    def describe(self) -> List[Dict[str, Any]]:
+        """Summary of every scenario for listing endpoints"""
+        return [
+            {
+                "name": name,
+                "description": scenario["description"],
+                "params": [spec["name"] for spec in scenario["params"]],
+                "iterations": scenario.get("iterations"),
+                "concurrency": scenario["concurrency"],
+                "expected_rows": scenario["expected_rows"],
+                "cache": scenario["cache"],
+                "source_file": scenario["source_file"]
+            }
+            for name, scenario in self.scenarios.items()
+        ]
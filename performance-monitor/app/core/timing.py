@@ -0,0 +1,71 @@
+"""
+Monotonic, high-resolution timing helpers for all measurement sites
+
+Measurements use time.perf_counter_ns(), which is monotonic (unaffected by NTP
+or wall-clock adjustments) and has the best available resolution. Durations
+are kept as integer nanoseconds and converted to milliseconds only for display.
+Wall-clock time (time.time(), datetime) is only for timestamps, never durations.
+"""
+
+import time
+from typing import Optional
+
+NS_PER_MS = 1_000_000
+NS_PER_SECOND = 1_000_000_000
+
+def now_ns() -> int:
+    """Current monotonic timestamp in nanoseconds"""
+    return time.perf_counter_ns()
+
+def elapsed_ns(start_ns: int, end_ns: Optional[int] = None) -> int:
+    """Nanoseconds elapsed since start_ns (or between start_ns and end_ns)"""
+    return (end_ns if end_ns is not None else time.perf_counter_ns()) - start_ns
+
+def ns_to_ms(duration_ns: int) -> float:
+    """Convert nanoseconds to milliseconds"""
+    return duration_ns / NS_PER_MS
+
+def ns_to_seconds(duration_ns: int) -> float:
+    """Convert nanoseconds to seconds"""
+    return duration_ns / NS_PER_SECOND
+
+def ms_to_ns(duration_ms: float) -> int:
+    """Convert milliseconds to integer nanoseconds"""
+    return round(duration_ms * NS_PER_MS)
+
+def elapsed_ms(start_ns: int, end_ns: Optional[int] = None) -> float:
+    """Milliseconds elapsed since start_ns (or between start_ns and end_ns)"""
+    return ns_to_ms(elapsed_ns(start_ns, end_ns))
+
+class Stopwatch:
+    """Measures a duration with perf_counter_ns
+
+    Usable directly (Stopwatch() starts immediately) or as a context manager.
+    """
+
+    def __init__(self):
+        self.start_ns = now_ns()
+        self.end_ns: Optional[int] = None
+
+    def __enter__(self):
+        self.start_ns = now_ns()
+        self.end_ns = None
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def stop(self) -> int:
+        """Stop the stopwatch and return the elapsed nanoseconds"""
+        self.end_ns = now_ns()
+        return self.elapsed_ns
+
+    @property
+    def elapsed_ns(self) -> int:
+        """Elapsed nanoseconds (up to now if still running)"""
+        return elapsed_ns(self.start_ns, self.end_ns)
+
+    @property
+    def elapsed_ms(self) -> float:
+        """Elapsed milliseconds (up to now if still running)"""
+        return ns_to_ms(self.elapsed_ns)
@@ -24,11 +24,13 @@ from core.database import DatabaseManager
 from core.cache import CacheManager
 from core.performance import PerformanceAnalyzer
 from core.data_generator import DataGenerator
+from core.result_store import ResultStore
+from core.scenarios import ScenarioCatalog
 from core.metrics import http_requests_total, http_request_duration_seconds, system_cpu_usage, system_memory_usage
+from core.timing import elapsed_ns, now_ns, ns_to_seconds
 from api.routes import performance, reports, admin
 from utils.logger import setup_logging
 import psutil
-import time
 
 # Setup logging
 setup_logging()
@@ -37,13 +39,15 @@ logger = logging.getLogger(__name__)
 # Global managers
 db_manager = None
 cache_manager = None
+result_store = None
+scenario_catalog = None
 performance_analyzer = None
 data_generator = None
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager"""
-    global db_manager, cache_manager, performance_analyzer, data_generator
+    global db_manager, cache_manager, result_store, scenario_catalog, performance_analyzer, data_generator
     
     logger.info("Starting Northwind Performance Monitor...")
     
@@ -51,18 +55,25 @@ async def lifespan(app: FastAPI):
         # Initialize managers
         db_manager = DatabaseManager()
         cache_manager = CacheManager()
-        performance_analyzer = PerformanceAnalyzer(db_manager, cache_manager)
+        result_store = ResultStore()
+        scenario_catalog = ScenarioCatalog()
+        scenario_catalog.load()
+        performance_analyzer = PerformanceAnalyzer(db_manager, cache_manager, result_store, scenario_catalog)
         data_generator = DataGenerator(db_manager)
         
         # Test connections
         await db_manager.connect()
         await cache_manager.connect()
+        await result_store.connect()
+        await performance_analyzer.start()
         
         logger.info("All services connected successfully")
         
         # Store in app state
         app.state.db_manager = db_manager
         app.state.cache_manager = cache_manager
+        app.state.result_store = result_store
+        app.state.scenario_catalog = scenario_catalog
         app.state.performance_analyzer = performance_analyzer
         app.state.data_generator = data_generator
         
@@ -79,10 +90,15 @@ async def lifespan(app: FastAPI):
         logger.info("Shutting down services...")
         if hasattr(app.state, 'metrics_task'):
             app.state.metrics_task.cancel()
-        if db_manager:
-            await db_manager.disconnect()
+        if performance_analyzer:
+            await performance_analyzer.close()
+        # Before the database, so background cache refreshes stop before its pool closes
         if cache_manager:
             await cache_manager.disconnect()
+        if db_manager:
+            await db_manager.disconnect()
+        if result_store:
+            await result_store.disconnect()
 
 async def update_system_metrics():
     """Background task to update system metrics"""
@@ -123,13 +139,13 @@ app.add_middleware(
 @app.middleware("http")
 async def metrics_middleware(request: Request, call_next):
     """Middleware to collect HTTP request metrics"""
-    start_time = time.time()
+    start_ns = now_ns()
     
     # Call the endpoint
     response = await call_next(request)
     
     # Calculate duration
-    duration = time.time() - start_time
+    duration = ns_to_seconds(elapsed_ns(start_ns))
     
     # Extract path template instead of full path
     endpoint = request.url.path
@@ -9,6 +9,7 @@ from datetime import datetime
 from logging.handlers import RotatingFileHandler
 
 from core.config import settings
+from core.timing import Stopwatch
 
 def setup_logging():
     """Setup application logging configuration"""
@@ -104,17 +105,16 @@ class PerformanceContextManager:
     def __init__(self, operation_name: str, logger: logging.Logger = None):
         self.operation_name = operation_name
         self.logger = logger or logging.getLogger(__name__)
-        self.start_time = None
-        self.end_time = None
+        self.stopwatch = None
     
     def __enter__(self):
-        self.start_time = datetime.now()
+        self.stopwatch = Stopwatch()
         self.logger.info(f"Starting {self.operation_name}...")
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.end_time = datetime.now()
-        duration = (self.end_time - self.start_time).total_seconds()
+        self.stopwatch.stop()
+        duration = self.stopwatch.elapsed_ms / 1000
         
         if exc_type is None:
             self.logger.info(f"Completed {self.operation_name} in {duration:.2f} seconds")
@@ -126,6 +126,6 @@ class PerformanceContextManager:
     @property
     def duration_ms(self) -> float:
         """Get duration in milliseconds"""
-        if self.start_time and self.end_time:
-            return (self.end_time - self.start_time).total_seconds() * 1000
+        if self.stopwatch and self.stopwatch.end_ns is not None:
+            return self.stopwatch.elapsed_ms
         return 0.0
@@ -7,8 +7,6 @@ Can be run independently or via the web interface
 import asyncio
 import logging
 import sys
-import json
-from datetime import datetime
 
 # Add app directory to path
 sys.path.append('/app')
@@ -17,6 +15,7 @@ from core.config import settings
 from core.database import DatabaseManager
 from core.cache import CacheManager
 from core.performance import PerformanceAnalyzer
+from core.result_store import ResultStore
 from utils.logger import setup_logging
 
 async def main():
@@ -31,12 +30,15 @@ async def main():
         # Initialize managers
         db_manager = DatabaseManager()
         cache_manager = CacheManager()
+        result_store = ResultStore()
         
         await db_manager.connect()
         await cache_manager.connect()
+        await result_store.connect()
         
-        # Initialize performance analyzer
-        performance_analyzer = PerformanceAnalyzer(db_manager, cache_manager)
+        # Initialize performance analyzer (results are persisted as each test completes)
+        performance_analyzer = PerformanceAnalyzer(db_manager, cache_manager, result_store)
+        await performance_analyzer.start()
         
         # Run comprehensive tests
         logger.info("Running comprehensive performance tests...")
@@ -44,15 +46,9 @@ async def main():
         
         # Get results
         results = performance_analyzer.get_test_results()
+        run_id = performance_analyzer.current_run_id
         
-        # Save results to file
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        results_file = f"/app/reports/performance_results_{timestamp}.json"
-        
-        with open(results_file, 'w') as f:
-            json.dump(results, f, indent=2, default=str)
-        
-        logger.info(f"Results saved to {results_file}")
+        logger.info(f"Results stored as run {run_id} in {result_store.path}")
         
         # Print summary
         print("\n" + "="*60)
@@ -65,21 +61,25 @@ async def main():
                 print(f"\nTest: {result['test_name']}")
                 print(f"  SQL Average:     {comp['sql_avg_ms']:.2f}ms")
                 print(f"  GraphQL Average: {comp['graphql_avg_ms']:.2f}ms")
-                print(f"  Faster Option:   {comp['faster_option']}")
+                print(f"  Faster Option:   {comp['faster_option']} (p={comp['p_value']:.3f})")
                 print(f"  Difference:      {comp['performance_difference_percent']:.1f}%")
         
         print("\n" + "="*60)
-        print(f"Detailed results saved to: {results_file}")
+        print(f"Detailed results stored as run {run_id} in: {result_store.path}")
         print("="*60)
         
     except Exception as e:
         logger.error(f"Performance testing failed: {e}")
         sys.exit(1)
     finally:
-        if 'db_manager' in locals():
-            await db_manager.disconnect()
+        if 'performance_analyzer' in locals():
+            await performance_analyzer.close()
         if 'cache_manager' in locals():
             await cache_manager.disconnect()
+        if 'db_manager' in locals():
+            await db_manager.disconnect()
+        if 'result_store' in locals():
+            await result_store.disconnect()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,10 @@
+import os
+import sys
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+sys.path.insert(0, APP_DIR)
+
+# Settings are read at import; use codecs that need no optional packages
+os.environ.setdefault("SCENARIO_DIR", os.path.join(os.path.dirname(APP_DIR), "scenarios"))
+os.environ.setdefault("CACHE_CODEC", "json")
+os.environ.setdefault("CACHE_COMPRESSION", "zlib")
@@ -0,0 +1,100 @@
+import asyncio
+import time
+
+from core.cache import CacheManager
+from core.performance import PerformanceAnalyzer
+
+QUERY = "SELECT 1"
+ROWS = [{"id": 1}, {"id": 2}]
+
+class FakeRedis:
+    """The subset of redis.asyncio used by single-flight, with expiring keys"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        value, expires_at = self.data.get(key, (None, None))
+        if expires_at is not None and expires_at < time.time():
+            del self.data[key]
+            return None
+        return value
+
+    async def set(self, key, value, nx=False, px=None):
+        if nx and await self.get(key) is not None:
+            return None
+        self.data[key] = (value, time.time() + px / 1000 if px else None)
+        return True
+
+    async def setex(self, key, ttl, value):
+        self.data[key] = (value, time.time() + ttl)
+
+    async def eval(self, script, numkeys, key, token):
+        if self.data.get(key, (None,))[0] == token:
+            del self.data[key]
+            return 1
+        return 0
+
+def _cache_manager(redis_client: FakeRedis) -> CacheManager:
+    cache = CacheManager()
+    cache.redis_client = redis_client
+    cache.single_flight_mode = "redis"
+    return cache
+
+def test_local_followers_of_remote_entry():
+    """Two local callers wait on a lock held by another worker, which then caches the result"""
+    async def scenario():
+        redis_client = FakeRedis()
+        local = _cache_manager(redis_client)
+        remote = _cache_manager(redis_client)
+        analyzer = PerformanceAnalyzer(None, local)
+
+        cache_key = local._generate_cache_key("query", QUERY, None)
+        await redis_client.set(f"lock:{cache_key}", "other-worker", nx=True, px=5000)
+
+        async def load():
+            raise AssertionError("load() must not run while another worker holds the lock")
+
+        async def remote_worker():
+            await asyncio.sleep(0.05)
+            await remote.cache_query_result(QUERY, ROWS, tiers="l2")
+
+        results = await asyncio.gather(
+            analyzer._execute_coalesced("sql", QUERY, None, "l2", load),
+            analyzer._execute_coalesced("sql", QUERY, None, "l2", load),
+            remote_worker()
+        )
+        return results[:2], local.single_flight_stats
+
+    responses, stats = asyncio.run(scenario())
+
+    for response in responses:
+        assert response["coalesced"] == "remote"
+        assert response["query_type"] == "sql"
+        assert response["row_count"] == len(ROWS)
+        assert response["data"] == ROWS
+    assert stats["remote"] == 1
+    assert stats["coalesced"] == 1
+
+def test_follower_loads_when_leader_is_cancelled():
+    async def scenario():
+        cache = CacheManager()
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.05 if len(calls) == 1 else 0)
+            return {"data": ROWS}
+
+        leader = asyncio.create_task(cache.single_flight(QUERY, None, load))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(cache.single_flight(QUERY, None, load)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await asyncio.gather(*followers), len(calls)
+
+    results, load_calls = asyncio.run(scenario())
+
+    assert load_calls == 2
+    assert sorted(role for _, role in results) == ["coalesced", "leader"]
+    assert all(result == {"data": ROWS} for result, _ in results)